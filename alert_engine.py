@@ -0,0 +1,242 @@
+"""Incremental, vectorized alert evaluation over ``daily_usage_rollup``.
+
+Rollup triggers queue every changed (child, day) in ``rollup_dirty``. Each
+:func:`evaluate_alerts` run drains that queue, re-checks only the affected
+days and their calendar weeks (Monday-Sunday) for all children in one pandas
+pass, and upserts the result into ``alerts`` (one row per child, app, kind and
+period, so re-runs never duplicate). Alerts that no longer hold are removed.
+Usage moved to the Parquet archive still counts: a re-checked day or week
+that reaches into archived days adds their archived totals (``archive.py``).
+
+    python alert_engine.py              # evaluate once
+    python alert_engine.py --every 60   # keep evaluating every 60 seconds
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from db import connection, init_db, transaction
+
+DEFAULT_DAILY_LIMIT = 120
+DEFAULT_WEEKLY_LIMIT = 600
+
+
+def week_start(day):
+    """Monday of the week containing integer ``day`` (1970-01-01 was a Thursday)."""
+    return day - (day + 3) % 7
+
+
+# -----------------------------
+# Thresholds
+# -----------------------------
+def get_thresholds(child_id: int) -> tuple:
+    """``(daily_limit, weekly_limit)`` for a child, falling back to the defaults."""
+    with connection() as conn:
+        row = conn.execute(
+            "SELECT daily_limit, weekly_limit FROM alert_thresholds WHERE child_id=?", (child_id,)
+        ).fetchone()
+    return tuple(row) if row else (DEFAULT_DAILY_LIMIT, DEFAULT_WEEKLY_LIMIT)
+
+
+def get_thresholds_many(child_ids) -> dict:
+    """``{child_id: (daily_limit, weekly_limit)}`` for several children in one query."""
+    child_ids = [int(c) for c in child_ids]
+    with connection() as conn:
+        rows = conn.execute(
+            "SELECT child_id, daily_limit, weekly_limit FROM alert_thresholds "
+            f"WHERE child_id IN ({','.join('?' * len(child_ids))})",
+            child_ids,
+        ).fetchall()
+    stored = {row[0]: (row[1], row[2]) for row in rows}
+    return {c: stored.get(c, (DEFAULT_DAILY_LIMIT, DEFAULT_WEEKLY_LIMIT)) for c in child_ids}
+
+
+def set_thresholds(child_id: int, daily_limit: int, weekly_limit: int):
+    """Store a child's limits and queue their whole history for re-evaluation."""
+    with transaction() as conn:
+        conn.execute("""
+            INSERT INTO alert_thresholds (child_id, daily_limit, weekly_limit) VALUES (?, ?, ?)
+            ON CONFLICT(child_id) DO UPDATE SET
+                daily_limit = excluded.daily_limit, weekly_limit = excluded.weekly_limit
+        """, (child_id, int(daily_limit), int(weekly_limit)))
+        conn.execute("""
+            INSERT OR IGNORE INTO rollup_dirty (child_id, day)
+            SELECT child_id, day FROM daily_usage_rollup WHERE child_id=?
+        """, (child_id,))
+
+
+# -----------------------------
+# Evaluation
+# -----------------------------
+def _find_alerts(rollup: pd.DataFrame, dirty_days: pd.DataFrame) -> pd.DataFrame:
+    """Vectorized threshold checks; ``rollup`` carries each child's limits."""
+    daily = rollup.merge(dirty_days, on=["child_id", "day"])
+    daily = daily[daily["usage_minutes"] > daily["daily_limit"]]
+    daily = pd.DataFrame({
+        "child_id": daily["child_id"],
+        "app_id": daily["app_id"],
+        "kind": "daily",
+        "period_day": daily["day"],
+        "usage_minutes": daily["usage_minutes"],
+        "limit_minutes": daily["daily_limit"],
+    })
+
+    weekly = (
+        rollup.groupby(["child_id", "app_id", "week"], sort=False)
+        .agg(usage_minutes=("usage_minutes", "sum"), limit_minutes=("weekly_limit", "first"))
+        .reset_index()
+    )
+    weekly = weekly[weekly["usage_minutes"] > weekly["limit_minutes"]]
+    weekly = weekly.rename(columns={"week": "period_day"}).assign(kind="weekly")
+    return pd.concat([daily, weekly[daily.columns]], ignore_index=True)
+
+
+def _with_archived_usage(conn, rollup: pd.DataFrame, scope: pd.DataFrame) -> pd.DataFrame:
+    """Add archived minutes of the re-checked weeks to their hot rollup rows.
+
+    A late row for an archived day, or a week straddling the archive cutoff,
+    would otherwise be judged on its hot rows alone and resolve alerts the
+    full history still supports.
+    """
+    from archive import read_archive  # archive imports this module
+
+    cold = read_archive(scope["child_id"].unique(), int(scope["week"].min()), int(scope["week"].max()) + 6,
+                        columns=["child_id", "day", "app_id", "usage_minutes"], conn=conn)
+    if cold.empty:
+        return rollup
+    cold = cold.assign(week=week_start(cold["day"])).merge(scope, on=["child_id", "week"])
+    limits = pd.read_sql_query(f"""
+        SELECT s.child_id,
+               COALESCE(t.daily_limit, {DEFAULT_DAILY_LIMIT}) AS daily_limit,
+               COALESCE(t.weekly_limit, {DEFAULT_WEEKLY_LIMIT}) AS weekly_limit
+        FROM (SELECT DISTINCT child_id FROM alert_scope) s
+        LEFT JOIN alert_thresholds t ON t.child_id = s.child_id
+    """, conn)
+    keys = ["child_id", "day", "app_id", "week", "daily_limit", "weekly_limit"]
+    return (
+        pd.concat([rollup, cold.merge(limits, on="child_id")[rollup.columns]], ignore_index=True)
+        .groupby(keys, as_index=False, sort=False)["usage_minutes"].sum()
+    )
+
+
+def evaluate_alerts(limit: int = None) -> dict:
+    """Drain ``rollup_dirty`` (at most ``limit`` pairs) and refresh ``alerts``."""
+    with transaction() as conn:
+        sql = "SELECT child_id, day FROM rollup_dirty"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        dirty = pd.read_sql_query(sql, conn)
+        if dirty.empty:
+            return {"dirty_days": 0, "alerts": 0, "resolved": 0}
+
+        dirty["week"] = week_start(dirty["day"])
+        scope = dirty[["child_id", "week"]].drop_duplicates()
+        conn.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS alert_scope (
+                child_id INTEGER, week INTEGER, PRIMARY KEY (child_id, week)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("DELETE FROM alert_scope")
+        conn.executemany("INSERT INTO alert_scope VALUES (?, ?)", scope.itertuples(index=False))
+        conn.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS alert_days (
+                child_id INTEGER, day INTEGER, PRIMARY KEY (child_id, day)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("DELETE FROM alert_days")
+        conn.executemany("INSERT INTO alert_days VALUES (?, ?)", dirty[["child_id", "day"]].itertuples(index=False))
+
+        rollup = pd.read_sql_query(f"""
+            SELECT r.child_id, r.day, r.app_id, r.usage_minutes, s.week,
+                   COALESCE(t.daily_limit, {DEFAULT_DAILY_LIMIT}) AS daily_limit,
+                   COALESCE(t.weekly_limit, {DEFAULT_WEEKLY_LIMIT}) AS weekly_limit
+            FROM alert_scope s
+            JOIN daily_usage_rollup r
+              ON r.child_id = s.child_id AND r.day BETWEEN s.week AND s.week + 6
+            LEFT JOIN alert_thresholds t ON t.child_id = s.child_id
+        """, conn)
+        rollup = _with_archived_usage(conn, rollup, scope)
+        found = _find_alerts(rollup, dirty[["child_id", "day"]])
+
+        conn.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS alert_found (
+                child_id INTEGER, app_id INTEGER, kind TEXT, period_day INTEGER,
+                usage_minutes INTEGER, limit_minutes INTEGER,
+                PRIMARY KEY (child_id, kind, period_day, app_id)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("DELETE FROM alert_found")
+        conn.executemany(
+            "INSERT INTO alert_found VALUES (?, ?, ?, ?, ?, ?)",
+            found[["child_id", "app_id", "kind", "period_day", "usage_minutes", "limit_minutes"]]
+            .astype({"child_id": int, "app_id": int, "period_day": int, "usage_minutes": int, "limit_minutes": int})
+            .itertuples(index=False),
+        )
+        conn.execute("""
+            INSERT INTO alerts (child_id, app_id, kind, period_day, usage_minutes, limit_minutes)
+            SELECT child_id, app_id, kind, period_day, usage_minutes, limit_minutes FROM alert_found WHERE true
+            ON CONFLICT(child_id, kind, period_day, app_id) DO UPDATE SET
+                usage_minutes = excluded.usage_minutes, limit_minutes = excluded.limit_minutes
+        """)
+
+        # Resolve alerts in the re-checked periods that no longer exceed a limit.
+        resolved = conn.execute("""
+            DELETE FROM alerts
+            WHERE (
+                (kind = 'daily' AND EXISTS (
+                    SELECT 1 FROM alert_days d
+                    WHERE d.child_id = alerts.child_id AND d.day = alerts.period_day))
+                OR (kind = 'weekly' AND EXISTS (
+                    SELECT 1 FROM alert_scope s
+                    WHERE s.child_id = alerts.child_id AND s.week = alerts.period_day))
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM alert_found f
+                WHERE f.child_id = alerts.child_id AND f.kind = alerts.kind
+                  AND f.period_day = alerts.period_day AND f.app_id = alerts.app_id)
+        """).rowcount
+
+        conn.execute("""
+            DELETE FROM rollup_dirty
+            WHERE (child_id, day) IN (SELECT child_id, day FROM alert_days)
+        """)
+    return {"dirty_days": len(dirty), "alerts": len(found), "resolved": resolved}
+
+
+# -----------------------------
+# Reads
+# -----------------------------
+def load_alerts(child_id: int) -> pd.DataFrame:
+    with connection() as conn:
+        return pd.read_sql_query("""
+            SELECT al.kind, date(al.period_day * 86400, 'unixepoch') AS period,
+                   a.name AS app, al.usage_minutes, al.limit_minutes, al.created_at
+            FROM alerts al JOIN apps a ON a.app_id = al.app_id
+            WHERE al.child_id=?
+            ORDER BY al.period_day DESC, al.kind, a.name
+        """, conn, params=(child_id,))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--every", type=float, default=0, help="re-run every N seconds (0 = once)")
+    parser.add_argument("--batch", type=int, default=500_000, help="max dirty (child, day) pairs per pass")
+    args = parser.parse_args(argv)
+
+    init_db()
+    while True:
+        start = time.perf_counter()
+        while True:
+            stats = evaluate_alerts(args.batch)
+            if stats["dirty_days"]:
+                print(f"{stats} in {time.perf_counter() - start:.2f}s")
+            if stats["dirty_days"] < args.batch:
+                break
+        if not args.every:
+            break
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Headless usage analytics: pure functions over usage DataFrames.
+
+Input frames have ``Date``, ``app``, ``category`` and ``usage_minutes``
+columns (see ``usage_store.load_daily_usage``); nothing here touches
+Streamlit.
+"""
+from .alerts import daily_alerts, weekly_alerts
+from .explain import CONTRIBUTIONS, cached_explanations, explain_forecasts
+from .family import cached_family_summary, family_summary
+from .forecast import MODELS, cached_forecasts, fit_forecasts, forecast_all, forecast_usage
+from .metrics import app_totals, compute_metrics, metrics_frame, with_balance_score
+from .recommendations import (
+    balance_recommendations,
+    forecast_recommendations,
+    suggest_substitution,
+    usage_suggestions,
+)
+from .report import analyze_child
+from .results import Alert, ChildReport, Forecast, Metrics, Recommendation
+
+__all__ = [
+    "CONTRIBUTIONS",
+    "MODELS",
+    "Alert",
+    "ChildReport",
+    "Forecast",
+    "Metrics",
+    "Recommendation",
+    "analyze_child",
+    "app_totals",
+    "balance_recommendations",
+    "cached_explanations",
+    "cached_family_summary",
+    "cached_forecasts",
+    "compute_metrics",
+    "daily_alerts",
+    "explain_forecasts",
+    "family_summary",
+    "fit_forecasts",
+    "forecast_all",
+    "forecast_recommendations",
+    "forecast_usage",
+    "metrics_frame",
+    "suggest_substitution",
+    "usage_suggestions",
+    "weekly_alerts",
+    "with_balance_score",
+]
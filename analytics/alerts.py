@@ -0,0 +1,18 @@
+import pandas as pd
+
+from .results import Alert
+
+
+def daily_alerts(daily: pd.DataFrame, daily_limit: int) -> list:
+    """One alert per (day, app) total above ``daily_limit``."""
+    over = daily[daily["usage_minutes"] > daily_limit]
+    return [
+        Alert("daily", str(app), int(minutes), daily_limit, date.strftime("%Y-%m-%d"))
+        for date, app, minutes in zip(over["Date"], over["app"], over["usage_minutes"])
+    ]
+
+
+def weekly_alerts(totals: pd.Series, weekly_limit: int) -> list:
+    """One alert per app whose total in the selected window is above ``weekly_limit``."""
+    over = totals[totals > weekly_limit]
+    return [Alert("weekly", str(app), int(minutes), weekly_limit) for app, minutes in over.items()]
@@ -0,0 +1,40 @@
+import threading
+from collections import OrderedDict
+
+import shared_cache
+
+
+class VersionedCache:
+    """Thread-safe LRU for results keyed on a data version.
+
+    Keys must change whenever the underlying data does (e.g. include
+    ``usage_store.data_version``); stale entries simply age out. With a
+    ``shared`` namespace, misses go to the cross-process tier in
+    ``shared_cache`` before computing.
+    """
+
+    def __init__(self, size: int, shared: str = None):
+        self.size = size
+        self.shared = shared
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute, scope: str = None):
+        """``scope`` (e.g. ``shared_cache.child_scope(child_id)``) lets writes invalidate the shared entry."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        if self.shared is None:
+            value = compute()
+        else:
+            value = shared_cache.get_or_compute(self.shared, key, compute, scope=scope)
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
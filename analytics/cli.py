@@ -0,0 +1,80 @@
+"""Nightly batch: analyze every child in the database with a process pool.
+
+    python -m analytics --db child_usage.db --workers 8 --output report.jsonl
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+
+BATCH_SIZE = 200
+
+
+def _analyze_batch(db_path, child_ids, daily_limit, weekly_limit):
+    os.environ["CHILD_USAGE_DB"] = db_path
+    from catalog import get_catalog
+    from db import connection
+    from usage_store import load_daily_usage_many
+
+    from .report import analyze_child
+
+    catalog = get_catalog()
+    daily = load_daily_usage_many(child_ids)
+    with connection() as conn:
+        parents = dict(conn.execute("SELECT child_id, parent_id FROM children"))
+    results = []
+    for child_id, frame in daily.groupby("child_id", sort=False):
+        categories = catalog.category_map(parents.get(int(child_id)))
+        report = analyze_child(int(child_id), frame, categories, daily_limit, weekly_limit,
+                               substitutes=catalog.substitutes)
+        results.append(json.dumps(asdict(report)))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=os.environ.get("CHILD_USAGE_DB", "child_usage.db"))
+    parser.add_argument("--output", default="-", help="JSON-lines file ('-' for stdout)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--daily-limit", type=int, default=120)
+    parser.add_argument("--weekly-limit", type=int, default=600)
+    args = parser.parse_args(argv)
+
+    os.environ["CHILD_USAGE_DB"] = args.db
+    from db import connection, init_db
+
+    init_db(args.db)
+    with connection(args.db) as conn:
+        child_ids = [row[0] for row in conn.execute(
+            "SELECT DISTINCT child_id FROM daily_usage_rollup ORDER BY child_id"
+        )]
+    batches = [child_ids[i:i + args.batch_size] for i in range(0, len(child_ids), args.batch_size)]
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    start = time.perf_counter()
+    # spawn: pooled SQLite connections must never be inherited across fork()
+    ctx = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=ctx) as pool:
+            futures = [
+                pool.submit(_analyze_batch, args.db, batch, args.daily_limit, args.weekly_limit)
+                for batch in batches
+            ]
+            for future in futures:
+                for line in future.result():
+                    out.write(line + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    print(f"analyzed {len(child_ids)} children in {elapsed:.1f}s "
+          f"({len(child_ids) / max(elapsed, 1e-9):.0f} children/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
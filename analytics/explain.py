@@ -0,0 +1,104 @@
+"""Feature contributions behind each (child, app) forecast.
+
+Every forecast average is split additively into:
+
+- ``baseline``: mean daily minutes over the history,
+- ``trend``: what the fitted slope adds over the forecast horizon,
+- ``weekday``: the day-of-week offsets of the forecast days (``"weekly"``),
+- ``level``: how far the smoothed level sits from the mean (``"holt"``),
+
+so ``baseline + trend + weekday + level == avg_forecast``. Alongside that
+come the fit quality (R²), the weekly pattern (peak weekday and swing) and
+each app's share of the child's usage and of their distraction time. All
+series are explained in one pass over the same stacked matrix as
+:func:`fit_forecasts`.
+"""
+import numpy as np
+import pandas as pd
+
+from telemetry import traced
+
+from .cache import VersionedCache
+from .forecast import HORIZON, MODELS, _holt, _linear, _stack, _weekday_effects
+
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+CONTRIBUTIONS = ["baseline", "trend", "weekday", "level"]
+COLUMNS = [
+    "category", "n", "slope", "r2", *CONTRIBUTIONS, "avg_forecast",
+    "peak_weekday", "weekday_swing", "usage_share", "distraction_share",
+]
+
+
+@traced("analytics.explain_forecasts")
+def explain_forecasts(daily: pd.DataFrame, model: str = "linear", horizon: int = HORIZON) -> pd.DataFrame:
+    """One explanation row per series, keyed like :func:`fit_forecasts`."""
+    if model not in MODELS:
+        raise ValueError(f"Unknown forecast model {model!r}; expected one of {MODELS}")
+    frame, codes, index, values, mask, weekday = _stack(daily)
+    if index.empty:
+        return index.assign(**{column: [] for column in COLUMNS})
+
+    intercept, slope, n = _linear(values, mask)
+    rows = np.arange(len(n))
+    x = np.arange(values.shape[1], dtype=float)
+    baseline = values.sum(axis=1) / n
+    effects = _weekday_effects(values, mask, weekday, intercept, slope)
+    fitted = intercept[:, None] + slope[:, None] * x
+    if model == "weekly":
+        fitted = fitted + effects[rows[:, None], weekday]
+
+    zeros = np.zeros(len(n))
+    trend, weekday_part, level = slope * (n + horizon) / 2, zeros, zeros
+    if model == "holt":
+        smoothed, holt_trend = _holt(values, mask)
+        trend, level = holt_trend * (horizon + 1) / 2, smoothed - baseline
+    elif model == "weekly":
+        last_weekday = weekday[rows, n.astype(int) - 1]
+        future_weekday = (last_weekday[:, None] + np.arange(1, horizon + 1)) % 7
+        weekday_part = np.take_along_axis(effects, future_weekday, axis=1).mean(axis=1)
+
+    ss_res = (((values - fitted) * mask) ** 2).sum(axis=1)
+    ss_tot = (((values - baseline[:, None]) * mask) ** 2).sum(axis=1)
+    unexplained = np.divide(ss_res, ss_tot, out=np.zeros_like(ss_res), where=ss_tot > 0)
+
+    # Only weekdays that occur in the history count towards the weekly swing.
+    seen = np.zeros((len(n), 7), dtype=bool)
+    seen[np.repeat(rows, values.shape[1]).reshape(values.shape)[mask], weekday[mask]] = True
+    peak = np.where(seen, effects, -np.inf).argmax(axis=1)
+    swing = np.where(seen, effects, -np.inf).max(axis=1) - np.where(seen, effects, np.inf).min(axis=1)
+
+    category = frame.groupby(codes, sort=True)["category"].first().astype(str).to_numpy()
+    minutes = values.sum(axis=1)
+    child = index["child_id"].to_numpy() if "child_id" in index else np.zeros(len(n), dtype=np.int64)
+    distracting = np.where(category == "Non-Educational", minutes, 0.0)
+    child_total = pd.Series(minutes).groupby(child).transform("sum").to_numpy()
+    child_distract = pd.Series(distracting).groupby(child).transform("sum").to_numpy()
+
+    return index.assign(
+        category=category,
+        n=n.astype(int),
+        slope=slope,
+        r2=1 - unexplained,
+        baseline=baseline,
+        trend=trend,
+        weekday=weekday_part,
+        level=level,
+        avg_forecast=baseline + trend + weekday_part + level,
+        peak_weekday=[WEEKDAYS[d] for d in peak],
+        weekday_swing=swing,
+        usage_share=np.divide(minutes, child_total, out=zeros.copy(), where=child_total > 0),
+        distraction_share=np.divide(distracting, child_distract, out=zeros.copy(), where=child_distract > 0),
+    )
+
+
+# -----------------------------
+# Version-keyed cache
+# -----------------------------
+CACHE_SIZE = 512
+_cache = VersionedCache(CACHE_SIZE, shared="explanations")
+
+
+def cached_explanations(key, daily: pd.DataFrame, model: str = "linear", horizon: int = HORIZON,
+                        scope: str = None) -> pd.DataFrame:
+    """:func:`explain_forecasts`, memoized on ``key`` (e.g. ``(child_id, data_version)``) across processes."""
+    return _cache.get_or_compute((key, model, horizon), lambda: explain_forecasts(daily, model, horizon), scope)
@@ -0,0 +1,82 @@
+"""Family overview: every child of a parent compared in one grouped pass.
+
+Input is a multi-child daily frame with a ``child_id`` column (see
+``usage_store.load_daily_usage_many``). Metrics, alert counts and forecasts
+are computed with one ``groupby``/:func:`fit_forecasts` over all children
+rather than once per child.
+"""
+import pandas as pd
+
+from telemetry import traced
+
+from .cache import VersionedCache
+from .forecast import HORIZON, fit_forecasts
+from .metrics import metrics_frame
+
+DEFAULT_LIMITS = (120, 600)
+SUMMARY_COLUMNS = [
+    "total_study", "total_distract", "total_all", "healthy_balance_score", "top_app",
+    "daily_alerts", "weekly_alerts", "forecast_minutes", "forecast_distract",
+    "forecast_over_limit", "daily_limit", "weekly_limit",
+]
+
+
+@traced("analytics.family_summary")
+def family_summary(daily: pd.DataFrame, categories: dict, child_ids=None, thresholds: dict = None,
+                   model: str = "linear", horizon: int = HORIZON) -> pd.DataFrame:
+    """One comparison row per child, indexed by ``child_id``.
+
+    ``thresholds`` maps child_id -> ``(daily_limit, weekly_limit)``. Alert
+    counts follow :func:`daily_alerts`/:func:`weekly_alerts` over the frame's
+    window; forecast columns are next-``horizon``-day averages summed over
+    apps. Children in ``child_ids`` without usage get zero rows.
+    """
+    child_ids = sorted(daily["child_id"].unique()) if child_ids is None else list(child_ids)
+    thresholds = thresholds or {}
+    limits = pd.DataFrame(
+        [thresholds.get(c, DEFAULT_LIMITS) for c in child_ids],
+        index=pd.Index(child_ids, name="child_id"),
+        columns=["daily_limit", "weekly_limit"],
+    )
+    summary = metrics_frame(daily).reindex(limits.index, fill_value=0)
+
+    over_daily = daily["usage_minutes"] > daily["child_id"].map(limits["daily_limit"])
+    summary["daily_alerts"] = over_daily.groupby(daily["child_id"]).sum()
+
+    totals = daily.groupby(["child_id", "app"], observed=True)["usage_minutes"].sum().reset_index()
+    over_weekly = totals["usage_minutes"] > totals["child_id"].map(limits["weekly_limit"])
+    summary["weekly_alerts"] = over_weekly.groupby(totals["child_id"]).sum()
+    top = totals.sort_values("usage_minutes", ascending=False, kind="stable").drop_duplicates("child_id")
+    summary["top_app"] = top.set_index("child_id")["app"].astype(str)
+
+    fits = fit_forecasts(daily, model, horizon)
+    apps = fits["app"].astype(str)
+    fits = fits.assign(
+        distract=fits["avg_forecast"].where(apps.map(categories).eq("Non-Educational"), 0.0),
+        over=fits["avg_forecast"] > fits["child_id"].map(limits["daily_limit"]),
+    ).groupby("child_id")
+    summary["forecast_minutes"] = fits["avg_forecast"].sum()
+    summary["forecast_distract"] = fits["distract"].sum()
+    summary["forecast_over_limit"] = fits["over"].sum()
+
+    summary = summary.join(limits)
+    counts = ["daily_alerts", "weekly_alerts", "forecast_over_limit"]
+    summary[counts] = summary[counts].fillna(0).astype("int64")
+    summary[["forecast_minutes", "forecast_distract"]] = summary[["forecast_minutes", "forecast_distract"]].fillna(0.0)
+    return summary[SUMMARY_COLUMNS]
+
+
+# -----------------------------
+# Version-keyed cache
+# -----------------------------
+CACHE_SIZE = 128
+_cache = VersionedCache(CACHE_SIZE)
+
+
+def cached_family_summary(key, daily: pd.DataFrame, categories: dict, child_ids=None,
+                          thresholds: dict = None, model: str = "linear", horizon: int = HORIZON) -> pd.DataFrame:
+    """:func:`family_summary`, memoized on ``key`` (e.g. ``(parent, data_versions, window)``)."""
+    cache_key = (key, tuple(sorted((thresholds or {}).items())), model, horizon)
+    return _cache.get_or_compute(
+        cache_key, lambda: family_summary(daily, categories, child_ids, thresholds, model, horizon)
+    )
@@ -0,0 +1,181 @@
+"""Vectorized forecasting for every (child, app) series at once.
+
+Each series is the app's daily minutes in date order, indexed 0..n-1 like the
+original per-app ``LinearRegression`` fit. Series are left-aligned into one
+``(series, days)`` matrix with a mask, so fitting is a handful of NumPy
+reductions regardless of how many children/apps are involved.
+
+Models:
+- ``"linear"``: closed-form least-squares trend.
+- ``"weekly"``: linear trend plus a day-of-week offset (mean residual).
+- ``"holt"``: Holt's linear exponential smoothing.
+"""
+import numpy as np
+import pandas as pd
+
+from telemetry import traced
+
+from .cache import VersionedCache
+from .results import Forecast
+
+HORIZON = 7
+MODELS = ("linear", "weekly", "holt")
+HOLT_ALPHA = 0.5
+HOLT_BETA = 0.3
+
+
+# -----------------------------
+# Stacking
+# -----------------------------
+def _stack(daily: pd.DataFrame):
+    keys = ["child_id", "app"] if "child_id" in daily else ["app"]
+    frame = daily.sort_values(keys + ["Date"], kind="stable")
+    groups = frame.groupby(keys, observed=True, sort=False)
+    codes = groups.ngroup().to_numpy()
+    pos = groups.cumcount().to_numpy()
+    index = frame[keys].drop_duplicates().reset_index(drop=True)
+
+    shape = (len(index), int(pos.max()) + 1 if len(pos) else 0)
+    values = np.zeros(shape)
+    mask = np.zeros(shape, dtype=bool)
+    weekday = np.zeros(shape, dtype=np.int64)
+    values[codes, pos] = frame["usage_minutes"].to_numpy(dtype=float)
+    mask[codes, pos] = True
+    weekday[codes, pos] = frame["Date"].dt.dayofweek.to_numpy()
+    return frame, codes, index, values, mask, weekday
+
+
+# -----------------------------
+# Models
+# -----------------------------
+def _linear(values, mask):
+    x = np.arange(values.shape[1], dtype=float)
+    n = mask.sum(axis=1).astype(float)
+    sx = (mask * x).sum(axis=1)
+    sy = values.sum(axis=1)
+    sxx = (mask * x * x).sum(axis=1)
+    sxy = (values * x).sum(axis=1)
+    denom = n * sxx - sx * sx
+    slope = np.divide(n * sxy - sx * sy, denom, out=np.zeros_like(n), where=denom > 0)
+    intercept = np.divide(sy - slope * sx, n, out=np.zeros_like(n), where=n > 0)
+    return intercept, slope, n
+
+
+def _weekday_effects(values, mask, weekday, intercept, slope):
+    x = np.arange(values.shape[1], dtype=float)
+    resid = (values - (intercept[:, None] + slope[:, None] * x)) * mask
+    rows = np.repeat(np.arange(values.shape[0]), values.shape[1]).reshape(values.shape)
+    slots = (rows * 7 + weekday)[mask]
+    total = np.bincount(slots, weights=resid[mask], minlength=values.shape[0] * 7)
+    count = np.bincount(slots, minlength=values.shape[0] * 7)
+    return np.divide(total, count, out=np.zeros_like(total), where=count > 0).reshape(-1, 7)
+
+
+def _holt(values, mask, alpha=HOLT_ALPHA, beta=HOLT_BETA):
+    level = values[:, 0].copy()
+    trend = np.where(mask[:, 1], values[:, 1] - values[:, 0], 0.0) if values.shape[1] > 1 else np.zeros(len(values))
+    for t in range(1, values.shape[1]):
+        live = mask[:, t]
+        new_level = alpha * values[:, t] + (1 - alpha) * (level + trend)
+        new_trend = beta * (new_level - level) + (1 - beta) * trend
+        level = np.where(live, new_level, level)
+        trend = np.where(live, new_trend, trend)
+    return level, trend
+
+
+@traced("analytics.fit_forecasts")
+def fit_forecasts(daily: pd.DataFrame, model: str = "linear", horizon: int = HORIZON) -> pd.DataFrame:
+    """Fit ``model`` for every series in ``daily`` and return one row per series.
+
+    Columns: the series keys (``app`` and, if present, ``child_id``), ``n``,
+    ``intercept``, ``slope``, ``last_date``, ``avg_forecast`` and
+    ``predictions`` (a ``(horizon,)`` array per row).
+    """
+    if model not in MODELS:
+        raise ValueError(f"Unknown forecast model {model!r}; expected one of {MODELS}")
+    frame, codes, index, values, mask, weekday = _stack(daily)
+    if index.empty:
+        return index.assign(n=[], intercept=[], slope=[], last_date=[], avg_forecast=[], predictions=[])
+
+    intercept, slope, n = _linear(values, mask)
+    steps = np.arange(1, horizon + 1)
+    if model == "holt":
+        level, trend = _holt(values, mask)
+        predictions = level[:, None] + trend[:, None] * steps
+    else:
+        predictions = intercept[:, None] + slope[:, None] * (n[:, None] - 1 + steps)
+        if model == "weekly":
+            effects = _weekday_effects(values, mask, weekday, intercept, slope)
+            last_weekday = weekday[np.arange(len(n)), n.astype(int) - 1]
+            future_weekday = (last_weekday[:, None] + steps) % 7
+            predictions = predictions + np.take_along_axis(effects, future_weekday, axis=1)
+
+    last_date = frame.groupby(codes, sort=True)["Date"].max().to_numpy()
+    return index.assign(
+        n=n.astype(int),
+        intercept=intercept,
+        slope=slope,
+        last_date=last_date,
+        avg_forecast=predictions.mean(axis=1),
+        predictions=list(predictions),
+    )
+
+
+# -----------------------------
+# Forecast objects
+# -----------------------------
+@traced("analytics.forecast_all")
+def forecast_all(daily: pd.DataFrame, model: str = "linear", horizon: int = HORIZON) -> dict:
+    """``{app: Forecast}`` (or ``{(child_id, app): Forecast}``) for every series."""
+    fits = fit_forecasts(daily, model, horizon)
+    keys = ["child_id", "app"] if "child_id" in daily else ["app"]
+    # Series are contiguous once sorted; dates are formatted once per distinct day.
+    frame = daily.sort_values(keys + ["Date"], kind="stable")
+    codes = frame.groupby(keys, observed=True, sort=False).ngroup().to_numpy()
+    bounds = np.flatnonzero(np.diff(codes, prepend=-1, append=-1))
+    days, inverse = np.unique(frame["Date"].to_numpy().astype("datetime64[D]"), return_inverse=True)
+    dates = np.datetime_as_string(days, unit="D")[inverse]
+    minutes = frame["usage_minutes"].to_numpy()
+    history = {}
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        key = tuple(frame[k].iat[start] for k in keys)
+        history[key if len(keys) > 1 else key[0]] = (start, end)
+    last = fits["last_date"].to_numpy().astype("datetime64[D]") if len(fits) else np.array([], "datetime64[D]")
+    future = np.datetime_as_string(last[:, None] + np.arange(1, horizon + 1), unit="D")
+
+    forecasts = {}
+    for i, row in enumerate(fits.itertuples(index=False)):
+        key = (row.child_id, row.app) if len(keys) > 1 else row.app
+        start, end = history[key]
+        forecasts[key] = Forecast(
+            app=str(row.app),
+            dates=dates[start:end].tolist(),
+            actual=minutes[start:end].tolist(),
+            future_dates=future[i].tolist(),
+            predictions=np.asarray(row.predictions, dtype=float).tolist(),
+            model=model,
+            slope=float(row.slope),
+        )
+    return forecasts
+
+
+def forecast_usage(daily: pd.DataFrame, app: str, horizon: int = HORIZON, model: str = "linear"):
+    """Forecast of one app's daily minutes, or ``None`` without history."""
+    return forecast_all(daily[daily["app"] == app], model, horizon).get(app)
+
+
+# -----------------------------
+# Version-keyed cache
+# -----------------------------
+CACHE_SIZE = 512
+_cache = VersionedCache(CACHE_SIZE, shared="forecasts")
+
+
+def cached_forecasts(key, daily: pd.DataFrame, model: str = "linear", horizon: int = HORIZON,
+                     scope: str = None) -> dict:
+    """:func:`forecast_all`, memoized on ``key`` (e.g. ``(child_id, data_version)``) across processes.
+
+    The key must change whenever the underlying data does; stale entries age
+    out of the LRU. ``scope`` is the shared entry's invalidation scope.
+    """
+    return _cache.get_or_compute((key, model, horizon), lambda: forecast_all(daily, model, horizon), scope)
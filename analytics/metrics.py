@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from telemetry import traced
+
+from .results import Metrics
+
+
+@traced("analytics.metrics")
+def metrics_frame(daily: pd.DataFrame, by: str = "child_id") -> pd.DataFrame:
+    """:class:`Metrics` columns per ``by`` group in one pass (a single row if ``by`` is None)."""
+    keys = daily[by].to_numpy() if by else np.zeros(len(daily), dtype=np.int64)
+    minutes = daily["usage_minutes"].to_numpy(dtype=np.int64)
+    frame = pd.DataFrame({
+        "total_study": np.where(daily["category"].eq("Educational").to_numpy(), minutes, 0),
+        "total_distract": np.where(daily["category"].eq("Non-Educational").to_numpy(), minutes, 0),
+    }).groupby(keys, sort=True).sum()
+    frame.index.name = by
+    return with_balance_score(frame)
+
+
+def with_balance_score(frame: pd.DataFrame) -> pd.DataFrame:
+    """Add ``total_all`` and ``healthy_balance_score`` to ``total_study``/``total_distract`` columns."""
+    frame["total_all"] = frame["total_study"] + frame["total_distract"]
+    ratio = frame["total_study"] / frame["total_all"].where(frame["total_all"] > 0)
+    frame["healthy_balance_score"] = (ratio.fillna(0) * 100).astype(np.int64)
+    return frame
+
+
+def compute_metrics(daily: pd.DataFrame) -> Metrics:
+    """Study/distraction totals and the healthy balance score of a usage frame."""
+    row = metrics_frame(daily, by=None)
+    if row.empty:
+        return Metrics(0, 0, 0, 0)
+    return Metrics(*(int(v) for v in row.iloc[0]))
+
+
+def app_totals(daily: pd.DataFrame, apps=None) -> pd.Series:
+    """Minutes per app, in ``apps`` order (missing apps count as 0)."""
+    totals = daily.groupby("app", observed=True)["usage_minutes"].sum()
+    if apps is not None:
+        totals = totals.reindex(apps).fillna(0)
+    return totals.astype("int64")
@@ -0,0 +1,38 @@
+from .results import Recommendation
+
+def suggest_substitution(app_name: str, substitutes: dict = None) -> str:
+    """The catalog's substitute for an app (see ``catalog.AppCatalog.substitutes``)."""
+    return (substitutes or {}).get(app_name, "an educational app")
+
+
+def balance_recommendations(metrics) -> list:
+    if metrics.total_distract > metrics.total_study:
+        return [
+            Recommendation("warning", "Distraction outweighs study time. Recommend fixed study blocks: 2×45 mins daily."),
+            Recommendation("info", "Consider app limits for social apps and a reward system after study blocks."),
+        ]
+    if metrics.total_study >= metrics.total_distract and metrics.total_all > 0:
+        return [Recommendation("success", "Good balance. Maintain consistency with 90-min focused study sessions daily.")]
+    return []
+
+
+def forecast_recommendations(forecast, categories: dict, daily_limit: int, substitutes: dict = None) -> list:
+    if forecast is None:
+        return []
+    app, avg_forecast = forecast.app, forecast.avg_forecast
+    if categories.get(app) == "Non-Educational" and avg_forecast > daily_limit:
+        return [Recommendation("info", f"Replace 30 mins of {app} with {suggest_substitution(app, substitutes)} next week to improve balance.")]
+    if categories.get(app) == "Educational" and avg_forecast >= (daily_limit * 0.8):
+        return [Recommendation("success", f"{app} study time looks solid. Encourage spaced repetition or quizzes.")]
+    return []
+
+
+def usage_suggestions(totals, categories: dict, daily_limit: int, weekly_limit: int,
+                      substitutes: dict = None) -> list:
+    recs = []
+    for app, minutes in totals.items():
+        if categories.get(app) == "Non-Educational" and minutes > weekly_limit:
+            recs.append(Recommendation("write", f"- {app}: Consider daily cap of {daily_limit} mins and shift 20-30 mins to {suggest_substitution(app, substitutes)}."))
+        elif categories.get(app) == "Educational" and minutes < 300:
+            recs.append(Recommendation("write", f"- {app}: Try adding a 20-min focused session after dinner for steady progress."))
+    return recs
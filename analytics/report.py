@@ -0,0 +1,32 @@
+import pandas as pd
+
+from .alerts import daily_alerts, weekly_alerts
+from .forecast import forecast_all
+from .metrics import app_totals, compute_metrics
+from .recommendations import balance_recommendations, forecast_recommendations, usage_suggestions
+from .results import ChildReport
+
+
+def analyze_child(child_id: int, daily: pd.DataFrame, categories: dict,
+                  daily_limit: int = 120, weekly_limit: int = 600, apps=None,
+                  substitutes: dict = None) -> ChildReport:
+    """Metrics, alerts, per-app forecasts and recommendations for one child's daily usage."""
+    apps = list(apps) if apps is not None else list(categories)
+    daily = daily[daily["app"].isin(apps)]
+    metrics = compute_metrics(daily)
+    totals = app_totals(daily, apps)
+    forecasts = list(forecast_all(daily).values())
+
+    recommendations = balance_recommendations(metrics)
+    for forecast in forecasts:
+        recommendations += forecast_recommendations(forecast, categories, daily_limit, substitutes)
+    recommendations += usage_suggestions(totals, categories, daily_limit, weekly_limit, substitutes)
+
+    return ChildReport(
+        child_id=child_id,
+        metrics=metrics,
+        app_totals={app: int(minutes) for app, minutes in totals.items()},
+        alerts=daily_alerts(daily, daily_limit) + weekly_alerts(totals, weekly_limit),
+        forecasts=forecasts,
+        recommendations=recommendations,
+    )
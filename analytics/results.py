@@ -0,0 +1,56 @@
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+
+@dataclass
+class Metrics:
+    total_study: int
+    total_distract: int
+    total_all: int
+    healthy_balance_score: int
+
+
+@dataclass
+class Alert:
+    kind: str  # "daily" or "weekly"
+    app: str
+    minutes: int
+    limit: int
+    date: Optional[str] = None
+
+    @property
+    def message(self) -> str:
+        if self.kind == "daily":
+            return f"{self.app} exceeded {self.limit} mins on {self.date} (used {self.minutes} mins)"
+        return f"{self.app} exceeded weekly limit of {self.limit} mins (used {self.minutes} mins)"
+
+
+@dataclass
+class Forecast:
+    app: str
+    dates: List[str]
+    actual: List[int]
+    future_dates: List[str]
+    predictions: List[float]
+    model: str = "linear"
+    slope: float = 0.0
+
+    @property
+    def avg_forecast(self) -> float:
+        return sum(self.predictions) / len(self.predictions)
+
+
+@dataclass
+class Recommendation:
+    level: str  # "success", "info", "warning" or "write"
+    message: str
+
+
+@dataclass
+class ChildReport:
+    child_id: int
+    metrics: Metrics
+    app_totals: dict
+    alerts: List[Alert] = field(default_factory=list)
+    forecasts: List[Forecast] = field(default_factory=list)
+    recommendations: List[Recommendation] = field(default_factory=list)
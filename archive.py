@@ -0,0 +1,259 @@
+"""Columnar archive tier: old usage rows moved from SQLite to Parquet.
+
+Rows older than a horizon (whole calendar months before ``today -
+CHILD_USAGE_ARCHIVE_DAYS``, default 365) are written to
+``<archive dir>/month=YYYY-MM/bucket=NN/part-*.parquet`` (``bucket`` is
+``child_id % CHILD_USAGE_ARCHIVE_BUCKETS``) and deleted from ``usage_data``,
+and through its triggers from ``daily_usage_rollup``, in the same transaction
+that lists each file in the ``archive_files`` / ``archive_children``
+manifest. Readers only trust listed files, so a crash mid-run can leave an
+orphan file but never a missing or duplicated row.
+
+Each file is sorted by (child_id, day, app_id) in small row groups. Reads go
+through :func:`read_archive`, which opens only the files the manifest lists
+for the children and days asked for (memory-mapped, kept open in a small LRU)
+and only the row groups whose min/max statistics match. ``usage_store`` unions these cold rows
+with the hot SQLite rows, so the dashboard and forecasts see the full history.
+
+Archived periods keep the alerts they already raised. Rows that arrive later
+for an archived day stay in SQLite and are merged on read; when they queue
+the day for alert checks, ``alert_engine`` adds its archived totals back.
+
+    python archive.py                               # archive once
+    python archive.py --horizon-days 180 --vacuum   # and shrink the database file
+    python archive.py --every 86400                 # keep archiving once a day
+"""
+import argparse
+import datetime as dt
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from alert_engine import evaluate_alerts
+from db import DB_NAME, connection, init_db, transaction
+from telemetry import traced
+
+ARCHIVE_DIR = os.environ.get("CHILD_USAGE_ARCHIVE", os.path.splitext(DB_NAME)[0] + "_archive")
+ARCHIVE_AFTER_DAYS = int(os.environ.get("CHILD_USAGE_ARCHIVE_DAYS", "365"))
+ARCHIVE_BUCKETS = int(os.environ.get("CHILD_USAGE_ARCHIVE_BUCKETS", "16"))
+OPEN_FILES = int(os.environ.get("CHILD_USAGE_ARCHIVE_OPEN_FILES", "512"))
+ROW_GROUP_ROWS = 16_384
+BATCH_CHILDREN = 500
+
+EPOCH = dt.date(1970, 1, 1)
+SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("child_id", pa.int32()),
+    ("day", pa.int32()),
+    ("app_id", pa.int32()),
+    ("usage_minutes", pa.int32()),
+])
+
+# Archive files never change once listed, so open handles stay valid.
+_files = OrderedDict()
+_files_lock = threading.Lock()
+
+
+def archive_cutoff(as_of: dt.date = None, horizon_days: int = ARCHIVE_AFTER_DAYS) -> int:
+    """First day kept in SQLite: the 1st of the month ``horizon_days`` before ``as_of``."""
+    first = ((as_of or dt.date.today()) - dt.timedelta(days=horizon_days)).replace(day=1)
+    return (first - EPOCH).days
+
+
+# -----------------------------
+# Reads
+# -----------------------------
+def archived_paths(child_ids, start_day: int = None, end_day: int = None, conn=None) -> list:
+    """Archive files holding rows of ``child_ids`` in the day range, per the manifest."""
+    if conn is None:
+        with connection() as conn:
+            return archived_paths(child_ids, start_day, end_day, conn)
+    child_ids = [int(c) for c in child_ids]
+    sql = (
+        "SELECT DISTINCT f.path FROM archive_children c JOIN archive_files f ON f.file_id = c.file_id "
+        f"WHERE c.child_id IN ({','.join('?' * len(child_ids))})"
+    )
+    params = list(child_ids)
+    if start_day is not None:
+        sql += " AND c.max_day>=?"
+        params.append(start_day)
+    if end_day is not None:
+        sql += " AND c.min_day<=?"
+        params.append(end_day)
+    return [row[0] for row in conn.execute(sql + " ORDER BY f.path", params)]
+
+
+def archived_through(child_id: int, conn=None):
+    """Last archived day of a child, or ``None`` if none of its rows are archived."""
+    if conn is None:
+        with connection() as conn:
+            return archived_through(child_id, conn)
+    return conn.execute("SELECT MAX(max_day) FROM archive_children WHERE child_id=?", (child_id,)).fetchone()[0]
+
+
+def _open(path: str) -> pq.ParquetFile:
+    """Open archive file from the LRU (footer parsed once); call with ``_files_lock`` held."""
+    handle = _files.get(path)
+    if handle is None:
+        handle = _files[path] = pq.ParquetFile(os.path.join(ARCHIVE_DIR, path), memory_map=True)
+        while len(_files) > OPEN_FILES:
+            _files.popitem(last=False)[1].close()
+    else:
+        _files.move_to_end(path)
+    return handle
+
+
+def _overlaps(statistics, low, high) -> bool:
+    if statistics is None or not statistics.has_min_max:
+        return True
+    return (low is None or statistics.max >= low) and (high is None or statistics.min <= high)
+
+
+def _scan(child_ids, start_day=None, end_day=None, app_ids=None, columns=None, conn=None) -> pa.Table:
+    """Matching archived rows: files from the manifest, row groups from their statistics."""
+    child_ids = [int(c) for c in child_ids]
+    paths = archived_paths(child_ids, start_day, end_day, conn)
+    if not paths:
+        return SCHEMA.empty_table().select(columns or SCHEMA.names)
+    child_col, day_col = SCHEMA.get_field_index("child_id"), SCHEMA.get_field_index("day")
+    parts = []
+    with _files_lock:
+        for path in paths:
+            handle = _open(path)
+            groups = [
+                i for i in range(handle.metadata.num_row_groups)
+                if _overlaps(handle.metadata.row_group(i).column(child_col).statistics, min(child_ids), max(child_ids))
+                and _overlaps(handle.metadata.row_group(i).column(day_col).statistics, start_day, end_day)
+            ]
+            if groups:
+                parts.append(handle.read_row_groups(groups, use_threads=False))
+    table = pa.concat_tables(parts) if parts else SCHEMA.empty_table()
+    mask = pc.is_in(table["child_id"], value_set=pa.array(child_ids, pa.int32()))
+    if app_ids is not None:
+        mask = pc.and_(mask, pc.is_in(table["app_id"], value_set=pa.array([int(a) for a in app_ids], pa.int32())))
+    if start_day is not None:
+        mask = pc.and_(mask, pc.greater_equal(table["day"], int(start_day)))
+    if end_day is not None:
+        mask = pc.and_(mask, pc.less_equal(table["day"], int(end_day)))
+    return table.filter(mask).select(columns or SCHEMA.names)
+
+
+@traced("archive.read")
+def read_archive(child_ids, start_day: int = None, end_day: int = None, app_ids=None,
+                 columns=None, conn=None) -> pd.DataFrame:
+    """Archived ``usage_data`` rows matching the filters (empty when none are archived)."""
+    return _scan(child_ids, start_day, end_day, app_ids, columns, conn).to_pandas()
+
+
+@traced("archive.count")
+def count_archive(child_ids, start_day: int = None, end_day: int = None, app_ids=None, conn=None) -> int:
+    """Number of archived rows matching the filters."""
+    return _scan(child_ids, start_day, end_day, app_ids, ["id"], conn).num_rows
+
+
+# -----------------------------
+# Archiving
+# -----------------------------
+def _write_part(part: pd.DataFrame, path: str) -> int:
+    """Write one partition file atomically; returns its size in bytes."""
+    full = os.path.join(ARCHIVE_DIR, path)
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    table = pa.Table.from_pandas(part, schema=SCHEMA, preserve_index=False)
+    pq.write_table(table, full + ".tmp", row_group_size=ROW_GROUP_ROWS, compression="zstd")
+    os.replace(full + ".tmp", full)
+    return os.path.getsize(full)
+
+
+def _archive_batch(child_ids, cutoff: int, buckets: int) -> tuple:
+    """Move one batch of children's rows before ``cutoff``; returns ``(rows, files, bytes)``."""
+    marks = ",".join("?" * len(child_ids))
+    written, size = [], 0
+    try:
+        # Read, write and delete under one write lock so no row can change in between.
+        with transaction() as conn:
+            rows = pd.read_sql_query(
+                "SELECT id, child_id, day, app_id, usage_minutes FROM usage_data "
+                f"WHERE child_id IN ({marks}) AND day<? ORDER BY child_id, day, app_id, id",
+                conn, params=[*child_ids, cutoff],
+            )
+            months = pd.to_datetime(rows["day"], unit="D").dt.strftime("%Y-%m")
+            for (month, bucket), part in rows.groupby([months, rows["child_id"] % buckets], sort=True):
+                path = f"month={month}/bucket={bucket:02d}/part-{part['id'].min()}-{uuid.uuid4().hex[:8]}.parquet"
+                written.append(path)
+                part_bytes = _write_part(part, path)
+                size += part_bytes
+                file_id = conn.execute(
+                    "INSERT INTO archive_files (path, month, bucket, rows, bytes) VALUES (?, ?, ?, ?, ?)",
+                    (path, month, int(bucket), len(part), part_bytes),
+                ).lastrowid
+                spans = part.groupby("child_id")["day"].agg(["min", "max", "size"])
+                conn.executemany(
+                    "INSERT INTO archive_children (child_id, file_id, min_day, max_day, rows) VALUES (?, ?, ?, ?, ?)",
+                    [(int(c), file_id, int(lo), int(hi), int(n)) for c, lo, hi, n in spans.itertuples()],
+                )
+            conn.execute(f"DELETE FROM usage_data WHERE child_id IN ({marks}) AND day<?", [*child_ids, cutoff])
+            # The deletes queued these days for alert checks, which would only
+            # resolve alerts that were raised while the rows were hot.
+            conn.execute(f"DELETE FROM rollup_dirty WHERE child_id IN ({marks}) AND day<?", [*child_ids, cutoff])
+    except BaseException:
+        for path in written:
+            os.remove(os.path.join(ARCHIVE_DIR, path))
+        raise
+    return len(rows), len(written), size
+
+
+def archive_usage(as_of: dt.date = None, horizon_days: int = ARCHIVE_AFTER_DAYS,
+                  buckets: int = ARCHIVE_BUCKETS, batch_children: int = BATCH_CHILDREN) -> dict:
+    """Move every ``usage_data`` row older than the horizon into the Parquet archive."""
+    cutoff = archive_cutoff(as_of, horizon_days)
+    # Settle pending alert checks first; archived days are not re-evaluated.
+    while evaluate_alerts(500_000)["dirty_days"] == 500_000:
+        pass
+    with connection() as conn:
+        child_ids = [row[0] for row in conn.execute(
+            "SELECT child_id FROM children c WHERE EXISTS "
+            "(SELECT 1 FROM usage_data u WHERE u.child_id = c.child_id AND u.day<?) ORDER BY child_id",
+            (cutoff,),
+        )]
+    stats = {"cutoff": (EPOCH + dt.timedelta(days=cutoff)).isoformat(), "children": len(child_ids),
+             "rows": 0, "files": 0, "bytes": 0}
+    for i in range(0, len(child_ids), batch_children):
+        rows, files, size = _archive_batch(child_ids[i:i + batch_children], cutoff, buckets)
+        stats["rows"] += rows
+        stats["files"] += files
+        stats["bytes"] += size
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--horizon-days", type=int, default=ARCHIVE_AFTER_DAYS,
+                        help="keep this many days (rounded back to a month start) in SQLite")
+    parser.add_argument("--buckets", type=int, default=ARCHIVE_BUCKETS, help="child buckets per month")
+    parser.add_argument("--batch", type=int, default=BATCH_CHILDREN, help="children per transaction")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards to return freed pages")
+    parser.add_argument("--every", type=float, default=0, help="re-run every N seconds (0 = once)")
+    args = parser.parse_args(argv)
+
+    init_db()
+    while True:
+        start = time.perf_counter()
+        stats = archive_usage(horizon_days=args.horizon_days, buckets=args.buckets, batch_children=args.batch)
+        if stats["rows"] and args.vacuum:
+            with connection() as conn:
+                conn.execute("VACUUM")
+        print(f"{stats} in {time.perf_counter() - start:.2f}s")
+        if not args.every:
+            break
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Parquet archive tier: database size and read latency before and after archiving.
+
+Seeds ``--children`` children with ``--days`` of per-app history ending
+today, times the dashboard's reads (full history for forecasts, a 90-day
+window, the first raw-view page) on a sample of children, then archives
+everything older than ``--horizon-days`` and runs ``VACUUM``. The same reads
+are timed again and checked to return identical frames.
+
+    python benchmarks/bench_archive.py --children 300 --days 730 --horizon-days 180
+"""
+import argparse
+import datetime as dt
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("CHILD_USAGE_DB", os.path.join(tempfile.mkdtemp(), "bench.db"))
+
+import pandas as pd  # noqa: E402
+
+from archive import ARCHIVE_DIR, archive_usage  # noqa: E402
+from db import DB_NAME, connection, init_db, transaction  # noqa: E402
+from ingest import bulk_insert, generate_synthetic_usage  # noqa: E402
+from usage_store import load_daily_usage, load_usage_page, to_day  # noqa: E402
+
+
+def db_bytes():
+    with connection() as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return os.path.getsize(DB_NAME)
+
+
+def dir_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def time_reads(sample, window_start):
+    reads = {
+        "full history": lambda c: load_daily_usage(c),
+        "last 90 days": lambda c: load_daily_usage(c, window_start),
+        "raw page 1": lambda c: load_usage_page(c, page=0),
+    }
+    timings, frames = {}, {}
+    for label, read in reads.items():
+        start = time.perf_counter()
+        frames[label] = [read(c) for c in sample]
+        timings[label] = (time.perf_counter() - start) / len(sample) * 1000
+    return timings, frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--children", type=int, default=300)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--horizon-days", type=int, default=180)
+    parser.add_argument("--sample", type=int, default=50, help="children timed per read")
+    args = parser.parse_args()
+
+    init_db()
+    with transaction() as conn:
+        conn.executemany("INSERT INTO children (parent_id, child_name) VALUES (NULL, ?)",
+                         [(f"bench{i}",) for i in range(args.children)])
+    child_ids = list(range(1, args.children + 1))
+    today = dt.date.today()
+    start = today - dt.timedelta(days=args.days - 1)
+    for i in range(0, args.children, 100):
+        bulk_insert(generate_synthetic_usage(child_ids[i:i + 100], start.isoformat(), args.days, seed=i))
+
+    sample = child_ids[:: max(1, args.children // args.sample)][: args.sample]
+    window_start = to_day(today) - 89
+    size_before = db_bytes()
+    before, frames_before = time_reads(sample, window_start)
+
+    started = time.perf_counter()
+    stats = archive_usage(today, args.horizon_days)
+    archive_s = time.perf_counter() - started
+    with connection() as conn:
+        conn.execute("VACUUM")
+    size_after = db_bytes()
+    after, frames_after = time_reads(sample, window_start)
+
+    for label in frames_before:
+        for old, new in zip(frames_before[label], frames_after[label]):
+            pd.testing.assert_frame_equal(old, new, check_categorical=False)
+
+    print(f"archived {stats['rows']:,} rows before {stats['cutoff']} into {stats['files']} files in {archive_s:.1f}s")
+    print(f"sqlite file {size_before / 2**20:.1f} MiB -> {size_after / 2**20:.1f} MiB, "
+          f"parquet {dir_bytes(ARCHIVE_DIR) / 2**20:.1f} MiB")
+    print(f"{'read':>14} {'hot only ms':>12} {'hot+cold ms':>12}")
+    for label in before:
+        print(f"{label:>14} {before[label]:>12.2f} {after[label]:>12.2f}")
+    print("results identical before and after archiving")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Chart render time and RSS growth across repeated reruns.
+
+Compares the original pattern (``plt.subplots`` per rerun, rendered like
+``st.pyplot`` and never closed) with ``charts.cached_png`` both on a cold key
+every rerun and on a stable key (cache hits).
+
+    python benchmarks/bench_charts.py --reruns 100
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib  # noqa: E402
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import charts  # noqa: E402
+
+
+def rss_mb():
+    with open("/proc/self/status") as fh:
+        for line in fh:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def sample_data():
+    dates = pd.date_range("2026-02-03", periods=30)
+    rng = np.random.default_rng(0)
+    daily = pd.DataFrame(rng.integers(100, 400, size=(30, 2)), index=dates,
+                         columns=["Educational", "Non-Educational"])
+    totals = pd.Series(rng.integers(300, 900, size=6),
+                       index=["YouTube", "Google Classroom", "WhatsApp", "VS-Code", "Instagram", "MS Teams"])
+    return daily, totals
+
+
+def legacy_rerun(daily, totals, _i):
+    fig1, ax1 = plt.subplots(figsize=(7, 4))
+    daily.plot(kind="bar", stacked=True, ax=ax1, color=["#66b3ff", "#ff9999"])
+    fig1.savefig(io.BytesIO(), format="png")
+    fig3, ax3 = plt.subplots(figsize=(7, 4))
+    ax3.bar(totals.index, totals.values)
+    fig3.savefig(io.BytesIO(), format="png")
+
+
+def chart_rerun(daily, totals, key):
+    def bars(ax):
+        daily.plot(kind="bar", stacked=True, ax=ax, color=["#66b3ff", "#ff9999"])
+
+    def app_bars(ax):
+        ax.bar(totals.index, totals.values)
+
+    charts.cached_png(("bars", key), bars, (7, 4))
+    charts.cached_png(("apps", key), app_bars, (7, 4))
+
+
+def run(label, fn, reruns, stable_key=False):
+    daily, totals = sample_data()
+    charts.clear_chart_cache()
+    rss_start = rss_mb()
+    times = []
+    for i in range(reruns):
+        start = time.perf_counter()
+        fn(daily, totals, 0 if stable_key else i)
+        times.append(time.perf_counter() - start)
+    times = np.array(times) * 1000
+    print(f"{label:<28} p50 {np.percentile(times, 50):7.1f}ms  p95 {np.percentile(times, 95):7.1f}ms  "
+          f"RSS +{rss_mb() - rss_start:6.1f}MB  open figures {len(plt.get_fignums())}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=100)
+    args = parser.parse_args()
+    run("agg, cold key every rerun", chart_rerun, args.reruns)
+    run("agg, cached key", chart_rerun, args.reruns, stable_key=True)
+    run("legacy pyplot (never closed)", legacy_rerun, args.reruns)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Reruns per second with N simulated dashboard sessions.
+
+Each simulated rerun performs the database work of one ``main.py`` rerun
+(schema setup, login check, child list, seed check, usage fetch), either the
+legacy way (fresh ``sqlite3.connect`` + ``CREATE TABLE`` per call) or through
+the shared pool in ``db.py``.
+
+    python benchmarks/bench_db_pool.py --sessions 1 4 16 --seconds 5
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+
+def seed(path, children=20, days=60):
+    db.init_db(path)
+    apps = ["YouTube", "Google Classroom", "WhatsApp", "VS-Code", "Instagram", "MS Teams"]
+    with db.transaction(path) as conn:
+        conn.execute("INSERT INTO parents (username, password) VALUES ('bench', 'pw')")
+        rows = []
+        for c in range(children):
+            conn.execute("INSERT INTO children (parent_id, child_name) VALUES (1, ?)", (f"child{c}",))
+            for d in range(days):
+                for app in apps:
+                    rows.append((f"child{c}", f"2026-01-{d % 28 + 1:02d}", app, "Educational", 60))
+        conn.executemany(
+            "INSERT INTO usage_data (child, date, app, category, usage_minutes) VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+
+
+def legacy_rerun(path, child):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS parents (parent_id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE, password TEXT)")
+    conn.commit()
+    conn.close()
+    conn = sqlite3.connect(path)
+    conn.execute("SELECT parent_id FROM parents WHERE username=? AND password=?", ("bench", "pw")).fetchone()
+    conn.close()
+    conn = sqlite3.connect(path)
+    conn.execute("SELECT c.child_name FROM children c JOIN parents p ON c.parent_id = p.parent_id WHERE p.username = ?", ("bench",)).fetchall()
+    conn.close()
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS usage_data (id INTEGER PRIMARY KEY AUTOINCREMENT, child TEXT, date TEXT, app TEXT, category TEXT, usage_minutes INTEGER)")
+    conn.commit()
+    conn.execute("SELECT COUNT(*) FROM usage_data WHERE child=?", (child,)).fetchone()
+    conn.execute("SELECT * FROM usage_data WHERE child=?", (child,)).fetchall()
+    conn.close()
+
+
+def pooled_rerun(path, child):
+    db.init_db(path)
+    with db.connection(path) as conn:
+        conn.execute("SELECT parent_id FROM parents WHERE username=? AND password=?", ("bench", "pw")).fetchone()
+        conn.execute("SELECT c.child_name FROM children c JOIN parents p ON c.parent_id = p.parent_id WHERE p.username = ?", ("bench",)).fetchall()
+        conn.execute("SELECT 1 FROM usage_data WHERE child=? LIMIT 1", (child,)).fetchone()
+        conn.execute("SELECT * FROM usage_data WHERE child=?", (child,)).fetchall()
+
+
+def run(rerun, path, sessions, seconds):
+    stop = time.perf_counter() + seconds
+    counts = [0] * sessions
+
+    def session(i):
+        child = f"child{i % 20}"
+        while time.perf_counter() < stop:
+            rerun(path, child)
+            counts[i] += 1
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(counts) / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        seed(path)
+        print(f"{'sessions':>8} {'legacy rr/s':>12} {'pooled rr/s':>12} {'speedup':>8}")
+        for n in args.sessions:
+            legacy = run(legacy_rerun, path, n, args.seconds)
+            pooled = run(pooled_rerun, path, n, args.seconds)
+            print(f"{n:>8} {legacy:>12.1f} {pooled:>12.1f} {pooled / legacy:>7.2f}x")
+        db.get_pool(path).close()
+
+
+if __name__ == "__main__":
+    main()
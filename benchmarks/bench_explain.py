@@ -0,0 +1,45 @@
+"""Offline forecast explanations: one vectorized pass vs a per-child loop.
+
+Explains every (child, app) series of a synthetic fleet with
+``analytics.explain_forecasts`` in a single call, and times the same engine
+called once per child on a sample to extrapolate the per-child cost.
+
+    python benchmarks/bench_explain.py --children 1000 10000 --days 90
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics.explain import explain_forecasts  # noqa: E402
+from bench_forecast import make_daily  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--children", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--sample", type=int, default=200, help="children timed in the per-child loop")
+    args = parser.parse_args()
+
+    print(f"{'children':>8} {'series':>8} {'model':>7} {'batch s':>8} {'per-child s (est)':>18} {'speedup':>8}")
+    for children in args.children:
+        daily = make_daily(children, args.days)
+        sample = daily[daily["child_id"] < args.sample]
+        groups = [frame.drop(columns="child_id") for _, frame in sample.groupby("child_id")]
+        for model in ("linear", "weekly", "holt"):
+            start = time.perf_counter()
+            explained = explain_forecasts(daily, model)
+            batch = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for frame in groups:
+                explain_forecasts(frame, model)
+            loop = (time.perf_counter() - start) / len(groups) * children
+            print(f"{children:>8} {len(explained):>8} {model:>7} {batch:>8.2f} {loop:>18.1f} {loop / batch:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
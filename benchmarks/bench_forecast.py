@@ -0,0 +1,79 @@
+"""Per-app sklearn LinearRegression fits vs the vectorized forecasting engine.
+
+    python benchmarks/bench_forecast.py --children 100 1000 10000 --days 90
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+from sklearn.linear_model import LinearRegression  # noqa: E402
+
+from analytics.forecast import fit_forecasts  # noqa: E402
+from migrations import DEFAULT_APPS, DEFAULT_BASELINES  # noqa: E402
+
+# The seeded catalog, without needing a database.
+CATEGORIES = dict(DEFAULT_APPS)
+BASELINES = {name: (mean, spread) for name, mean, spread in DEFAULT_BASELINES}
+
+
+def make_daily(children, days, seed=0):
+    rng = np.random.default_rng(seed)
+    apps = list(BASELINES)
+    means = np.array([BASELINES[a][0] for a in apps])
+    spreads = np.array([BASELINES[a][1] for a in apps])
+    minutes = np.clip(rng.normal(means, spreads, size=(children, days, len(apps))), 20, 180).astype(int)
+    child, day, app = np.meshgrid(np.arange(children), np.arange(days), np.arange(len(apps)), indexing="ij")
+    return pd.DataFrame({
+        "child_id": child.ravel(),
+        "Date": pd.Timestamp("2026-01-01") + pd.to_timedelta(day.ravel(), unit="D"),
+        "app": pd.Categorical.from_codes(app.ravel(), apps),
+        "category": pd.Categorical([CATEGORIES[a] for a in np.array(apps)[app.ravel()]]),
+        "usage_minutes": minutes.ravel(),
+    })
+
+
+def sklearn_per_app(daily):
+    out = []
+    for _, app_data in daily.groupby(["child_id", "app"], observed=True):
+        app_data = app_data.sort_values("Date")
+        X = np.arange(len(app_data)).reshape(-1, 1)
+        model = LinearRegression().fit(X, app_data["usage_minutes"])
+        out.append(model.predict(np.arange(len(app_data), len(app_data) + 7).reshape(-1, 1)))
+    return out
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--children", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--sklearn-max", type=int, default=1000,
+                        help="skip the sklearn loop above this many children")
+    args = parser.parse_args()
+
+    print(f"{'children':>8} {'series':>8} {'sklearn':>10} {'linear':>9} {'weekly':>9} {'holt':>9} {'speedup':>8}")
+    for children in args.children:
+        daily = make_daily(children, args.days)
+        series = children * len(BASELINES)
+        fits = {m: timed(fit_forecasts, daily, m) for m in ("linear", "weekly", "holt")}
+        if children <= args.sklearn_max:
+            sk_time, sk_preds = timed(sklearn_per_app, daily)
+            assert np.allclose(np.vstack(sk_preds), np.vstack(fits["linear"][1]["predictions"]))
+            sk, speedup = f"{sk_time:9.2f}s", f"{sk_time / fits['linear'][0]:7.0f}x"
+        else:
+            sk, speedup = f"{'skipped':>10}", f"{'-':>8}"
+        print(f"{children:>8} {series:>8} {sk} " + " ".join(f"{fits[m][0]:8.3f}s" for m in fits) + f" {speedup}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Seeding/ingestion throughput: per-row loop vs vectorized + batched writes.
+
+    python benchmarks/bench_ingest.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = tempfile.mkdtemp()
+os.environ.setdefault("CHILD_USAGE_DB", os.path.join(BENCH_DIR, "bench.db"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import db  # noqa: E402
+from catalog import get_catalog  # noqa: E402
+from ingest import bulk_insert, diff_editor_changes, generate_synthetic_usage, import_usage_file  # noqa: E402
+from usage_store import get_app_ids, load_usage, to_day  # noqa: E402
+
+
+def make_children(n):
+    with db.transaction() as conn:
+        start = conn.execute("SELECT COALESCE(MAX(child_id), 0) FROM children").fetchone()[0]
+        conn.executemany(
+            "INSERT INTO children (parent_id, child_name) VALUES (NULL, ?)",
+            [(f"bench{start + i}",) for i in range(n)],
+        )
+    return list(range(start + 1, start + n + 1))
+
+
+def legacy_seed(child_ids, days, app_ids, baselines):
+    """The original main.py loop: one RNG draw and one execute per row."""
+    with db.transaction() as conn:
+        for child_id in child_ids:
+            for day in pd.date_range(start="2024-01-01", periods=days):
+                for app, (base, spread) in baselines.items():
+                    usage = max(0, int(np.random.normal(loc=base, scale=spread)))
+                    usage = int(np.clip(usage, 20, 180))
+                    conn.execute(
+                        "INSERT INTO usage_data (child_id, day, app_id, usage_minutes) VALUES (?, ?, ?, ?)",
+                        (child_id, to_day(day), app_ids[app], usage),
+                    )
+
+
+def timed(label, rows, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {rows:>10,} rows {elapsed:8.2f}s {rows / elapsed:>12,.0f} rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--legacy-rows", type=int, default=50_000)
+    args = parser.parse_args()
+
+    db.init_db()
+    app_ids = get_app_ids()
+    baselines = get_catalog().baselines
+    days = 365
+    per_child = days * len(baselines)
+
+    legacy_children = make_children(max(1, args.legacy_rows // per_child))
+    timed("legacy per-row seeding", len(legacy_children) * per_child,
+          lambda: legacy_seed(legacy_children, days, app_ids, baselines))
+
+    children = make_children(max(1, args.rows // per_child))
+    rows = len(children) * per_child
+    data = {}
+    timed("vectorized generation", rows,
+          lambda: data.setdefault("rows", generate_synthetic_usage(children, "2024-01-01", days, app_ids, seed=1)))
+    timed("executemany single transaction", rows, lambda: bulk_insert(data["rows"]))
+
+    csv_path = os.path.join(BENCH_DIR, "usage.csv")
+    csv_children = make_children(len(children))
+    frame = pd.DataFrame(data["rows"], columns=["child_id", "day", "app_id", "usage_minutes"])
+    frame["child_id"] += csv_children[0] - children[0]
+    frame["app"] = frame.pop("app_id").map({v: k for k, v in app_ids.items()})
+    frame.to_csv(csv_path, index=False)
+    timed("chunked CSV import", rows, lambda: import_usage_file(csv_path, refresh_population=False))
+
+    original = load_usage(children[0])[["id", "usage_minutes"]]
+    edited = original.copy()
+    edited.loc[edited.index[::50], "usage_minutes"] += 1
+    start = time.perf_counter()
+    changes = diff_editor_changes(original, edited)
+    print(f"editor diff: {len(changes)} of {len(original)} rows changed "
+          f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Login cost per work factor, and proof that reruns after login skip verification.
+
+    python benchmarks/bench_login.py --iterations 100000 200000 600000 --reruns 10000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("CHILD_USAGE_DB", os.path.join(tempfile.mkdtemp(), "bench.db"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dynamic_users  # noqa: E402
+import passwords  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, nargs="+", default=[100_000, 200_000, 600_000])
+    parser.add_argument("--logins", type=int, default=5)
+    parser.add_argument("--reruns", type=int, default=10_000)
+    args = parser.parse_args()
+
+    dynamic_users.init_user_tables()
+    calls = {"verify": 0}
+    verify = dynamic_users.verify_password
+
+    def counting_verify(*a, **kw):
+        calls["verify"] += 1
+        return verify(*a, **kw)
+
+    dynamic_users.verify_password = counting_verify
+
+    for iterations in args.iterations:
+        passwords.PASSWORD_HASH_ITERATIONS = iterations
+        user = f"bench{iterations}"
+        dynamic_users.add_parent(user, "secret")
+        start = time.perf_counter()
+        for _ in range(args.logins):
+            assert dynamic_users.authenticate_parent(user, "secret")
+        per_login = (time.perf_counter() - start) / args.logins
+        print(f"work factor {iterations:>8}: {per_login * 1000:7.1f} ms/login ({1 / per_login:6.1f} logins/s)")
+
+    session = {}
+    calls["verify"] = 0
+    assert dynamic_users.ensure_login(user, "secret", force=True, session=session) == user
+    after_login = calls["verify"]
+    start = time.perf_counter()
+    for _ in range(args.reruns):
+        assert dynamic_users.ensure_login(user, "secret", session=session) == user
+    elapsed = time.perf_counter() - start
+    print(f"login: {after_login} verify call(s); {args.reruns} reruns after login: "
+          f"{calls['verify'] - after_login} verify calls, {elapsed / args.reruns * 1e6:.1f} us/rerun")
+
+
+if __name__ == "__main__":
+    main()
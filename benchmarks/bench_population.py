@@ -0,0 +1,96 @@
+"""Population percentiles: building the sketches, updating them, and reading them.
+
+Seeds ``--children`` children with ``--days`` of per-app history, then times:
+
+* a full refresh of every child's contribution (children/s);
+* an incremental update: one day of new usage for ``--sample`` children, each
+  followed by ``population.refresh([child])``, as the in-process queue does;
+* a child's percentiles from the sketches (``child_standing``) against
+  computing the same percentiles exactly by scanning every child's stored
+  values, and checks that both agree.
+
+    python benchmarks/bench_population.py --children 2000 --days 365
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("CHILD_USAGE_DB", os.path.join(tempfile.mkdtemp(), "bench.db"))
+
+import population  # noqa: E402
+from db import connection, init_db, transaction  # noqa: E402
+from ingest import bulk_insert, generate_synthetic_usage  # noqa: E402
+from usage_store import from_day, to_day  # noqa: E402
+
+START = "2025-01-01"
+
+
+def exact_percentiles(child_id) -> dict:
+    """Percentiles of a child's stored values by scanning every child's values.
+
+    Children without a stored bin for a metric count as zero.
+    """
+    with connection() as conn:
+        members = conn.execute("SELECT COUNT(*) FROM population_values WHERE metric=?",
+                               (population.BALANCE,)).fetchone()[0]
+        return dict(conn.execute("""
+            SELECT c.metric,
+                   (SUM(o.bin < c.bin) + SUM(o.bin = c.bin) / 2.0
+                    + (:members - COUNT(*)) * (CASE WHEN c.bin > 0 THEN 1.0 ELSE 0.5 END)) * 100.0 / :members
+            FROM population_values c
+            JOIN population_values o ON o.metric = c.metric
+            WHERE c.child_id = :child
+            GROUP BY c.metric
+        """, {"members": members, "child": child_id}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--children", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--sample", type=int, default=20, help="children updated and looked up")
+    args = parser.parse_args()
+
+    init_db()
+    with transaction() as conn:
+        conn.executemany("INSERT INTO children (parent_id, child_name) VALUES (NULL, ?)",
+                         [(f"bench{i}",) for i in range(args.children)])
+    child_ids = list(range(1, args.children + 1))
+    for i in range(0, args.children, 100):
+        bulk_insert(generate_synthetic_usage(child_ids[i:i + 100], START, args.days, seed=i))
+    sample = child_ids[:: max(1, args.children // args.sample)][: args.sample]
+
+    start = time.perf_counter()
+    refreshed = population.refresh()
+    seconds = time.perf_counter() - start
+    with connection() as conn:
+        metrics, bins = conn.execute("SELECT COUNT(DISTINCT metric), COUNT(*) FROM population_sketches").fetchone()
+    print(f"{args.children} children x {args.days} days: full refresh of {refreshed} children in {seconds:.1f}s "
+          f"({refreshed / seconds:.0f} children/s), {metrics} metrics in {bins} bins")
+
+    next_day = from_day(to_day(START) + args.days)
+    start = time.perf_counter()
+    for i, child_id in enumerate(sample):
+        bulk_insert(generate_synthetic_usage([child_id], next_day, 1, seed=args.children + i))
+        population.refresh([child_id])
+    print(f"incremental update (new day + refresh of one child): "
+          f"{(time.perf_counter() - start) / len(sample) * 1000:.1f} ms per child")
+    assert not population.stale_children()
+
+    start = time.perf_counter()
+    standings = [population.child_standing(c) for c in sample]
+    lookup = (time.perf_counter() - start) / len(sample) * 1000
+    start = time.perf_counter()
+    exact = [exact_percentiles(c) for c in sample]
+    scan = (time.perf_counter() - start) / len(sample) * 1000
+    worst = max(abs(s.percentiles[m] - p) for s, e in zip(standings, exact) for m, p in e.items())
+    print(f"percentiles per child: sketch {lookup:.2f} ms, exact scan {scan:.1f} ms "
+          f"(largest difference {worst:.2g} points)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Precomputed dashboard results: synchronous first paint vs reading ``child_results``.
+
+Seeds ``--children`` children with ``--days`` of per-app history, then times
+per child what the dashboard's default view computes synchronously (rollup
+load, metrics, chart data, forecasts and explanations for one model) against
+reading the stored results, plus the scheduler's batch throughput and how
+many recomputations a burst of writes costs.
+
+    python benchmarks/bench_precompute.py --children 500 --days 365
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("CHILD_USAGE_DB", os.path.join(tempfile.mkdtemp(), "bench.db"))
+os.environ.setdefault("PRECOMPUTE_WORKERS", "0")
+
+import precompute  # noqa: E402
+from analytics import app_totals, compute_metrics, explain_forecasts, forecast_all  # noqa: E402
+from catalog import get_catalog  # noqa: E402
+from db import init_db, transaction  # noqa: E402
+from ingest import bulk_insert, generate_synthetic_usage  # noqa: E402
+from usage_store import insert_usage, load_daily_usage  # noqa: E402
+
+
+def synchronous_view(child_id, apps):
+    daily = load_daily_usage(child_id)
+    compute_metrics(daily)
+    app_totals(daily, apps)
+    daily.groupby(["Date", "category"], observed=True)["usage_minutes"].sum().unstack().fillna(0)
+    forecast_all(daily)
+    explain_forecasts(daily)
+
+
+def per_child_ms(fn, sample):
+    start = time.perf_counter()
+    for child_id in sample:
+        fn(child_id)
+    return (time.perf_counter() - start) / len(sample) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--children", type=int, default=500)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--sample", type=int, default=50, help="children timed per read")
+    parser.add_argument("--burst", type=int, default=5000, help="rows written across 10 children")
+    args = parser.parse_args()
+
+    init_db()
+    with transaction() as conn:
+        conn.executemany("INSERT INTO children (parent_id, child_name) VALUES (NULL, ?)",
+                         [(f"bench{i}",) for i in range(args.children)])
+    child_ids = list(range(1, args.children + 1))
+    for i in range(0, args.children, 100):
+        bulk_insert(generate_synthetic_usage(child_ids[i:i + 100], "2025-01-01", args.days, seed=i))
+    apps = list(get_catalog().category_map())
+    sample = child_ids[:: max(1, args.children // args.sample)][: args.sample]
+
+    sync_ms = per_child_ms(lambda c: synchronous_view(c, apps), sample)
+    stats = precompute.refresh()
+    cold_ms = per_child_ms(precompute.get_results, sample)
+    warm_ms = per_child_ms(precompute.get_results, sample)
+
+    burst = [(child_ids[i % 10], 20000 + i // 10, 1 + i % 6, 30) for i in range(args.burst)]
+    for start in range(0, len(burst), 100):
+        insert_usage(burst[start:start + 100])
+    stale = precompute.stale_children()
+    burst_stats = precompute.refresh()
+
+    print(f"{args.children} children x {args.days} days")
+    print(f"scheduler: {stats['children']} children in {stats['seconds']:.2f}s "
+          f"({stats['children'] / stats['seconds']:.0f} children/s)")
+    print(f"{'default view per child':>28} {'ms':>8}")
+    print(f"{'synchronous compute':>28} {sync_ms:>8.2f}")
+    print(f"{'precomputed, first read':>28} {cold_ms:>8.2f}")
+    print(f"{'precomputed, cached':>28} {warm_ms:>8.2f}")
+    print(f"burst of {args.burst} rows in {len(burst) // 100} commits -> {len(stale)} stale children, "
+          f"{burst_stats['children']} recomputed in {burst_stats['seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
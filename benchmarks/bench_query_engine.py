@@ -0,0 +1,93 @@
+"""Query engines: dashboard aggregations per child and across every child.
+
+Seeds ``--children`` children with ``--days`` of per-app history (6 apps, so
+365 days x 2000 children is ~4.4M rollup rows), optionally archives part of
+it, then times each available engine on:
+
+* one child's filtered view (balance score, app totals and daily trend, as
+  ``query_engine.child_view`` computes it uncached) for two date windows;
+* daily-limit alert rows for one child;
+* metrics and app totals for every child in one call.
+
+    python benchmarks/bench_query_engine.py --children 2000 --days 365
+    python benchmarks/bench_query_engine.py --archive-days 180 --engines sqlite duckdb
+"""
+import argparse
+import datetime as dt
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("CHILD_USAGE_DB", os.path.join(tempfile.mkdtemp(), "bench.db"))
+
+import query_engine  # noqa: E402
+from archive import archive_usage  # noqa: E402
+from catalog import get_catalog  # noqa: E402
+from db import connection, init_db, transaction  # noqa: E402
+from ingest import bulk_insert, generate_synthetic_usage  # noqa: E402
+from usage_store import from_day, to_day  # noqa: E402
+
+START = "2025-01-01"
+
+
+def timed_ms(fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--children", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--sample", type=int, default=20, help="children timed per view")
+    parser.add_argument("--archive-days", type=int, default=0, help="keep this many days hot, archive the rest")
+    parser.add_argument("--engines", nargs="+", default=sorted(query_engine.ENGINES))
+    args = parser.parse_args()
+
+    init_db()
+    with transaction() as conn:
+        conn.executemany("INSERT INTO children (parent_id, child_name) VALUES (NULL, ?)",
+                         [(f"bench{i}",) for i in range(args.children)])
+    child_ids = list(range(1, args.children + 1))
+    start = time.perf_counter()
+    for i in range(0, args.children, 100):
+        bulk_insert(generate_synthetic_usage(child_ids[i:i + 100], START, args.days, seed=i))
+    last_day = to_day(START) + args.days - 1
+    if args.archive_days:
+        archive_usage(as_of=from_day(last_day), horizon_days=args.archive_days)
+    with connection() as conn:
+        hot = conn.execute("SELECT COUNT(*) FROM daily_usage_rollup").fetchone()[0]
+        cold = conn.execute("SELECT COALESCE(SUM(rows), 0) FROM archive_files").fetchone()[0]
+    print(f"{args.children} children x {args.days} days: {hot:,} rollup rows + {cold:,} archived rows "
+          f"(seeded in {time.perf_counter() - start:.0f}s)")
+
+    catalog = get_catalog()
+    apps = list(catalog.category_map())
+    app_ids = [catalog.app_ids[a] for a in apps]
+    sample = child_ids[:: max(1, args.children // args.sample)][: args.sample]
+    windows = {"last 30 days": (last_day - 29, last_day), "all days": (None, None)}
+
+    print(f"{'engine':<8} {'30-day view':>12} {'full view':>12} {'alerts':>10} {'all metrics':>12} {'all apps':>10}   (ms)")
+    for name in args.engines:
+        try:
+            engine = query_engine.get_engine(name)
+        except ImportError as exc:
+            print(f"{name:<8} unavailable: {exc}")
+            continue
+        views = [
+            timed_ms(lambda: [query_engine._child_view(engine, c, lo, hi, app_ids, apps) for c in sample]) / len(sample)
+            for lo, hi in windows.values()
+        ]
+        alerts = timed_ms(lambda: [engine.over_limit(60, [c]) for c in sample]) / len(sample)
+        everyone = timed_ms(lambda: engine.metrics(child_ids))
+        app_totals = timed_ms(lambda: engine.app_totals(child_ids))
+        print(f"{name:<8} {views[0]:>12.2f} {views[1]:>12.2f} {alerts:>10.2f} {everyone:>12.0f} {app_totals:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Raw data view: whole filtered frame vs one SQL page.
+
+Seeds one child with ``--days`` of per-app history, then compares what the
+old raw view loaded and serialized on every rerun (all rows) with a single
+page from ``usage_store.load_usage_page`` at the first, middle and last
+offset. Payload is the Arrow IPC stream Streamlit ships to the browser.
+
+    python benchmarks/bench_raw_view.py --days 365 1095 --page-size 50
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("CHILD_USAGE_DB", os.path.join(tempfile.mkdtemp(), "bench.db"))
+
+import pyarrow as pa  # noqa: E402
+
+from db import init_db, transaction  # noqa: E402
+from ingest import bulk_insert, generate_synthetic_usage  # noqa: E402
+from usage_store import count_usage, load_usage, load_usage_page  # noqa: E402
+
+
+def arrow_bytes(frame):
+    table = pa.Table.from_pandas(frame)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().size
+
+
+def timed_ms(fn, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, nargs="+", default=[365, 1095])
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+
+    init_db()
+    print(f"{'days':>6} {'rows':>8} {'view':>12} {'query ms':>9} {'arrow ms':>9} {'payload KiB':>12}")
+    for child_id, days in enumerate(args.days, start=1):
+        with transaction() as conn:
+            conn.execute("INSERT INTO children (parent_id, child_name) VALUES (NULL, ?)", (f"bench{child_id}",))
+        bulk_insert(generate_synthetic_usage([child_id], "2024-01-01", days, seed=child_id))
+        total = count_usage(child_id)
+        last_page = (total - 1) // args.page_size
+
+        views = [("full frame", lambda: load_usage(child_id))]
+        for label, page in (("first page", 0), ("middle page", last_page // 2), ("last page", last_page)):
+            views.append((label, lambda page=page: load_usage_page(child_id, page=page, page_size=args.page_size)))
+        for label, load in views:
+            query_ms, frame = timed_ms(load)
+            arrow_ms, size = timed_ms(lambda: arrow_bytes(frame))
+            print(f"{days:>6} {total:>8,} {label:>12} {query_ms:>9.2f} {arrow_ms:>9.2f} {size / 1024:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Legacy vs normalized usage_data: per-child fetch latency and migration time.
+
+Builds a legacy-format ``usage_data`` table (TEXT child/date/category, no
+index) of the requested size, times the dashboard's per-child query, upgrades
+the file in place through ``migrations.migrate`` and times the same query
+against the indexed schema.
+
+    python benchmarks/bench_schema.py --rows 1000000 10000000 50000000
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import DEFAULT_APPS, MIGRATIONS, migrate  # noqa: E402
+
+DAYS = 365
+
+
+def build_legacy(path, rows):
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("BEGIN")
+    MIGRATIONS[0][1](conn)
+    conn.execute("PRAGMA user_version = 1")
+    children = max(1, rows // (DAYS * len(DEFAULT_APPS)))
+    conn.executemany(
+        "INSERT INTO children (parent_id, child_name) VALUES (NULL, ?)",
+        [(f"child{c}",) for c in range(children)],
+    )
+    conn.execute("CREATE TEMP TABLE app_list (n INTEGER, app TEXT, category TEXT)")
+    conn.executemany(
+        "INSERT INTO app_list VALUES (?, ?, ?)",
+        [(i, app, cat) for i, (app, cat) in enumerate(DEFAULT_APPS)],
+    )
+    conn.execute(
+        """
+        WITH RECURSIVE seq(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM seq WHERE i + 1 < ?)
+        INSERT INTO usage_data (child, date, app, category, usage_minutes)
+        SELECT 'child' || (i / (? * ?)),
+               date('2024-01-01', '+' || ((i / ?) % ?) || ' days'),
+               a.app, a.category, 20 + abs(random() % 160)
+        FROM seq JOIN app_list a ON a.n = i % ?
+        """,
+        (rows, DAYS, len(DEFAULT_APPS), len(DEFAULT_APPS), DAYS, len(DEFAULT_APPS)),
+    )
+    conn.execute("COMMIT")
+    return conn, children
+
+
+def time_query(conn, sql, params, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        conn.execute(sql, params).fetchall()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def bench(rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        t0 = time.perf_counter()
+        conn, children = build_legacy(path, rows)
+        build_s = time.perf_counter() - t0
+        child = f"child{children // 2}"
+        legacy_ms = time_query(conn, "SELECT * FROM usage_data WHERE child=?", (child,), repeat=3)
+
+        t0 = time.perf_counter()
+        conn.execute("BEGIN")
+        migrate(conn)
+        conn.execute("COMMIT")
+        migrate_s = time.perf_counter() - t0
+
+        child_id = conn.execute("SELECT child_id FROM children WHERE child_name=?", (child,)).fetchone()[0]
+        indexed_ms = time_query(
+            conn,
+            "SELECT day, app_id, usage_minutes FROM usage_data WHERE child_id=?",
+            (child_id,),
+        )
+        view_ms = time_query(conn, "SELECT * FROM usage_records WHERE child_id=?", (child_id,))
+        size_mb = os.path.getsize(path) / 1e6
+        conn.close()
+    print(
+        f"{rows:>11,} rows  build {build_s:7.1f}s  migrate {migrate_s:7.1f}s  "
+        f"legacy {legacy_ms:9.2f}ms  indexed {indexed_ms:7.2f}ms  view {view_ms:7.2f}ms  "
+        f"db {size_mb:8.1f}MB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000, 50_000_000])
+    args = parser.parse_args()
+    for rows in args.rows:
+        bench(rows)
+
+
+if __name__ == "__main__":
+    main()
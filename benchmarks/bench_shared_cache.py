@@ -0,0 +1,109 @@
+"""Several dashboard processes with and without the shared result cache.
+
+Seeds ``--children`` children with ``--days`` of per-app history, then runs
+``--processes`` server processes side by side, each starting with empty
+in-process caches (as after a deploy) and serving ``--requests`` requests: a
+child picked with a skewed (Zipf) popularity, its filtered view
+(``child_view``, one of a few date ranges) and its forecasts. Each
+configuration prints wall time, requests/s, and per-process hit rate and
+p50/p95 lookup latency:
+
+* ``off``: ``SHARED_CACHE=0``, every process computes everything itself;
+* ``on``: one shared cache file, cold at the start of the run;
+* ``small``: the same with ``SHARED_CACHE_MB=--small-mb``, to show LRU
+  eviction keeping the file bounded without errors.
+
+    python benchmarks/bench_shared_cache.py --children 200 --processes 4 --requests 300
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("CHILD_USAGE_DB", os.path.join(tempfile.mkdtemp(), "bench.db"))
+os.environ.setdefault("PRECOMPUTE_WORKERS", "0")
+
+import numpy as np  # noqa: E402
+
+from db import init_db, transaction  # noqa: E402
+from ingest import bulk_insert, generate_synthetic_usage  # noqa: E402
+
+START = "2025-01-01"
+RANGES = (None, 30, 7)  # whole history, last 30 days, last 7 days
+
+
+def serve(args) -> tuple:
+    """One server process: ``(seconds, shared_cache.stats())`` for its requests."""
+    children, days, requests, seed = args
+    import shared_cache
+    from analytics import cached_forecasts
+    from catalog import get_catalog
+    from query_engine import child_view
+    from usage_store import data_version, load_daily_usage, to_day
+
+    rng = np.random.default_rng(seed)
+    picks = np.minimum(rng.zipf(1.3, requests), children)
+    end_day = to_day(START) + days - 1
+    catalog = get_catalog()
+    start = time.perf_counter()
+    for child_id, last in zip(picks.tolist(), rng.choice(len(RANGES), requests).tolist()):
+        version = (data_version(child_id), catalog.version)
+        start_day = None if RANGES[last] is None else end_day - RANGES[last] + 1
+        child_view(child_id, version, start_day, end_day)
+        cached_forecasts((child_id, version), load_daily_usage(child_id),
+                         scope=shared_cache.child_scope(child_id))
+    return time.perf_counter() - start, shared_cache.stats()
+
+
+def run(label, args, env):
+    os.environ.update(env)
+    tasks = [(args.children, args.days, args.requests, seed) for seed in range(args.processes)]
+    start = time.perf_counter()
+    with multiprocessing.get_context("spawn").Pool(args.processes) as pool:
+        results = pool.map(serve, tasks)
+    wall = time.perf_counter() - start
+    served = args.processes * args.requests
+    print(f"{label:<6} {wall:6.1f}s wall, {served / max(s for s, _ in results):6.1f} requests/s")
+    for i, (seconds, stats) in enumerate(results):
+        parts = [f"{name} {s['hit_rate']:4.0%} hits p50 {s['p50_ms']:.2f} p95 {s['p95_ms']:.2f} ms"
+                 + (f" {s['evictions']} evicted" if s["evictions"] else "")
+                 + (f" {s['errors']} errors" if s["errors"] else "")
+                 for name, s in stats.items()]
+        print(f"  process {i}: {seconds:5.1f}s  " + "; ".join(parts or ["cache off"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--children", type=int, default=200)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=300, help="per process")
+    parser.add_argument("--small-mb", type=float, default=0.25)
+    args = parser.parse_args()
+
+    init_db()
+    with transaction() as conn:
+        conn.executemany("INSERT INTO children (parent_id, child_name) VALUES (NULL, ?)",
+                         [(f"bench{i}",) for i in range(args.children)])
+    child_ids = list(range(1, args.children + 1))
+    for i in range(0, args.children, 100):
+        bulk_insert(generate_synthetic_usage(child_ids[i:i + 100], START, args.days, seed=i))
+
+    cache_dir = tempfile.mkdtemp()
+    print(f"{args.processes} processes x {args.requests} requests over {args.children} children")
+    run("off", args, {"SHARED_CACHE": "0"})
+    run("on", args, {"SHARED_CACHE": "1", "SHARED_CACHE_PATH": os.path.join(cache_dir, "on.db")})
+    small = os.path.join(cache_dir, "small.db")
+    run("small", args, {"SHARED_CACHE": "1", "SHARED_CACHE_PATH": small, "SHARED_CACHE_MB": str(args.small_mb)})
+
+    import shared_cache
+    entries, size = shared_cache.usage(small)
+    print(f"small cache holds {entries} entries, {size / 2**20:.2f} MiB (limit {args.small_mb} MiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Cold start: import time per module and time to first paint, login page vs dashboard.
+
+Every measurement runs in a fresh interpreter, like a new server process:
+
+* import time: streamlit, then the login page's modules, then each of
+  ``warmup.DASHBOARD_MODULES`` in turn, so every entry is what that module
+  adds on top of the ones before it;
+* first paint: ``AppTest`` runs ``main.py`` once for the login page (and
+  lists which heavy libraries that loaded), then logs in and times the first
+  dashboard rerun, once with ``DASHBOARD_PREWARM=0`` (imports happen on that
+  rerun) and once after the prewarm thread has finished.
+
+Point ``--app`` at another checkout's ``main.py`` to compare against it.
+
+    python benchmarks/bench_startup.py --repeat 5
+    python benchmarks/bench_startup.py --app /tmp/baseline/main.py
+"""
+import argparse
+import importlib
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault("CHILD_USAGE_DB", os.path.join(tempfile.mkdtemp(), "bench.db"))
+os.environ.setdefault("PRECOMPUTE_WORKERS", "0")
+
+LOGIN_MODULES = ("dynamic_users", "premium_ui", "telemetry", "warmup")
+HEAVY = ("numpy", "pandas", "pyarrow", "matplotlib", "sklearn")
+
+
+# -----------------------------
+# Fresh-process probes
+# -----------------------------
+def import_times(app_dir, modules) -> dict:
+    """ms per module imported in order; None for modules the tree does not have."""
+    sys.path.insert(0, app_dir)
+    times = {}
+    for name in ("streamlit", *modules):
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ModuleNotFoundError:
+            times[name] = None
+            continue
+        times[name] = (time.perf_counter() - start) * 1000
+    return times
+
+
+def first_paint(app, username, password, prewarmed) -> tuple:
+    """``(login_ms, heavy libraries loaded by the login page, dashboard_ms)``."""
+    os.environ["DASHBOARD_PREWARM"] = "1" if prewarmed else "0"
+    sys.path.insert(0, os.path.dirname(app))
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(app, default_timeout=300)
+    start = time.perf_counter()
+    at.run()
+    login_ms = (time.perf_counter() - start) * 1000
+    loaded = [name for name in HEAVY if name in sys.modules]
+    if prewarmed and "warmup" in sys.modules:
+        sys.modules["warmup"].wait()
+    at.sidebar.text_input[0].input(username)
+    at.sidebar.text_input[1].input(password)
+    at.sidebar.button[0].click()
+    start = time.perf_counter()
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return login_ms, loaded, (time.perf_counter() - start) * 1000
+
+
+def fresh(fn, *args):
+    """Run ``fn(*args)`` in a newly spawned interpreter."""
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def median(values):
+    values = [v for v in values if v is not None]
+    return statistics.median(values) if values else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default=os.path.join(ROOT, "main.py"), help="main.py to measure")
+    parser.add_argument("--days", type=int, default=90, help="days of usage per child")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh processes per measurement")
+    args = parser.parse_args()
+
+    from perf_suite import PASSWORD, build_dataset
+    from precompute import refresh
+    from warmup import DASHBOARD_MODULES
+
+    username = next(iter(build_dataset(1, 2, args.days)))
+    refresh()  # the scheduler has stored results in a running deployment
+
+    args.app = os.path.abspath(args.app)
+    app_dir = os.path.dirname(args.app)
+    modules = (*LOGIN_MODULES, *DASHBOARD_MODULES)
+    runs = [fresh(import_times, app_dir, modules) for _ in range(args.repeat)]
+    times = {name: median([run[name] for run in runs]) for name in runs[0]}
+    print(f"import time per module, ms (median of {args.repeat} fresh processes)")
+    for name, ms in times.items():
+        group = "login" if name in LOGIN_MODULES else "server" if name == "streamlit" else "dashboard"
+        print(f"  {name:<34} {group:<10} {'-' if ms is None else f'{ms:8.1f}':>8}")
+    for group, names in (("login page", LOGIN_MODULES), ("dashboard", DASHBOARD_MODULES)):
+        print(f"  {'total ' + group:<45} {sum(times[n] or 0 for n in names):8.1f}")
+
+    cold = [fresh(first_paint, args.app, username, PASSWORD, False) for _ in range(args.repeat)]
+    warm = [fresh(first_paint, args.app, username, PASSWORD, True) for _ in range(args.repeat)]
+    print(f"\nfirst paint, ms (AppTest, median of {args.repeat} fresh processes)")
+    print(f"  {'login page':<34} {median([r[0] for r in cold + warm]):8.1f}"
+          f"   heavy libraries loaded: {', '.join(cold[0][1]) or 'none'}")
+    print(f"  {'dashboard, imports on login':<34} {median([r[2] for r in cold]):8.1f}")
+    print(f"  {'dashboard, after prewarm':<34} {median([r[2] for r in warm]):8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Instrumentation overhead with ``DASHBOARD_TRACE`` off and on.
+
+Times an empty ``telemetry.span`` (next to a bare ``with nullcontext()``)
+and a small indexed query through a pooled connection, once in a child
+process per setting (tracing is fixed at import).
+
+    python benchmarks/bench_telemetry.py --spans 1000000 --queries 20000
+"""
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def measure(spans, queries):
+    from db import connection, init_db
+    from telemetry import finish_trace, span, start_trace
+
+    init_db()
+    start_trace("bench")
+    bare = contextlib.nullcontext()
+    start = time.perf_counter()
+    for _ in range(spans):
+        with bare:
+            pass
+    bare_ns = (time.perf_counter() - start) / spans * 1e9
+
+    start = time.perf_counter()
+    for _ in range(spans):
+        with span("noop"):
+            pass
+    span_ns = (time.perf_counter() - start) / spans * 1e9
+
+    with connection() as conn:
+        start = time.perf_counter()
+        for i in range(queries):
+            conn.execute("SELECT max_id, edits FROM child_versions WHERE child_id=?", (i,)).fetchone()
+        query_us = (time.perf_counter() - start) / queries * 1e6
+    finish_trace()
+    return {"bare_ns": bare_ns, "span_ns": span_ns, "query_us": query_us}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--spans", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=20_000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.spans, args.queries)))
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, flag in (("off", "0"), ("on", "1")):
+            env = dict(os.environ, DASHBOARD_TRACE=flag, CHILD_USAGE_DB=os.path.join(tmp, f"{label}.db"))
+            env.pop("DASHBOARD_TRACE_FILE", None)
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", "--spans", str(args.spans), "--queries", str(args.queries)],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+            results[label] = json.loads(out)
+    print(f"{'tracing':>8} {'bare with ns':>12} {'span ns':>9} {'query us':>9}")
+    for label, result in results.items():
+        print(f"{label:>8} {result['bare_ns']:>12.0f} {result['span_ns']:>9.0f} {result['query_us']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
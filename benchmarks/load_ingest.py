@@ -0,0 +1,126 @@
+"""Load generator for ingest_service.py: sustained events/s and end-to-end latency.
+
+Starts the service against a scratch database (or targets a running one with
+``--host``), streams per-minute app events over N TCP connections, waits until
+every event has been flushed to SQLite and reports the service's own
+receive-to-commit latency percentiles.
+
+    python benchmarks/load_ingest.py --events 500000 --connections 8 --children 1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from migrations import DEFAULT_APPS  # noqa: E402
+
+
+def get_stats(host, http_port):
+    with urllib.request.urlopen(f"http://{host}:{http_port}/stats", timeout=5) as resp:
+        return json.load(resp)
+
+
+def prepare_db(path, children):
+    os.environ["CHILD_USAGE_DB"] = path
+    import db
+
+    db.init_db(path)
+    with db.transaction(path) as conn:
+        conn.executemany(
+            "INSERT INTO children (parent_id, child_name) VALUES (NULL, ?)",
+            [(f"load{i}",) for i in range(children)],
+        )
+
+
+async def send(host, port, events, children, seed):
+    rng = random.Random(seed)
+    apps = [name for name, _ in DEFAULT_APPS]
+    _, writer = await asyncio.open_connection(host, port)
+    batch = []
+    for i in range(events):
+        batch.append(json.dumps({
+            "child_id": rng.randint(1, children),
+            "app": rng.choice(apps),
+            "ts": 1_770_000_000 + i * 60,
+            "minutes": 1,
+        }))
+        if len(batch) == 1000:
+            writer.write(("\n".join(batch) + "\n").encode())
+            await writer.drain()
+            batch.clear()
+    if batch:
+        writer.write(("\n".join(batch) + "\n").encode())
+        await writer.drain()
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run_load(args):
+    per_conn = args.events // args.connections
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        send(args.host, args.tcp_port, per_conn, args.children, seed)
+        for seed in range(args.connections)
+    ))
+    sent_s = time.perf_counter() - start
+    total = per_conn * args.connections
+    while True:
+        stats = get_stats(args.host, args.http_port)
+        if stats["flushed_events"] + stats["rejected"] >= total:
+            break
+        await asyncio.sleep(0.05)
+    done_s = time.perf_counter() - start
+    print(f"sent {total:,} events over {args.connections} connections in {sent_s:.2f}s "
+          f"({total / sent_s:,.0f} ev/s offered)")
+    print(f"all flushed after {done_s:.2f}s: {total / done_s:,.0f} ev/s sustained, "
+          f"{stats['flushed_rows']:,} rows in {stats['flushes']} flushes, rejected {stats['rejected']}")
+    print(f"receive->commit latency p50 {stats['latency_ms_p50']} ms, p95 {stats['latency_ms_p95']} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=None, help="target a running service instead of starting one")
+    parser.add_argument("--tcp-port", type=int, default=18765)
+    parser.add_argument("--http-port", type=int, default=18080)
+    parser.add_argument("--events", type=int, default=500_000)
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--children", type=int, default=1000)
+    parser.add_argument("--flush-interval", type=float, default=1.0)
+    args = parser.parse_args()
+
+    server = None
+    if args.host is None:
+        args.host = "127.0.0.1"
+        path = os.path.join(tempfile.mkdtemp(), "ingest.db")
+        prepare_db(path, args.children)
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "ingest_service.py"),
+             "--tcp-port", str(args.tcp_port), "--http-port", str(args.http_port),
+             "--flush-interval", str(args.flush_interval)],
+            env=dict(os.environ, CHILD_USAGE_DB=path), cwd=ROOT,
+        )
+        for _ in range(100):
+            try:
+                get_stats(args.host, args.http_port)
+                break
+            except OSError:
+                time.sleep(0.1)
+    try:
+        asyncio.run(run_load(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
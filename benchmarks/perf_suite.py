@@ -0,0 +1,270 @@
+"""Repeatable dashboard performance suite.
+
+1. Builds a synthetic dataset (parents -> children -> daily per-app usage
+   drawn from the catalog's baselines) at the requested scale.
+2. Drives ``main.py`` headlessly with Streamlit's ``AppTest``: ``--sessions``
+   concurrent simulated parents log in, then perform ``--actions`` random
+   steps each (switch child, change date window or apps, flip chart mode,
+   page the raw view, open the family overview, add a record). Each session
+   runs in its own process, since ``AppTest`` patches global Streamlit state
+   and is not thread-safe; they share the database file, not the caches.
+3. Reports p50/p95 rerun latency overall and per action, DB time from
+   ``telemetry`` traces (time inside SQLite calls), and peak RSS per session.
+
+Results are written as JSON; ``--compare`` prints the change against an
+earlier result file.
+
+    python benchmarks/perf_suite.py --parents 50 --children 3 --days 365 --sessions 8
+    python benchmarks/perf_suite.py --output new.json --compare old.json
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PASSWORD = "perf-suite"
+ACTIONS = ("switch_child", "date_window", "apps", "chart_mode", "page", "family", "add_record")
+DATE_WINDOWS = ("All days", "Last 7 days", "Last 30 days", "Last 90 days")
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentiles(values):
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)  # noqa: E731
+    return {"count": len(ordered), "p50": pick(0.5), "p95": pick(0.95), "max": round(ordered[-1], 2),
+            "mean": round(sum(ordered) / len(ordered), 2)}
+
+
+# -----------------------------
+# Dataset
+# -----------------------------
+def build_dataset(parents, children_per_parent, days, start="2025-01-01", seed=0):
+    """Insert the synthetic family tree and usage; returns ``{username: [child_id, ...]}``."""
+    from db import connection, init_db, transaction
+    from dynamic_users import hash_password
+    from ingest import bulk_insert, generate_synthetic_usage
+
+    init_db()
+    password_hash = hash_password(PASSWORD)  # one PBKDF2 run shared by every parent
+    with transaction() as conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO parents (username, password) VALUES (?, ?)",
+            [(f"parent{p}", password_hash) for p in range(parents)],
+        )
+        parent_ids = dict(conn.execute("SELECT username, parent_id FROM parents WHERE username LIKE 'parent%'"))
+        conn.executemany(
+            "INSERT INTO children (parent_id, child_name) VALUES (?, ?)",
+            [(parent_ids[f"parent{p}"], f"child{p}-{c}") for p in range(parents) for c in range(children_per_parent)],
+        )
+    with connection() as conn:
+        rows = conn.execute(
+            "SELECT p.username, c.child_id FROM children c JOIN parents p ON p.parent_id = c.parent_id "
+            "WHERE p.username LIKE 'parent%' ORDER BY c.child_id"
+        ).fetchall()
+    families = {}
+    for username, child_id in rows:
+        families.setdefault(username, []).append(child_id)
+    child_ids = [child_id for _, child_id in rows]
+    for i in range(0, len(child_ids), 500):
+        bulk_insert(generate_synthetic_usage(child_ids[i:i + 500], start, days, seed=seed + i))
+    return families
+
+
+# -----------------------------
+# Simulated sessions
+# -----------------------------
+def _widget(elements, label):
+    return next(e for e in elements if e.label == label)
+
+
+def _timed_run(at, action, timings):
+    start = time.perf_counter()
+    at.run()
+    timings.append((action, (time.perf_counter() - start) * 1000))
+    if at.exception:
+        raise RuntimeError(f"{action}: {at.exception[0].value}")
+
+
+def _perform(at, action, rng, child_ids, timings):
+    """Apply one random ``action`` to the session and time the rerun it triggers."""
+    if action == "switch_child":
+        _widget(at.selectbox, "Select child profile").set_value(rng.choice(child_ids))
+    elif action == "date_window":
+        _widget(at.sidebar.selectbox, "Date range").set_value(rng.choice(DATE_WINDOWS))
+    elif action == "apps":
+        select = _widget(at.sidebar.multiselect, "Select apps")
+        select.set_value(rng.sample(select.options, rng.randint(1, len(select.options))))
+    elif action == "chart_mode":
+        _widget(at.sidebar.radio, "Chart rendering").set_value(rng.choice(["image", "native"]))
+    elif action == "page":
+        page = at.number_input(key="raw_page")
+        page.set_value(rng.randint(page.min, page.max))
+    elif action == "family":
+        _widget(at.radio, "View").set_value("Family overview")
+        _timed_run(at, action, timings)
+        _widget(at.radio, "View").set_value("Child dashboard")
+    elif action == "add_record":
+        _widget(at.number_input, "Usage minutes").set_value(rng.randrange(0, 300, 10))
+        _widget(at.button, "Add Record").click()
+    _timed_run(at, action, timings)
+
+
+def run_session(username, child_ids, actions, seed):
+    """One simulated parent; returns ``(timings, error, peak_rss_mb)``."""
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    timings, error = [], None
+    at = AppTest.from_file(os.path.join(ROOT, "main.py"), default_timeout=300)
+    action = "first_load"
+    try:
+        _timed_run(at, action, timings)
+        at.sidebar.text_input[0].input(username)
+        at.sidebar.text_input[1].input(PASSWORD)
+        at.sidebar.button[0].click()
+        action = "login"
+        _timed_run(at, action, timings)
+        for _ in range(actions):
+            action = rng.choice(ACTIONS)
+            _perform(at, action, rng, child_ids, timings)
+    except Exception as exc:  # keep the timings gathered so far
+        error = f"{username} {action}: {exc!r}"
+    return timings, error, peak_rss_mb()
+
+
+# -----------------------------
+# Suite
+# -----------------------------
+def git_version():
+    try:
+        return subprocess.run(["git", "-C", ROOT, "describe", "--always", "--dirty"],
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize_traces(path):
+    traces = []
+    if os.path.exists(path):
+        with open(path) as fh:
+            traces = [json.loads(line) for line in fh if line.strip()]
+    rerun_ms = sum(t["duration_ms"] for t in traces)
+    sql_ms = sum(t["sql_ms"] for t in traces)
+    return {
+        "reruns": len(traces),
+        "sql_ms_per_rerun": percentiles([t["sql_ms"] for t in traces]),
+        "sql_queries_per_rerun": percentiles([t["sql_queries"] for t in traces]),
+        "rows_per_rerun": percentiles([t["rows"] for t in traces]),
+        "db_share": round(sql_ms / rerun_ms, 4) if rerun_ms else None,
+    }
+
+
+def compare(result, baseline):
+    print(f"\nvs {baseline.get('version')} ({baseline.get('timestamp')}):")
+    rows = [("latency p50 ms", ("latency_ms", "p50")), ("latency p95 ms", ("latency_ms", "p95")),
+            ("db ms p50", ("db", "sql_ms_per_rerun", "p50")), ("db ms p95", ("db", "sql_ms_per_rerun", "p95")),
+            ("peak rss MB", ("memory_mb", "peak"))]
+    for label, path in rows:
+        old, new = baseline, result
+        for key in path:
+            old, new = (old or {}).get(key), (new or {}).get(key)
+        if old and new is not None:
+            print(f"  {label:<16} {old:>10.1f} -> {new:>10.1f} ({(new - old) / old:+.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--parents", type=int, default=20)
+    parser.add_argument("--children", type=int, default=3, help="children per parent")
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--sessions", type=int, default=4, help="concurrent simulated sessions")
+    parser.add_argument("--actions", type=int, default=15, help="actions per session after login")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="result JSON (default: perf-<version>.json)")
+    parser.add_argument("--compare", default=None, help="earlier result JSON to diff against")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="perf-suite-")
+    trace_file = os.path.join(workdir, "traces.jsonl")
+    os.environ["CHILD_USAGE_DB"] = os.path.join(workdir, "perf.db")
+    os.environ.setdefault("DASHBOARD_TRACE", "1")
+    os.environ["DASHBOARD_TRACE_FILE"] = trace_file
+
+    start = time.perf_counter()
+    families = build_dataset(args.parents, args.children, args.days, seed=args.seed)
+    build_s = time.perf_counter() - start
+    print(f"dataset: {len(families)} parents, {sum(map(len, families.values()))} children, "
+          f"{args.days} days in {build_s:.1f}s")
+
+    usernames = sorted(families)
+    timings, errors, session_rss = [], [], []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.sessions, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [
+            pool.submit(run_session, usernames[i % len(usernames)], families[usernames[i % len(usernames)]],
+                        args.actions, args.seed + i)
+            for i in range(args.sessions)
+        ]
+        for future in futures:
+            session_timings, error, rss = future.result()
+            timings += session_timings
+            session_rss.append(rss)
+            if error:
+                errors.append(error)
+    wall_s = time.perf_counter() - start
+    memory = {"peak": round(max(session_rss), 1), "mean": round(sum(session_rss) / len(session_rss), 1)}
+
+    interactive = [ms for action, ms in timings if action != "first_load"]
+    per_action = {}
+    for action, ms in timings:
+        per_action.setdefault(action, []).append(ms)
+    result = {
+        "version": git_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": vars(args),
+        "dataset": {"parents": len(families), "children": sum(map(len, families.values())), "build_s": round(build_s, 2)},
+        "wall_s": round(wall_s, 2),
+        "reruns_per_s": round(len(timings) / wall_s, 2),
+        "latency_ms": percentiles(interactive),
+        "per_action_ms": {action: percentiles(values) for action, values in sorted(per_action.items())},
+        "db": summarize_traces(trace_file),
+        "memory_mb": memory,
+        "errors": errors,
+    }
+
+    output = args.output or os.path.join(os.getcwd(), f"perf-{result['version'] or 'unknown'}.json")
+    with open(output, "w") as fh:
+        json.dump(result, fh, indent=2)
+    print(json.dumps({k: result[k] for k in ("latency_ms", "reruns_per_s", "memory_mb")}, indent=None))
+    print(f"{'action':<13} {'n':>4} {'p50 ms':>8} {'p95 ms':>8}")
+    for action, stats in result["per_action_ms"].items():
+        print(f"{action:<13} {stats['count']:>4} {stats['p50']:>8.1f} {stats['p95']:>8.1f}")
+    db = result["db"]
+    if db["reruns"]:
+        print(f"db: {db['sql_ms_per_rerun']['p50']} ms p50 / {db['sql_ms_per_rerun']['p95']} ms p95 per rerun, "
+              f"{db['db_share']:.1%} of rerun time")
+    if errors:
+        print(f"{len(errors)} session(s) failed: {errors[:3]}")
+    print(f"wrote {output}")
+    if args.compare:
+        with open(args.compare) as fh:
+            compare(result, json.load(fh))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""App catalog: names, categories, substitutes and demo baselines from ``apps``.
+
+The catalog is loaded once per process into an immutable :class:`AppCatalog`
+snapshot and reloaded only when ``catalog_version`` moves (triggers bump it
+on any change to ``apps`` or ``app_category_overrides``), so every session
+shares one interned set of app and category dtypes. Usage rows and rollups
+only store integer ``app_id``s; categories are attached on read, with a
+family's overrides applied, so recategorizing an app is a single catalog
+write and never touches usage rows.
+
+    python catalog.py apps.csv                       # add/update apps in bulk
+    python catalog.py --set TikTok=Non-Educational   # recategorize for everyone
+    python catalog.py --set YouTube=Educational --parent alice
+"""
+import argparse
+import csv
+import threading
+from dataclasses import dataclass, field
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from db import connection, init_db, transaction
+
+
+# -----------------------------
+# Snapshot
+# -----------------------------
+@dataclass(frozen=True)
+class AppCatalog:
+    version: int
+    ids: tuple          # app_id per app, in app_id order
+    names: tuple        # app name per app
+    categories: tuple   # default category per app
+    substitutes: dict   # app name -> suggested substitute app name
+    baselines: dict     # app name -> (mean, spread) daily minutes for demo data
+    overrides: dict     # parent_id -> {app name: category}
+    _codes: dict = field(default_factory=dict, repr=False, compare=False)
+
+    @cached_property
+    def app_ids(self) -> dict:
+        """Map app name -> app_id."""
+        return dict(zip(self.names, self.ids))
+
+    @cached_property
+    def app_dtype(self) -> pd.CategoricalDtype:
+        # Sorted like ``astype("category")`` so groupby/chart order is unchanged.
+        return pd.CategoricalDtype(sorted(self.names))
+
+    @cached_property
+    def category_dtype(self) -> pd.CategoricalDtype:
+        extra = {c for family in self.overrides.values() for c in family.values()}
+        return pd.CategoricalDtype(sorted(set(self.categories) | extra))
+
+    @cached_property
+    def _positions(self) -> np.ndarray:
+        """app_id -> index into ``names`` (-1 for unknown ids)."""
+        positions = np.full(max(self.ids, default=0) + 1, -1, dtype=np.int64)
+        positions[list(self.ids)] = np.arange(len(self.ids))
+        return positions
+
+    @cached_property
+    def _app_codes(self) -> np.ndarray:
+        return self.app_dtype.categories.get_indexer(self.names)
+
+    def category_map(self, parent_id: int = None) -> dict:
+        """App name -> category, with ``parent_id``'s overrides applied."""
+        return {**dict(zip(self.names, self.categories)), **self.overrides.get(parent_id, {})}
+
+    def _category_codes(self, parent_id) -> np.ndarray:
+        codes = self._codes.get(parent_id)
+        if codes is None:
+            categories = self.category_map(parent_id)
+            codes = self._codes[parent_id] = self.category_dtype.categories.get_indexer(
+                [categories[name] for name in self.names]
+            )
+        return codes
+
+    def label(self, app_ids, parent_ids=None) -> tuple:
+        """``(app, category)`` categoricals for integer ``app_ids``.
+
+        ``parent_ids`` is one parent for every row or a per-row sequence; it
+        only matters for families with overrides. Unknown ids become NaN.
+        """
+        app_ids = np.asarray(app_ids, dtype=np.int64)
+        in_range = (app_ids >= 0) & (app_ids < len(self._positions))
+        positions = np.where(in_range, self._positions[np.where(in_range, app_ids, 0)], -1)
+        known = positions >= 0
+        codes = np.full(len(app_ids), -1, dtype=np.int64)
+        if parent_ids is None or np.isscalar(parent_ids) or not self.overrides:
+            parent = parent_ids if np.isscalar(parent_ids) else None
+            codes[known] = self._category_codes(parent)[positions[known]]
+        else:
+            parent_ids = np.asarray(parent_ids)
+            codes[known] = self._category_codes(None)[positions[known]]
+            for parent in self.overrides:
+                rows = known & (parent_ids == parent)
+                codes[rows] = self._category_codes(parent)[positions[rows]]
+        app_codes = np.full(len(app_ids), -1, dtype=np.int64)
+        app_codes[known] = self._app_codes[positions[known]]
+        return (
+            pd.Categorical.from_codes(app_codes, dtype=self.app_dtype),
+            pd.Categorical.from_codes(codes, dtype=self.category_dtype),
+        )
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def _load(conn, version: int) -> AppCatalog:
+    apps = conn.execute("""
+        SELECT a.app_id, a.name, a.category, s.name, a.baseline_mean, a.baseline_spread
+        FROM apps a LEFT JOIN apps s ON s.app_id = a.substitute_id
+        ORDER BY a.app_id
+    """).fetchall()
+    overrides = {}
+    for parent_id, name, category in conn.execute("""
+        SELECT o.parent_id, a.name, o.category
+        FROM app_category_overrides o JOIN apps a ON a.app_id = o.app_id
+    """):
+        overrides.setdefault(parent_id, {})[name] = category
+    return AppCatalog(
+        version=version,
+        ids=tuple(row[0] for row in apps),
+        names=tuple(row[1] for row in apps),
+        categories=tuple(row[2] for row in apps),
+        substitutes={row[1]: row[3] for row in apps if row[3] is not None},
+        baselines={row[1]: (row[4], row[5]) for row in apps if row[4] is not None},
+        overrides=overrides,
+    )
+
+
+def get_catalog(conn=None) -> AppCatalog:
+    """The shared catalog snapshot; one indexed lookup when nothing changed.
+
+    Do not call it with a connection inside an uncommitted write: the
+    snapshot would be shared before the change is durable.
+    """
+    global _catalog
+    if conn is None:
+        with connection() as conn:
+            return get_catalog(conn)
+    version = conn.execute("SELECT version FROM catalog_version").fetchone()[0]
+    current = _catalog
+    if current is not None and current.version == version:
+        return current
+    with _catalog_lock:
+        if _catalog is None or _catalog.version != version:
+            _catalog = _load(conn, version)
+        return _catalog
+
+
+# -----------------------------
+# Writes
+# -----------------------------
+def upsert_apps(apps) -> int:
+    """Add or update apps from dicts with ``name``, ``category`` and optional
+    ``substitute``, ``baseline_mean`` and ``baseline_spread``, in one transaction."""
+    apps = list(apps)
+    with transaction() as conn:
+        conn.executemany("""
+            INSERT INTO apps (name, category, baseline_mean, baseline_spread) VALUES (?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                category = excluded.category,
+                baseline_mean = COALESCE(excluded.baseline_mean, baseline_mean),
+                baseline_spread = COALESCE(excluded.baseline_spread, baseline_spread)
+        """, [(a["name"], a["category"], a.get("baseline_mean") or None, a.get("baseline_spread") or None)
+              for a in apps])
+        # Substitutes may name apps added in the same batch, so link them last.
+        conn.executemany(
+            "UPDATE apps SET substitute_id=(SELECT app_id FROM apps WHERE name=?) WHERE name=?",
+            [(a["substitute"], a["name"]) for a in apps if a.get("substitute")],
+        )
+    return len(apps)
+
+
+def recategorize(changes: dict, parent_id: int = None) -> int:
+    """Set the category of apps (``{name: category}``) for everyone or one family.
+
+    A family override equal to the default category is dropped. Returns the
+    number of apps changed.
+    """
+    with transaction() as conn:
+        app_ids = dict(conn.execute("SELECT name, app_id FROM apps"))
+        unknown = sorted(set(changes) - set(app_ids))
+        if unknown:
+            raise ValueError(f"Unknown apps: {unknown}")
+        rows = [(category, app_ids[name]) for name, category in changes.items()]
+        if parent_id is None:
+            return conn.executemany("UPDATE apps SET category=? WHERE app_id=? AND category<>?",
+                                    [(c, a, c) for c, a in rows]).rowcount
+        conn.executemany("""
+            INSERT INTO app_category_overrides (parent_id, app_id, category) VALUES (?, ?, ?)
+            ON CONFLICT(parent_id, app_id) DO UPDATE SET category = excluded.category
+            WHERE category <> excluded.category
+        """, [(parent_id, a, c) for c, a in rows])
+        conn.execute("""
+            DELETE FROM app_category_overrides
+            WHERE parent_id=? AND category = (SELECT category FROM apps WHERE app_id = app_category_overrides.app_id)
+        """, (parent_id,))
+    return len(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("csv", nargs="?", help="apps to add/update: name,category[,substitute,baseline_mean,baseline_spread]")
+    parser.add_argument("--set", action="append", default=[], metavar="APP=CATEGORY", help="recategorize an app")
+    parser.add_argument("--parent", help="apply --set to this parent's family only")
+    args = parser.parse_args(argv)
+
+    init_db()
+    if args.csv:
+        with open(args.csv, newline="") as fh:
+            print(f"upserted {upsert_apps(csv.DictReader(fh))} apps")
+    if args.set:
+        parent_id = None
+        if args.parent:
+            with connection() as conn:
+                row = conn.execute("SELECT parent_id FROM parents WHERE username=?", (args.parent,)).fetchone()
+            if row is None:
+                parser.error(f"unknown parent {args.parent!r}")
+            parent_id = row[0]
+        changes = dict(item.split("=", 1) for item in args.set)
+        print(f"recategorized {recategorize(changes, parent_id)} apps")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""Dashboard charts: cached Agg-rendered PNGs or native Vega-Lite charts.
+
+Matplotlib figures are built with ``matplotlib.figure.Figure`` on an Agg
+canvas rather than through ``pyplot``, so no global figure registry keeps
+them alive. Rendered PNG bytes are cached under a caller-supplied key such as
+``(child_id, filters, data_version)``; a rerun with the same key only sends
+the cached image. The native mode skips rasterizing and ships just the
+aggregated rows to the browser, and never imports matplotlib.
+"""
+import functools
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import streamlit as st
+
+import shared_cache
+from telemetry import span
+
+STUDY_COLOR = "#66b3ff"
+DISTRACT_COLOR = "#ff9999"
+CATEGORY_COLORS = {"Educational": STUDY_COLOR, "Non-Educational": DISTRACT_COLOR}
+CHART_MODES = ("image", "native")
+DEFAULT_MODE = os.environ.get("CHART_MODE", "image")
+IMAGE_CACHE_SIZE = int(os.environ.get("CHART_CACHE_SIZE", "256"))
+DPI = 100
+FIGSIZES = {"daily_bars": (7, 4), "pie": (5, 5), "app_totals": (7, 4), "forecast": (8, 4), "family": (7, 4)}
+
+
+# -----------------------------
+# PNG cache
+# -----------------------------
+_images = OrderedDict()
+_images_lock = threading.Lock()
+
+
+@functools.cache
+def _agg():
+    """``(Figure, FigureCanvasAgg)``, importing matplotlib on the first rendered image."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    return Figure, FigureCanvasAgg
+
+
+def render_png(draw, figsize) -> bytes:
+    """PNG bytes of ``draw(ax)`` on a fresh Agg figure (uncached)."""
+    Figure, FigureCanvasAgg = _agg()
+    fig = Figure(figsize=figsize, dpi=DPI)
+    FigureCanvasAgg(fig)
+    try:
+        draw(fig.add_subplot())
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", bbox_inches="tight")
+        return buf.getvalue()
+    finally:
+        fig.clear()
+
+
+def _scope(key):
+    # The caller's key comes last; the dashboard's start with the child id, or
+    # the username for family charts.
+    owner = key[-1][0] if isinstance(key[-1], tuple) and key[-1] else None
+    if isinstance(owner, int):
+        return shared_cache.child_scope(owner)
+    return shared_cache.family_scope(owner) if isinstance(owner, str) else None
+
+
+def cached_png(key, draw, figsize) -> bytes:
+    """PNG bytes for ``draw(ax)``, rendered once per ``key`` across processes (see ``shared_cache``)."""
+    with _images_lock:
+        if key in _images:
+            _images.move_to_end(key)
+            return _images[key]
+
+    def render():
+        with span(f"chart.render.{key[0]}"):
+            return render_png(draw, figsize)
+
+    png = shared_cache.get_or_compute("charts", key, render, scope=_scope(key))
+    with _images_lock:
+        _images[key] = png
+        while len(_images) > IMAGE_CACHE_SIZE:
+            _images.popitem(last=False)
+    return png
+
+
+def warm_up():
+    """Render a throwaway image, so the first real chart skips matplotlib's one-time setup (fonts)."""
+    if DEFAULT_MODE == "image":
+        render_png(lambda ax: ax.set_title("warm-up"), (1, 1))
+
+
+def clear_chart_cache():
+    with _images_lock:
+        _images.clear()
+
+
+# -----------------------------
+# Matplotlib drawings
+# -----------------------------
+# Each returns ``draw(ax)`` for :func:`cached_png` or :func:`render_png`
+# (weekly_reports.py renders the same charts outside Streamlit).
+def draw_daily_category_bars(daily_usage: pd.DataFrame):
+    def draw(ax):
+        from matplotlib.dates import AutoDateLocator, ConciseDateFormatter
+
+        # Bars on a date axis: tick labels stay readable and rendering does not
+        # grow with one categorical label per day.
+        bottom = 0
+        for category in daily_usage.columns:
+            values = daily_usage[category].to_numpy()
+            ax.bar(daily_usage.index, values, bottom=bottom, width=0.8, color=CATEGORY_COLORS.get(category), label=category)
+            bottom = bottom + values
+        locator = AutoDateLocator()
+        ax.xaxis.set_major_locator(locator)
+        ax.xaxis.set_major_formatter(ConciseDateFormatter(locator))
+        ax.set_title("Daily study vs distraction")
+        ax.set_ylabel("Minutes")
+        ax.legend()
+
+    return draw
+
+
+def draw_category_pie(category_usage: pd.Series, title: str):
+    def draw(ax):
+        ax.pie(category_usage, labels=category_usage.index, autopct="%1.1f%%",
+               colors=[CATEGORY_COLORS.get(c) for c in category_usage.index], startangle=90)
+        ax.set_title(title)
+
+    return draw
+
+
+def draw_app_totals(totals: pd.Series, categories: dict):
+    def draw(ax):
+        colors = [DISTRACT_COLOR if categories.get(a) == "Non-Educational" else STUDY_COLOR for a in totals.index]
+        ax.bar(totals.index, totals.values, color=colors)
+        ax.set_title("App usage")
+        ax.set_ylabel("Minutes")
+        ax.tick_params(axis="x", labelrotation=30)
+        for label in ax.get_xticklabels():
+            label.set_horizontalalignment("right")
+
+    return draw
+
+
+def draw_forecast(forecast):
+    def draw(ax):
+        ax.plot(pd.to_datetime(forecast.dates), forecast.actual, marker="o", label="Actual")
+        ax.plot(pd.to_datetime(forecast.future_dates), forecast.predictions,
+                marker="x", linestyle="--", color="red", label="Forecast")
+        ax.set_title(f"Usage forecast for {forecast.app}")
+        ax.set_ylabel("Minutes")
+        ax.legend()
+
+    return draw
+
+
+def draw_family_comparison(minutes: pd.DataFrame):
+    def draw(ax):
+        minutes.plot(kind="bar", stacked=True, ax=ax, color=list(CATEGORY_COLORS.values()))
+        ax.set_title("Study vs distraction by child")
+        ax.set_xlabel("")
+        ax.set_ylabel("Minutes")
+        ax.tick_params(axis="x", labelrotation=0)
+
+    return draw
+
+
+# -----------------------------
+# Charts
+# -----------------------------
+def show_daily_category_bars(daily_usage: pd.DataFrame, key, mode: str = DEFAULT_MODE):
+    """Stacked study vs distraction bars; ``daily_usage`` is Date x category minutes."""
+    if mode == "native":
+        data = daily_usage.rename_axis("Date").reset_index().melt("Date", var_name="category", value_name="minutes")
+        data["Date"] = data["Date"].dt.strftime("%Y-%m-%d")
+        st.vega_lite_chart(data, {
+            "title": "Daily study vs distraction",
+            "mark": "bar",
+            "encoding": {
+                "x": {"field": "Date", "type": "ordinal"},
+                "y": {"field": "minutes", "type": "quantitative", "stack": "zero", "title": "Minutes"},
+                "color": _category_color(),
+            },
+        }, use_container_width=True)
+        return
+
+    st.image(cached_png(("daily_bars", key), draw_daily_category_bars(daily_usage), FIGSIZES["daily_bars"]))
+
+
+def show_category_pie(category_usage: pd.Series, title: str, key, mode: str = DEFAULT_MODE):
+    if mode == "native":
+        data = category_usage.rename_axis("category").reset_index(name="minutes")
+        st.vega_lite_chart(data, {
+            "title": title,
+            "mark": {"type": "arc"},
+            "encoding": {
+                "theta": {"field": "minutes", "type": "quantitative"},
+                "color": _category_color(),
+            },
+        }, use_container_width=True)
+        return
+
+    st.image(cached_png(("pie", key), draw_category_pie(category_usage, title), FIGSIZES["pie"]))
+
+
+def show_app_totals(totals: pd.Series, categories: dict, key, mode: str = DEFAULT_MODE):
+    if mode == "native":
+        data = totals.rename_axis("app").reset_index(name="minutes")
+        data["category"] = data["app"].map(categories)
+        st.vega_lite_chart(data, {
+            "title": "App usage",
+            "mark": "bar",
+            "encoding": {
+                "x": {"field": "app", "type": "nominal", "sort": None},
+                "y": {"field": "minutes", "type": "quantitative", "title": "Minutes"},
+                "color": _category_color(),
+            },
+        }, use_container_width=True)
+        return
+
+    st.image(cached_png(("app_totals", key), draw_app_totals(totals, categories), FIGSIZES["app_totals"]))
+
+
+def show_forecast(forecast, key, mode: str = DEFAULT_MODE):
+    if mode == "native":
+        data = pd.concat([
+            pd.DataFrame({"Date": forecast.dates, "minutes": forecast.actual, "series": "Actual"}),
+            pd.DataFrame({"Date": forecast.future_dates, "minutes": forecast.predictions, "series": "Forecast"}),
+        ])
+        st.vega_lite_chart(data, {
+            "title": f"Usage forecast for {forecast.app}",
+            "mark": {"type": "line", "point": True},
+            "encoding": {
+                "x": {"field": "Date", "type": "temporal"},
+                "y": {"field": "minutes", "type": "quantitative", "title": "Minutes"},
+                "color": {"field": "series", "type": "nominal",
+                          "scale": {"domain": ["Actual", "Forecast"], "range": ["#1f77b4", "red"]}},
+                "strokeDash": {"field": "series", "type": "nominal"},
+            },
+        }, use_container_width=True)
+        return
+
+    st.image(cached_png(("forecast", forecast.app, forecast.model, key), draw_forecast(forecast), FIGSIZES["forecast"]))
+
+
+def show_family_comparison(summary: pd.DataFrame, key, mode: str = DEFAULT_MODE):
+    """Stacked study vs distraction minutes per child; ``summary`` is indexed by child name."""
+    minutes = summary[["total_study", "total_distract"]].set_axis(list(CATEGORY_COLORS), axis=1)
+    if mode == "native":
+        data = minutes.rename_axis("child").reset_index().melt("child", var_name="category", value_name="minutes")
+        st.vega_lite_chart(data, {
+            "title": "Study vs distraction by child",
+            "mark": "bar",
+            "encoding": {
+                "x": {"field": "child", "type": "nominal", "sort": None},
+                "y": {"field": "minutes", "type": "quantitative", "stack": "zero", "title": "Minutes"},
+                "color": _category_color(),
+            },
+        }, use_container_width=True)
+        return
+
+    st.image(cached_png(("family", key), draw_family_comparison(minutes), FIGSIZES["family"]))
+
+
+def show_trace_waterfall(trace: dict):
+    """Per-rerun waterfall of ``telemetry`` spans plus their SQL counters."""
+    spans = pd.DataFrame(trace["spans"])
+    st.caption(
+        f"{trace['duration_ms']:.0f} ms · {trace['sql_queries']} SQL statements ({trace['sql_ms']:.0f} ms) · "
+        f"{trace['rows']:,} rows fetched"
+    )
+    if spans.empty:
+        return
+    spans["label"] = ["· " * d + n for d, n in zip(spans["depth"], spans["name"])]
+    spans["end"] = spans["start"] + spans["duration"]
+    st.vega_lite_chart(spans, {
+        "mark": "bar",
+        "encoding": {
+            "y": {"field": "label", "type": "nominal", "sort": None, "title": None},
+            "x": {"field": "start", "type": "quantitative", "title": "ms"},
+            "x2": {"field": "end"},
+            "color": {"field": "depth", "type": "ordinal", "legend": None},
+            "tooltip": [{"field": "name"}, {"field": "duration", "title": "ms"},
+                        {"field": "sql_queries", "title": "SQL"}, {"field": "sql_ms", "title": "SQL ms"},
+                        {"field": "rows"}],
+        },
+    }, use_container_width=True)
+    st.dataframe(spans[["label", "duration", "sql_queries", "sql_ms", "rows"]].rename(columns={"duration": "ms"}),
+                 hide_index=True)
+
+
+def _category_color():
+    return {
+        "field": "category",
+        "type": "nominal",
+        "scale": {"domain": list(CATEGORY_COLORS), "range": list(CATEGORY_COLORS.values())},
+    }
@@ -0,0 +1,134 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from migrations import migrate
+from telemetry import CONNECTION_FACTORY, traced
+
+DB_NAME = os.environ.get("CHILD_USAGE_DB", "child_usage.db")
+POOL_SIZE = int(os.environ.get("CHILD_USAGE_DB_POOL", "8"))
+
+# WAL lets readers run alongside the single writer; the rest keeps hot pages
+# in memory and makes writers wait instead of failing with "database is locked".
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=134217728",
+)
+
+
+# -----------------------------
+# Connection pool
+# -----------------------------
+class ConnectionPool:
+    """Thread-safe pool of long-lived SQLite connections to one database file."""
+
+    def __init__(self, path: str = DB_NAME, size: int = POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @traced("db.connect")
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None,
+                               factory=CONNECTION_FACTORY)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self, timeout: float = 30.0):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return self._connect()
+        return self._idle.get(timeout=timeout)
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        self._created = 0
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path: str = None) -> ConnectionPool:
+    """Return the process-wide pool for ``path`` (one per server process)."""
+    path = path or DB_NAME
+    pool = _pools.get(path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(path)
+            if pool is None:
+                pool = _pools[path] = ConnectionPool(path)
+    return pool
+
+
+@contextmanager
+def connection(path: str = None):
+    """Borrow a pooled connection (autocommit mode) for reads."""
+    pool = get_pool(path)
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
+@contextmanager
+def transaction(path: str = None):
+    """Borrow a pooled connection wrapped in a single write transaction."""
+    pool = get_pool(path)
+    conn = pool.acquire()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+    finally:
+        pool.release(conn)
+
+
+# -----------------------------
+# Schema setup (once per process)
+# -----------------------------
+_initialized = set()
+_init_lock = threading.Lock()
+
+
+@traced("db.init")
+def init_db(path: str = None):
+    """Migrate the schema the first time it is called for ``path`` in this process."""
+    path = path or DB_NAME
+    if path in _initialized:
+        return
+    with _init_lock:
+        if path in _initialized:
+            return
+        with transaction(path) as conn:
+            migrate(conn)
+        _initialized.add(path)
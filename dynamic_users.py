@@ -1,104 +1,183 @@
+import hmac
+import os
+import secrets
 import sqlite3
+import threading
+import time
+
 import streamlit as st
 
-DB_NAME = "child_usage.db"
+from db import DB_NAME, connection, init_db, transaction
+from passwords import hash_password, verify_password, verify_unknown
+from shared_cache import family_scope, invalidate as invalidate_shared
 
 # -----------------------------
 # Database initialization
 # -----------------------------
 def init_user_tables():
-    conn = sqlite3.connect(DB_NAME, check_same_thread=False)
-    cur = conn.cursor()
-
-    # Parents table
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS parents (
-        parent_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE,
-        password TEXT
-    )
-    """)
-
-    # Children table
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS children (
-        child_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        parent_id INTEGER,
-        child_name TEXT,
-        FOREIGN KEY(parent_id) REFERENCES parents(parent_id)
-    )
-    """)
-
-    conn.commit()
-    conn.close()
+    # Runs the schema only once per process; later calls are a set lookup.
+    init_db()
 
 
 # -----------------------------
 # Parent & child operations
 # -----------------------------
 def add_parent(username: str, password: str):
-    conn = sqlite3.connect(DB_NAME)
-    cur = conn.cursor()
     try:
-        cur.execute(
-            "INSERT INTO parents (username, password) VALUES (?, ?)",
-            (username, password)
-        )
-        conn.commit()
+        with transaction() as conn:
+            conn.execute(
+                "INSERT INTO parents (username, password) VALUES (?, ?)",
+                (username, hash_password(password))
+            )
     except sqlite3.IntegrityError:
         pass
-    conn.close()
 
 
 def add_child(parent_username: str, child_name: str):
-    conn = sqlite3.connect(DB_NAME)
-    cur = conn.cursor()
+    with transaction() as conn:
+        parent = conn.execute(
+            "SELECT parent_id FROM parents WHERE username=?",
+            (parent_username,)
+        ).fetchone()
+
+        if parent:
+            conn.execute(
+                "INSERT INTO children (parent_id, child_name) VALUES (?, ?)",
+                (parent[0], child_name)
+            )
+    # Family-wide results cached by other server processes no longer list every child.
+    invalidate_shared(family_scope(parent_username))
 
-    cur.execute(
-        "SELECT parent_id FROM parents WHERE username=?",
-        (parent_username,)
-    )
-    parent = cur.fetchone()
 
-    if parent:
-        cur.execute(
-            "INSERT INTO children (parent_id, child_name) VALUES (?, ?)",
-            (parent[0], child_name)
-        )
-        conn.commit()
+def get_children_for_parent(parent_username):
+    with connection() as conn:
+        rows = conn.execute("""
+            SELECT c.child_name
+            FROM children c
+            JOIN parents p ON c.parent_id = p.parent_id
+            WHERE p.username = ?
+        """, (parent_username,)).fetchall()
 
-    conn.close()
+    return [row[0] for row in rows]
 
 
-def get_children_for_parent(parent_username):
-    conn = sqlite3.connect(DB_NAME)
-    cur = conn.cursor()
+def get_child_profiles(parent_username):
+    """``(child_id, child_name)`` pairs for a parent, oldest first."""
+    with connection() as conn:
+        return conn.execute("""
+            SELECT c.child_id, c.child_name
+            FROM children c
+            JOIN parents p ON c.parent_id = p.parent_id
+            WHERE p.username = ?
+            ORDER BY c.child_id
+        """, (parent_username,)).fetchall()
 
-    cur.execute("""
-        SELECT c.child_name
-        FROM children c
-        JOIN parents p ON c.parent_id = p.parent_id
-        WHERE p.username = ?
-    """, (parent_username,))
 
-    children = [row[0] for row in cur.fetchall()]
-    conn.close()
-    return children
+def get_parent_id(parent_username):
+    """``parent_id`` of a parent account, or ``None``."""
+    with connection() as conn:
+        row = conn.execute("SELECT parent_id FROM parents WHERE username=?", (parent_username,)).fetchone()
+    return row[0] if row else None
 
 
 # -----------------------------
 # Authentication
 # -----------------------------
 def authenticate_parent(username, password):
-    conn = sqlite3.connect(DB_NAME)
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT parent_id FROM parents WHERE username=? AND password=?",
-        (username, password)
-    )
-    user = cur.fetchone()
-    conn.close()
-    return user is not None
+    """Verify credentials, upgrading legacy/weak hashes in place on success."""
+    if not username or not password:
+        return False
+    with connection() as conn:
+        user = conn.execute(
+            "SELECT parent_id, password FROM parents WHERE username=?",
+            (username,)
+        ).fetchone()
+    if user is None or not user[1]:
+        return verify_unknown(password)
+    ok, needs_rehash = verify_password(password, user[1])
+    if ok and needs_rehash:
+        with transaction() as conn:
+            conn.execute(
+                "UPDATE parents SET password=? WHERE parent_id=?",
+                (hash_password(password), user[0])
+            )
+    return ok
+
+
+# -----------------------------
+# Session tokens
+# -----------------------------
+SESSION_TTL_SECONDS = int(os.environ.get("SESSION_TTL_SECONDS", str(12 * 3600)))
+_sessions = {}  # token -> (username, expires_at), shared by this server process
+_sessions_lock = threading.Lock()
+# Keys the per-session login attempt marker, so no fast hash of a typed
+# password is kept in the session state.
+_ATTEMPT_KEY = secrets.token_bytes(32)
+
+
+def _issue_token(username: str) -> str:
+    token = secrets.token_urlsafe(32)
+    now = time.time()
+    with _sessions_lock:
+        # Abandoned tokens are never looked up again, so expire them here.
+        for expired in [t for t, (_, expires_at) in _sessions.items() if expires_at < now]:
+            del _sessions[expired]
+        _sessions[token] = (username, now + SESSION_TTL_SECONDS)
+    return token
+
+
+def current_parent(session=None):
+    """Username of the logged-in parent for this browser session, or ``None``.
+
+    Only a dictionary lookup: credentials are not re-checked on reruns.
+    """
+    session = st.session_state if session is None else session
+    token = session.get("auth_token")
+    if token is None:
+        return None
+    with _sessions_lock:
+        entry = _sessions.get(token)
+        if entry is None or entry[1] < time.time():
+            _sessions.pop(token, None)
+            entry = None
+    if entry is None:
+        session.pop("auth_token", None)
+        return None
+    return entry[0]
+
+
+def logout(session=None):
+    session = st.session_state if session is None else session
+    token = session.pop("auth_token", None)
+    with _sessions_lock:
+        _sessions.pop(token, None)
+
+
+def ensure_login(username, password, force=False, session=None):
+    """Return the logged-in username, verifying credentials at most once per attempt.
+
+    A valid session token for ``username`` short-circuits everything. Otherwise
+    the password is verified once for each new (username, password) pair, or
+    again when ``force`` (the Login button) is set.
+    """
+    session = st.session_state if session is None else session
+    logged_in = current_parent(session)
+    if logged_in is not None and logged_in == username:
+        return logged_in
+    if logged_in is not None:
+        logout(session)
+    if not username or not password:
+        return None
+
+    attempt = hmac.new(_ATTEMPT_KEY, f"{username}\0{password}".encode(), "sha256").hexdigest()
+    if not force and session.get("login_attempt") == attempt:
+        return None
+    session["login_attempt"] = attempt
+    if not authenticate_parent(username, password):
+        return None
+    session.pop("login_attempt", None)
+    session["auth_token"] = _issue_token(username)
+    return username
 
 
 # -----------------------------
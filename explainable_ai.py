@@ -1,55 +1,101 @@
+import pandas as pd
 import streamlit as st
 
+from population import BALANCE, app_metric, category_metric
+
+CONTRIBUTION_LABELS = {
+    "baseline": "Typical day",
+    "trend": "Trend",
+    "weekday": "Day-of-week pattern",
+    "level": "Recent level",
+}
+
+
+def population_reasons(standing, app: str, category: str = None) -> list:
+    """Sentences placing the child among all children, for the metrics that have a percentile."""
+    reasons = []
+    for metric, label in (
+        (app and app_metric(app), f"{app} averages {{}} mins/day"),
+        (category and category_metric(category), f"{category} usage averages {{}} mins/day"),
+        (BALANCE, "The balance score is {}"),
+    ):
+        found = standing.get(metric) if metric else None
+        if found is not None:
+            value, pct = found
+            reasons.append(f"{label.format(value)} over all days, higher than about {pct:.0f}% of children")
+    return reasons
+
+
+def explanation_reasons(
+    explanation: pd.DataFrame,
+    forecast_app: str,
+    daily_limit: int,
+    metrics,
+    standing=None,
+    category: str = None
+) -> list:
+    """The key factors behind ``forecast_app``'s forecast, as sentences (used by the panel and weekly reports)."""
+    row = explanation.set_index("app").loc[forecast_app]
+    reasons = [f"A typical day has {row['baseline']:.0f} mins of {forecast_app} over {row['n']} days of history"]
+    if abs(row["trend"]) >= 0.5:
+        change = f"adds {row['trend']:.0f} mins to" if row["trend"] > 0 else f"removes {-row['trend']:.0f} mins from"
+        reasons.append(f"The recent trend {change} next week's average")
+    if abs(row["weekday"]) >= 0.5:
+        reasons.append(f"The days ahead fall on its {'busier' if row['weekday'] > 0 else 'quieter'} weekdays ({row['weekday']:+.0f} mins)")
+    if abs(row["level"]) >= 0.5:
+        reasons.append(f"Recent usage runs {abs(row['level']):.0f} mins {'above' if row['level'] > 0 else 'below'} the long-run average")
+    reasons.append(f"Usage peaks on {row['peak_weekday']}s, with a {row['weekday_swing']:.0f} min swing across the week")
+    reasons.append(
+        f"The forecast is {'above' if row['avg_forecast'] > daily_limit else 'within'} the {daily_limit} min daily limit"
+    )
+
+    drivers = explanation[explanation["distraction_share"] > 0].nlargest(3, "distraction_share")
+    if not drivers.empty:
+        reasons.append("Distraction time comes mostly from " + ", ".join(
+            f"{app} ({share:.0%})" for app, share in zip(drivers["app"], drivers["distraction_share"])
+        ))
+    if metrics.total_distract > metrics.total_study:
+        reasons.append(f"Non-educational usage exceeds study time (balance score {metrics.healthy_balance_score})")
+    else:
+        reasons.append(f"Study time outweighs distraction usage (balance score {metrics.healthy_balance_score})")
+    if standing is not None:
+        reasons.extend(population_reasons(standing, forecast_app, category))
+    return reasons
+
+
 def show_explainable_ai_panel(
-    total_study: int,
-    total_distract: int,
-    healthy_balance_score: int,
+    explanation: pd.DataFrame,
     forecast_app: str,
-    avg_forecast: float,
     daily_limit: int,
-    category_map: dict
+    metrics,
+    standing=None,
+    category: str = None
 ):
-    st.subheader("🧠 Explainable AI Panel")
-
-    reasons = []
-    confidence = 0
+    """Render precomputed forecast explanations (see ``analytics.explain_forecasts``).
 
-    if total_distract > total_study:
-        reasons.append("Non-educational usage is higher than study time")
-        confidence += 35
-    else:
-        reasons.append("Study time outweighs distraction usage")
-        confidence += 25
+    ``standing`` (a ``population.Standing``) adds where the child's whole
+    history of ``forecast_app``, its ``category`` and balance score fall
+    among all children.
+    """
+    st.subheader("🧠 Explainable AI Panel")
 
-    if healthy_balance_score < 50:
-        reasons.append("Healthy balance score is low")
-        confidence += 30
-    else:
-        reasons.append("Healthy balance score is acceptable")
-        confidence += 20
-
-    if avg_forecast > daily_limit:
-        reasons.append(
-            f"Predicted future usage of {forecast_app} exceeds daily limit"
-        )
-        confidence += 25
-    else:
-        reasons.append(
-            f"Predicted future usage of {forecast_app} is within limit"
-        )
-        confidence += 15
+    row = explanation.set_index("app").loc[forecast_app]
+    contributions = row[list(CONTRIBUTION_LABELS)].astype(float)
+    contributions = contributions[contributions.abs() >= 0.5].rename(CONTRIBUTION_LABELS)
 
-    confidence = min(confidence, 95)
+    st.markdown(f"### 🔍 Why {forecast_app} is forecast at {row['avg_forecast']:.0f} mins/day")
+    st.bar_chart(contributions.rename("Minutes per day"))
 
-    st.markdown("### 🔍 AI Decision Explanation")
     st.write("**Key factors considered:**")
-
-    for r in reasons:
+    for r in explanation_reasons(explanation, forecast_app, daily_limit, metrics, standing, category):
         st.write(f"- {r}")
 
-    st.metric("AI Confidence Score", f"{confidence}%")
+    fit, history, share = st.columns(3)
+    fit.metric("Model fit (R²)", f"{max(row['r2'], 0):.0%}")
+    history.metric("History", f"{row['n']} days")
+    share.metric(f"{forecast_app} share of usage", f"{row['usage_share']:.0%}")
 
     st.info(
-        "This AI explains *why* decisions are made using historical usage, "
-        "category analysis, and future trends instead of black-box predictions."
+        "Each factor is computed from the forecast model and the usage history: the bars add up "
+        "to the forecast, and the fit score shows how well the model explains past days."
     )
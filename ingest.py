@@ -0,0 +1,184 @@
+"""Batched ingestion: synthetic seeding, editor diffs and chunked file imports."""
+import numpy as np
+import pandas as pd
+
+import population
+from catalog import get_catalog
+from db import transaction
+from usage_store import EPOCH, get_app_ids, to_day
+
+INSERT_SQL = "INSERT INTO usage_data (child_id, day, app_id, usage_minutes) VALUES (?, ?, ?, ?)"
+CHUNK_ROWS = 100_000
+
+
+# -----------------------------
+# Bulk writes
+# -----------------------------
+def bulk_insert(rows, chunk_rows: int = CHUNK_ROWS) -> int:
+    """Insert ``(child_id, day, app_id, usage_minutes)`` rows in one transaction.
+
+    ``rows`` may be any iterable (or an ``(n, 4)`` integer array); it is fed to
+    ``executemany`` in chunks so the whole batch never has to sit in a list.
+    Derived data (precomputed results, population sketches) is left to the
+    caller or the ``precompute.py`` scheduler.
+    """
+    if isinstance(rows, np.ndarray):
+        rows = rows.tolist()
+    total = 0
+    with transaction() as conn:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= chunk_rows:
+                conn.executemany(INSERT_SQL, batch)
+                total += len(batch)
+                batch.clear()
+        if batch:
+            conn.executemany(INSERT_SQL, batch)
+            total += len(batch)
+    return total
+
+
+# -----------------------------
+# Synthetic usage
+# -----------------------------
+def generate_synthetic_usage(child_ids, start, days: int, app_ids: dict = None,
+                             baselines: dict = None, seed=None) -> np.ndarray:
+    """Vectorized demo data: one row per (child, day, app) as an ``(n, 4)`` int array.
+
+    Minutes are drawn from each app's (mean, spread) baseline (the catalog's
+    unless given) and clipped to 20-180, like the original per-row seeding loop.
+    """
+    app_ids = app_ids or get_app_ids()
+    baselines = baselines or get_catalog().baselines
+    names = [name for name in baselines if name in app_ids]
+    means = np.array([baselines[name][0] for name in names], dtype=float)
+    spreads = np.array([baselines[name][1] for name in names], dtype=float)
+    child_ids = np.asarray(list(child_ids), dtype=np.int64)
+
+    rng = np.random.default_rng(seed)
+    shape = (len(child_ids), days, len(names))
+    minutes = rng.normal(means, spreads, size=shape).astype(np.int64)
+    minutes = np.clip(minutes, 20, 180)
+
+    child_col, day_col, app_col = np.meshgrid(
+        child_ids,
+        to_day(start) + np.arange(days, dtype=np.int64),
+        np.array([app_ids[name] for name in names], dtype=np.int64),
+        indexing="ij",
+    )
+    return np.column_stack([child_col.ravel(), day_col.ravel(), app_col.ravel(), minutes.ravel()])
+
+
+def seed_child(child_id: int, start="2026-02-03", days: int = 7, seed=None) -> int:
+    return bulk_insert(generate_synthetic_usage([child_id], start, days, seed=seed))
+
+
+# -----------------------------
+# Data editor diffs
+# -----------------------------
+def diff_editor_changes(original: pd.DataFrame, edited: pd.DataFrame) -> list:
+    """``(usage_minutes, id)`` pairs for rows whose minutes changed in the editor.
+
+    Rows added in the editor (no id) and untouched rows are skipped.
+    """
+    edited = edited.dropna(subset=["id", "usage_minutes"])
+    before = original.set_index("id")["usage_minutes"].astype("int64")
+    after = edited.set_index(edited["id"].astype("int64"))["usage_minutes"].astype("int64")
+    after = after[after.index.isin(before.index)]
+    changed = after[after.ne(before.reindex(after.index))]
+    return [(int(minutes), int(row_id)) for row_id, minutes in changed.items()]
+
+
+# -----------------------------
+# CSV / Parquet imports
+# -----------------------------
+def _iter_file_chunks(path: str, chunk_rows: int):
+    lower = path.lower()
+    if lower.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    elif lower.endswith((".csv", ".csv.gz")):
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+    else:
+        raise ValueError(f"Unsupported import format: {path}")
+
+
+AMBIGUOUS = -1  # a child name shared by several children
+
+
+def _child_lookup(conn) -> tuple:
+    """``({child_name: child_id}, {(username, child_name): child_id})``.
+
+    Names are only unique within a family; a name matching several children
+    maps to ``AMBIGUOUS``.
+    """
+    by_name, by_family = {}, {}
+    for username, name, child_id in conn.execute(
+        "SELECT p.username, c.child_name, c.child_id FROM children c LEFT JOIN parents p ON p.parent_id = c.parent_id"
+    ):
+        by_name[name] = AMBIGUOUS if name in by_name else child_id
+        by_family[username, name] = AMBIGUOUS if (username, name) in by_family else child_id
+    return by_name, by_family
+
+
+def _chunk_rows(chunk: pd.DataFrame, app_ids: dict, children: tuple):
+    missing = set(chunk["app"].unique()) - set(app_ids)
+    if missing:
+        raise ValueError(f"Unknown apps (add them with catalog.py first): {sorted(missing)}")
+
+    if "child_id" in chunk:
+        child_col = chunk["child_id"].astype("int64")
+    else:
+        by_name, by_family = children
+        if "parent" in chunk:
+            keys = pd.Series(list(zip(chunk["parent"], chunk["child"])), index=chunk.index)
+            child_col = pd.Series([by_family.get(k) for k in keys], index=chunk.index, dtype="float64")
+        else:
+            keys = chunk["child"]
+            child_col = keys.map(by_name).astype("float64")
+        if child_col.isna().any():
+            raise ValueError(f"Unknown children: {sorted(keys[child_col.isna()].unique())}")
+        if child_col.eq(AMBIGUOUS).any():
+            raise ValueError(f"Children named in several families (add a parent column or use child_id): "
+                             f"{sorted(keys[child_col.eq(AMBIGUOUS)].unique())}")
+        child_col = child_col.astype("int64")
+
+    if "day" in chunk:
+        day_col = chunk["day"].astype("int64")
+    else:
+        day_col = (pd.to_datetime(chunk["date"]) - pd.Timestamp(EPOCH)).dt.days
+
+    return zip(
+        child_col.tolist(),
+        day_col.tolist(),
+        chunk["app"].map(app_ids).astype("int64").tolist(),
+        chunk["usage_minutes"].fillna(0).astype("int64").tolist(),
+    )
+
+
+def import_usage_file(path: str, chunk_rows: int = CHUNK_ROWS, refresh_population: bool = True) -> int:
+    """Stream a CSV/Parquet file into ``usage_data`` in one transaction.
+
+    Columns: ``child_id`` (or ``child`` name, with the family's ``parent``
+    username unless the name is unique), ``date`` (or integer ``day``),
+    ``app`` and ``usage_minutes``. Apps must already be in the catalog (see
+    ``catalog.py``). Only one chunk is held in memory at a time.
+
+    Afterwards the imported children's population sketches are refreshed,
+    unless ``refresh_population`` is false.
+    """
+    total, touched = 0, set()
+    with transaction() as conn:
+        app_ids = get_app_ids(conn)
+        children = _child_lookup(conn)
+        for chunk in _iter_file_chunks(path, chunk_rows):
+            rows = list(_chunk_rows(chunk, app_ids, children))
+            conn.executemany(INSERT_SQL, rows)
+            touched.update(row[0] for row in rows)
+            total += len(rows)
+    if refresh_population and touched:
+        population.refresh(sorted(touched))
+    return total
@@ -0,0 +1,320 @@
+"""Streaming ingestion daemon for device usage events.
+
+Device agents send one JSON object per app-minute, e.g.
+``{"child_id": 3, "app": "YouTube", "ts": "2026-02-03T18:04:00", "minutes": 1}``
+either as JSON lines over TCP or as an HTTP ``POST /events`` body (a JSON
+array or JSON lines). Events are summed in memory into (child, day, app)
+buckets and flushed to ``usage_data`` in one batched transaction every
+``--flush-interval`` seconds, or sooner when too many buckets are pending.
+Only whole minutes are written; a bucket's fractional remainder stays pending
+until it adds up (the final flush on shutdown rounds it). A failed write
+(e.g. the database is locked) puts the rows back for the next flush.
+
+The children written since are refreshed in the population sketches every
+``--population-interval`` seconds (see ``population.py``), coalesced so a
+busy child costs one recomputation per interval.
+
+App names must already be in the ``apps`` catalog (add new ones with
+``catalog.py``); events for unknown apps or children are rejected.
+
+Backpressure: connections await a bounded queue, so a slow flush throttles
+readers through TCP flow control instead of growing memory without limit.
+
+    python ingest_service.py --tcp-port 8765 --http-port 8080
+    curl -X POST localhost:8080/events -d '{"child_id": 1, "app": "YouTube"}'
+    curl localhost:8080/stats
+"""
+import argparse
+import asyncio
+import datetime as dt
+import json
+import logging
+import math
+import sqlite3
+import time
+
+import population
+from db import connection, init_db, transaction
+from ingest import INSERT_SQL
+from usage_store import get_app_ids, to_day
+
+QUEUE_SIZE = 50_000
+FLUSH_INTERVAL = 1.0
+MAX_PENDING_BUCKETS = 100_000
+LATENCY_SAMPLES = 10_000
+POPULATION_INTERVAL = 30.0
+
+log = logging.getLogger(__name__)
+
+
+class IngestService:
+    def __init__(self, flush_interval=FLUSH_INTERVAL, queue_size=QUEUE_SIZE,
+                 max_pending=MAX_PENDING_BUCKETS, population_interval=POPULATION_INTERVAL):
+        self.flush_interval = flush_interval
+        self.population_interval = population_interval
+        self.max_pending = max_pending
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.buckets = {}  # (child_id, day, app_id) -> [minutes, first_received]
+        self.touched = set()  # children written since the last population refresh
+        self.app_ids = get_app_ids()
+        self.child_ids = self._load_child_ids()
+        self.flush_needed = asyncio.Event()
+        self.flushed = asyncio.Event()
+        self.stats = {"received": 0, "accepted": 0, "rejected": 0, "flushed_events": 0,
+                      "flushed_rows": 0, "flushes": 0, "failed_flushes": 0,
+                      "population_refreshes": 0}
+        self.latencies = []
+        self.started = time.time()
+        self._events_in_buckets = 0
+
+    # -----------------------------
+    # Lookups
+    # -----------------------------
+    def _load_child_ids(self):
+        with connection() as conn:
+            return {row[0] for row in conn.execute("SELECT child_id FROM children")}
+
+    def _resolve_app(self, name):
+        app_id = self.app_ids.get(name)
+        if app_id is None:  # the catalog may have gained apps since startup
+            self.app_ids = get_app_ids()
+            app_id = self.app_ids.get(name)
+        return app_id
+
+    def _parse(self, event):
+        child_id = int(event["child_id"])
+        if child_id not in self.child_ids:
+            self.child_ids = self._load_child_ids()
+            if child_id not in self.child_ids:
+                raise ValueError(f"unknown child {child_id}")
+        app_id = self._resolve_app(event["app"])
+        if app_id is None:
+            raise ValueError(f"unknown app {event['app']!r}")
+        ts = event.get("ts")
+        if ts is None:
+            day = to_day(dt.date.today())
+        elif isinstance(ts, (int, float)):
+            day = int(ts // 86400)
+        else:
+            day = to_day(ts)
+        minutes = float(event.get("minutes", 1))
+        if not math.isfinite(minutes) or minutes < 0:
+            raise ValueError(f"invalid minutes {minutes!r}")
+        return (child_id, day, app_id), minutes
+
+    # -----------------------------
+    # Pipeline
+    # -----------------------------
+    async def submit(self, event):
+        self.stats["received"] += 1
+        await self.queue.put((event, time.perf_counter()))
+
+    async def aggregate(self):
+        while True:
+            event, received = await self.queue.get()
+            try:
+                key, minutes = self._parse(event)
+            except (KeyError, TypeError, ValueError):
+                self.stats["rejected"] += 1
+                continue
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                self.buckets[key] = [minutes, received]
+            else:
+                bucket[0] += minutes
+            self.stats["accepted"] += 1
+            self._events_in_buckets += 1
+            if len(self.buckets) >= self.max_pending:
+                self.flush_needed.set()
+                self.flushed.clear()
+                await self.flushed.wait()
+
+    async def flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.flush_needed.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            if not await self.flush():
+                await asyncio.sleep(self.flush_interval)  # back off before retrying
+
+    async def flush(self, final=False):
+        """Write the whole minutes of every bucket; returns False if the write failed."""
+        self.flush_needed.clear()
+        buckets, self.buckets = self.buckets, {}
+        events, self._events_in_buckets = self._events_in_buckets, 0
+        rows, firsts = [], []
+        for key, (minutes, first) in buckets.items():
+            whole = int(round(minutes)) if final else int(minutes)
+            if whole > 0:
+                rows.append((*key, whole))
+                firsts.append(first)
+            if minutes - whole > 1e-9 and not final:
+                self.buckets[key] = [minutes - whole, first]
+        ok = True
+        if rows:
+            try:
+                await asyncio.to_thread(self._write, rows)
+            except sqlite3.Error:
+                log.warning("flush of %d rows failed; retrying with the next flush", len(rows), exc_info=True)
+                self.stats["failed_flushes"] += 1
+                self._restore(rows, firsts)
+                self._events_in_buckets += events
+                ok = False
+            else:
+                done = time.perf_counter()
+                self.latencies.extend(done - first for first in firsts)
+                del self.latencies[:-LATENCY_SAMPLES]
+                self.stats["flushes"] += 1
+                self.stats["flushed_rows"] += len(rows)
+                self.stats["flushed_events"] += events
+                self.touched.update(row[0] for row in rows)
+        self.flushed.set()
+        return ok
+
+    async def population_loop(self):
+        while True:
+            await asyncio.sleep(self.population_interval)
+            await self.refresh_population()
+
+    async def refresh_population(self):
+        """Bring the written children's population sketches up to date."""
+        children, self.touched = self.touched, set()
+        if not children:
+            return
+        try:
+            await asyncio.to_thread(population.refresh, sorted(children))
+        except sqlite3.Error:
+            log.warning("population refresh of %d children failed; retrying later", len(children), exc_info=True)
+            self.touched |= children
+        else:
+            self.stats["population_refreshes"] += 1
+
+    def _restore(self, rows, firsts):
+        """Add unwritten rows back into the buckets, which may have filled meanwhile."""
+        for (child_id, day, app_id, minutes), first in zip(rows, firsts):
+            bucket = self.buckets.setdefault((child_id, day, app_id), [0.0, first])
+            bucket[0] += minutes
+            bucket[1] = min(bucket[1], first)
+
+    @staticmethod
+    def _write(rows):
+        with transaction() as conn:
+            conn.executemany(INSERT_SQL, rows)
+
+    def snapshot(self):
+        lat = sorted(self.latencies)
+        pct = (lambda q: round(lat[int(q * (len(lat) - 1))] * 1000, 1)) if lat else (lambda q: None)
+        elapsed = time.time() - self.started
+        return dict(
+            self.stats,
+            queue_depth=self.queue.qsize(),
+            pending_buckets=len(self.buckets),
+            uptime_s=round(elapsed, 1),
+            events_per_s=round(self.stats["accepted"] / elapsed, 1) if elapsed else 0,
+            latency_ms_p50=pct(0.5),
+            latency_ms_p95=pct(0.95),
+        )
+
+    # -----------------------------
+    # Transports
+    # -----------------------------
+    async def handle_tcp(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    await self.submit(json.loads(line))
+                except json.JSONDecodeError:
+                    self.stats["rejected"] += 1
+        finally:
+            writer.close()
+
+    async def handle_http(self, reader, writer):
+        try:
+            while True:
+                request = await reader.readline()
+                if not request:
+                    break
+                method, path, _ = request.decode("latin-1").split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                if method == "POST" and path == "/events":
+                    status, payload = await self._post_events(body)
+                elif method == "GET" and path == "/stats":
+                    status, payload = "200 OK", self.snapshot()
+                else:
+                    status, payload = "404 Not Found", {"error": "not found"}
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _post_events(self, body):
+        text = body.decode()
+        try:
+            if text.lstrip().startswith("["):
+                events = json.loads(text)
+            else:
+                events = [json.loads(line) for line in text.splitlines() if line.strip()]
+        except json.JSONDecodeError:
+            return "400 Bad Request", {"error": "invalid JSON"}
+        for event in events:
+            await self.submit(event)
+        return "202 Accepted", {"queued": len(events)}
+
+
+async def serve(host="127.0.0.1", tcp_port=8765, http_port=8080, **options):
+    init_db()
+    service = IngestService(**options)
+    tasks = [asyncio.create_task(service.aggregate()), asyncio.create_task(service.flush_loop())]
+    if service.population_interval > 0:
+        tasks.append(asyncio.create_task(service.population_loop()))
+    servers = []
+    if tcp_port:
+        servers.append(await asyncio.start_server(service.handle_tcp, host, tcp_port))
+    if http_port:
+        servers.append(await asyncio.start_server(service.handle_http, host, http_port))
+    print(f"ingest service listening on {host} (tcp {tcp_port}, http {http_port})")
+    try:
+        await asyncio.gather(*(s.serve_forever() for s in servers), *tasks)
+    finally:
+        await service.flush(final=True)
+        await service.refresh_population()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--tcp-port", type=int, default=8765)
+    parser.add_argument("--http-port", type=int, default=8080)
+    parser.add_argument("--flush-interval", type=float, default=FLUSH_INTERVAL)
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE)
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING_BUCKETS)
+    parser.add_argument("--population-interval", type=float, default=POPULATION_INTERVAL,
+                        help="seconds between population sketch refreshes (0 = leave it to precompute.py)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.tcp_port, args.http_port,
+                          flush_interval=args.flush_interval, queue_size=args.queue_size,
+                          max_pending=args.max_pending, population_interval=args.population_interval))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
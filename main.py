@@ -1,22 +1,60 @@
 from dynamic_users import (
     init_user_tables,
-    authenticate_parent,
-    get_children_for_parent,
+    current_parent,
+    ensure_login,
+    logout,
+    get_child_profiles,
+    get_parent_id,
     parent_child_ui
 )
-from premium_ui import apply_premium_ui, show_hero_banner, metric_row, section
-from explainable_ai import show_explainable_ai_panel
+from premium_ui import apply_premium_ui, show_hero_banner, metric_row
+from telemetry import finish_trace, section, start_trace
+from warmup import prewarm
+
+import datetime as dt
+import math
+import os
+import time
 
 import streamlit as st
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-from sklearn.linear_model import LinearRegression
-import sqlite3
+
+PAGE_SIZES = (25, 50, 100, 250, 500)
+DEFAULT_PAGE_SIZE = int(os.environ.get("RAW_PAGE_SIZE", "50"))
+EDITOR_MAX_ROWS = int(os.environ.get("EDITOR_MAX_ROWS", "500"))
+EDITOR_WINDOW_DAYS = 7
+# Rolling windows end at the child's most recent day with data.
+DATE_WINDOWS = {
+    "All days": None,
+    "Last 7 days": 7,
+    "Last 30 days": 30,
+    "Last 90 days": 90,
+    "Single day": None,
+    "Custom range": None,
+}
+FAMILY_WINDOWS = ("All days", "Last 7 days", "Last 30 days", "Last 90 days")
+
+start_trace()
+
+
+def show_rerun_trace():
+    """Finish this rerun's trace and, when tracing is on, show it in the sidebar."""
+    trace = finish_trace()
+    if trace is not None:
+        from charts import show_trace_waterfall
+        from shared_cache import stats as shared_cache_stats
+
+        with st.sidebar.expander("🛠 Rerun trace"):
+            show_trace_waterfall(trace)
+            st.caption("Shared cache (this process): " + " · ".join(
+                f"{name} {s['hit_rate']:.0%} hits, p95 {s['p95_ms']:.1f} ms"
+                for name, s in shared_cache_stats().items()
+            ))
+
 
 # -----------------------------
 # Initialize DB tables
 # -----------------------------
+section("setup")
 init_user_tables()
 
 # -----------------------------
@@ -29,16 +67,24 @@ st.title("👨‍👩‍👧 Parent-Child Education Analytics Dashboard")
 # -----------------------------
 # Demo authentication
 # -----------------------------
+section("auth")
 with st.sidebar:
     st.header("🔐 Login")
     username = st.text_input("Parent username", value="")
     password = st.text_input("Password", type="password", value="")
     login = st.button("Login")
+    if current_parent() is not None and st.button("Logout"):
+        logout()
 
     parent_child_ui()  # sidebar UI for creating parent/child
 
-if not authenticate_parent(username, password):
+# Credentials are verified once per login; later reruns only check the session token.
+username = ensure_login(username, password, force=login)
+if username is None:
     st.info("Use valid credentials or create parent account first")
+    show_rerun_trace()
+    # The login page is out; load the dashboard's modules while the parent types.
+    prewarm()
     st.stop()
 
 st.success("✅ Logged in successfully")
@@ -47,98 +93,230 @@ show_hero_banner()
 # -----------------------------
 # Child profiles
 # -----------------------------
-children = get_children_for_parent(username)
+section("children")
+children = dict(get_child_profiles(username))
 
 if not children:
     st.warning("No children found for this parent. Please add children from sidebar.")
+    show_rerun_trace()
+    prewarm()
     st.stop()
 
-selected_child = st.selectbox("Select child profile", children)
-
 # -----------------------------
-# Apps & categories
-# -----------------------------
-apps = ["YouTube", "Google Classroom", "WhatsApp", "VS-Code", "Instagram", "MS Teams"]
-categories = {
-    "YouTube": "Non-Educational",
-    "Google Classroom": "Educational",
-    "WhatsApp": "Non-Educational",
-    "VS-Code": "Educational",
-    "Instagram": "Non-Educational",
-    "MS Teams": "Educational",
-}
-app_baselines = {
-    "YouTube": (80, 30),
-    "Google Classroom": (70, 25),
-    "WhatsApp": (60, 20),
-    "VS-Code": (65, 25),
-    "Instagram": (75, 30),
-    "MS Teams": (60, 20),
-}
+# Dashboard modules
+# -----------------------------
+# Imported past the login gate so the login page only pays for streamlit and
+# the user tables; usually the prewarm thread has already loaded them.
+section("imports")
+from explainable_ai import population_reasons, show_explainable_ai_panel  # noqa: E402
+from analytics import (  # noqa: E402
+    MODELS as FORECAST_MODELS,
+    balance_recommendations,
+    cached_explanations,
+    cached_family_summary,
+    cached_forecasts,
+    compute_metrics,
+    daily_alerts,
+    forecast_recommendations,
+    usage_suggestions,
+    weekly_alerts
+)
+from alert_engine import get_thresholds, get_thresholds_many, load_alerts, set_thresholds  # noqa: E402
+from archive import archived_through  # noqa: E402
+from catalog import get_catalog, recategorize  # noqa: E402
+from charts import (  # noqa: E402
+    CHART_MODES,
+    DEFAULT_MODE,
+    show_app_totals,
+    show_category_pie,
+    show_daily_category_bars,
+    show_family_comparison,
+    show_forecast
+)
+from ingest import diff_editor_changes, seed_child  # noqa: E402
+from population import BALANCE, app_metric, child_standing  # noqa: E402
+from precompute import get_results, request as request_precompute  # noqa: E402
+from query_engine import child_view, get_engine  # noqa: E402
+from shared_cache import child_scope, family_scope, invalidate as invalidate_shared  # noqa: E402
+from usage_store import (  # noqa: E402
+    PAGE_SORTS,
+    count_usage,
+    data_version,
+    day_bounds,
+    day_bounds_many,
+    from_day,
+    get_daily_usage,
+    get_daily_usage_many,
+    get_days,
+    get_usage_page,
+    has_usage,
+    insert_usage,
+    invalidate_usage,
+    to_day,
+    update_minutes
+)
 
 # -----------------------------
-# Database setup
+# Apps & categories
 # -----------------------------
-conn = sqlite3.connect("child_usage.db", check_same_thread=False)
-cursor = conn.cursor()
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS usage_data (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    child TEXT,
-    date TEXT,
-    app TEXT,
-    category TEXT,
-    usage_minutes INTEGER
-)
-""")
-conn.commit()
+section("seed")
+# One shared catalog snapshot per process; categories follow the family's overrides.
+catalog = get_catalog()
+parent_id = get_parent_id(username)
+with st.sidebar.expander("🏷 App categories"):
+    family_categories = catalog.category_map(parent_id)
+    edit_app = st.selectbox("App", options=list(family_categories))
+    category_options = sorted(set(catalog.category_dtype.categories) | {"Educational", "Non-Educational"})
+    edit_category = st.selectbox(
+        "Category for your family", options=category_options,
+        index=category_options.index(family_categories[edit_app]),
+    )
+    if edit_category != family_categories[edit_app] and st.button(f"Save category for {edit_app}"):
+        recategorize({edit_app: edit_category}, parent_id)
+        catalog = get_catalog()
+        st.success("Category saved; charts and forecasts are re-labelled without touching usage rows.")
+categories = catalog.category_map(parent_id)
+apps = list(categories)
+app_ids = catalog.app_ids
+
+# Seed initial data for children without records
+for child_id, child_name in children.items():
+    if not has_usage(child_id):
+        seed_child(child_id, start="2026-02-03", days=7, seed=abs(hash(child_name)) % (2**32))
 
-# Seed initial data if child has no records
-cursor.execute("SELECT COUNT(*) FROM usage_data WHERE child=?", (selected_child,))
-if cursor.fetchone()[0] == 0:
-    np.random.seed(abs(hash(selected_child)) % (2**32))
-    for day in pd.date_range(start="2026-02-03", periods=7):
-        for app in apps:
-            base, spread = app_baselines[app]
-            usage = max(0, int(np.random.normal(loc=base, scale=spread)))
-            usage = int(np.clip(usage, 20, 180))
-            cursor.execute("""
-                INSERT INTO usage_data (child, date, app, category, usage_minutes)
-                VALUES (?, ?, ?, ?, ?)
-            """, (selected_child, str(day.date()), app, categories[app], usage))
-    conn.commit()
+with st.sidebar:
+    st.header("📊 Charts")
+    chart_mode = st.radio(
+        "Chart rendering",
+        options=list(CHART_MODES),
+        index=CHART_MODES.index(DEFAULT_MODE),
+        format_func={"image": "Static images (cached)", "native": "Interactive (native)"}.get,
+    )
+
+view = st.radio("View", options=["Child dashboard", "Family overview"], horizontal=True)
+
+# -----------------------------
+# Family overview
+# -----------------------------
+# Every child of the parent is analysed in one grouped pass over a single
+# multi-child query; results are cached per parent, window and data versions.
+if view == "Family overview":
+    section("family")
+    family_ids = list(children)
+    family_window = st.selectbox("Date range", options=FAMILY_WINDOWS)
+    family_start = family_end = None
+    if DATE_WINDOWS[family_window]:
+        family_end = day_bounds_many(family_ids)[1]
+        family_start = family_end - DATE_WINDOWS[family_window] + 1
+    versions, family_daily = get_daily_usage_many(family_ids, family_start, family_end)
+    family_key = (username, versions, family_start, family_end)
+    summary = cached_family_summary(
+        family_key, family_daily, categories, family_ids, get_thresholds_many(family_ids)
+    ).rename(index=children)
+
+    family_metrics = compute_metrics(family_daily)
+    metric_row(
+        family_metrics.total_study,
+        family_metrics.total_distract,
+        family_metrics.total_all,
+        family_metrics.healthy_balance_score
+    )
+    st.subheader("Study vs distraction by child")
+    show_family_comparison(summary, family_key, chart_mode)
+    st.subheader("Comparison")
+    st.dataframe(
+        summary.rename_axis("Child").rename(columns={
+            "total_study": "Study mins",
+            "total_distract": "Distraction mins",
+            "total_all": "Total mins",
+            "healthy_balance_score": "Balance score",
+            "top_app": "Top app",
+            "daily_alerts": "Daily alerts",
+            "weekly_alerts": "Weekly alerts",
+            "forecast_minutes": "Forecast mins/day",
+            "forecast_distract": "Forecast distraction mins/day",
+            "forecast_over_limit": "Apps forecast over limit",
+            "daily_limit": "Daily limit",
+            "weekly_limit": "Weekly limit",
+        }),
+        column_config={
+            "Forecast mins/day": st.column_config.NumberColumn(format="%.0f"),
+            "Forecast distraction mins/day": st.column_config.NumberColumn(format="%.0f"),
+        },
+    )
+    for name, row in summary.iterrows():
+        if row["daily_alerts"] or row["weekly_alerts"]:
+            st.error(f"{name}: {row['daily_alerts']} daily and {row['weekly_alerts']} weekly limit alerts in this range")
+    show_rerun_trace()
+    st.stop()
 
-# -----------------------------
-# Fetch data
-# -----------------------------
-df = pd.read_sql_query("SELECT * FROM usage_data WHERE child=?", conn, params=(selected_child,))
-df["Date"] = pd.to_datetime(df["date"])
+selected_child_id = st.selectbox("Select child profile", list(children), format_func=children.get)
+selected_child = children[selected_child_id]
+# Cache key for everything derived from this child's labelled usage.
+child_version = (data_version(selected_child_id), catalog.version)
 
 # -----------------------------
 # Sidebar filters
 # -----------------------------
+section("filters")
+# The date window and app selection become SQL predicates on the rollup's
+# (child_id, day, app_id) key, so only the selected window is ever loaded.
+first_day, last_day = day_bounds(selected_child_id)
 with st.sidebar:
     st.header("Filters")
-    day_options = ["All days"] + list(df["Date"].dt.strftime("%Y-%m-%d").unique())
-    selected_day = st.selectbox("Select day", options=day_options, index=0)
+    date_window = st.selectbox("Date range", options=list(DATE_WINDOWS))
+    start_day = end_day = None
+    if date_window == "Single day":
+        day_options = get_days(selected_child_id)
+        start_day = end_day = st.selectbox(
+            "Select day", options=day_options, index=len(day_options) - 1,
+            format_func=lambda d: from_day(d).isoformat(),
+        )
+    elif date_window == "Custom range":
+        custom_range = st.date_input(
+            "Custom range",
+            value=(from_day(first_day), from_day(last_day)),
+            min_value=from_day(first_day),
+            max_value=from_day(last_day),
+        )
+        if len(custom_range) == 2:
+            start_day, end_day = to_day(custom_range[0]), to_day(custom_range[1])
+    elif DATE_WINDOWS[date_window]:
+        start_day, end_day = last_day - DATE_WINDOWS[date_window] + 1, last_day
     selected_apps = st.multiselect("Select apps", options=apps, default=apps)
     st.header("🚨 Alerts thresholds")
-    daily_limit = st.slider("Daily per app limit (minutes)", min_value=20, max_value=240, value=120, step=10)
-    weekly_limit = st.slider("Weekly per app limit (minutes)", min_value=150, max_value=1200, value=600, step=50)
+    saved_daily_limit, saved_weekly_limit = get_thresholds(selected_child_id)
+    daily_limit = st.slider("Daily per app limit (minutes)", min_value=20, max_value=240, value=min(max(saved_daily_limit, 20), 240), step=10, key=f"daily_limit_{selected_child_id}")
+    weekly_limit = st.slider("Weekly per app limit (minutes)", min_value=150, max_value=1200, value=min(max(saved_weekly_limit, 150), 1200), step=50, key=f"weekly_limit_{selected_child_id}")
+    if (daily_limit, weekly_limit) != (saved_daily_limit, saved_weekly_limit):
+        if st.button(f"Save thresholds for {selected_child}"):
+            set_thresholds(selected_child_id, daily_limit, weekly_limit)
+            st.success("Thresholds saved; stored alerts will be re-checked.")
 
 # Apply filters
-filtered_df = df[df["app"].isin(selected_apps)].copy()
-if selected_day != "All days":
-    filtered_df = filtered_df[filtered_df["Date"].dt.strftime("%Y-%m-%d") == selected_day]
+selected_app_ids = [app_ids[a] for a in selected_apps]
+single_day = start_day is not None and start_day == end_day
+# The default view (whole history, every app) and the forecasts come from the
+# background-precomputed results; stale ones are shown while they refresh.
+results = get_results(selected_child_id, child_version)
+if results is not None and date_window == "All days" and selected_apps == apps:
+    view_version = results.version
+    metrics, weekly_usage, daily_usage = results.metrics, results.app_totals, results.daily_categories
+else:
+    # Other views are aggregated by the configured query engine (QUERY_ENGINE).
+    view_version = child_version
+    metrics, weekly_usage, daily_usage = child_view(
+        selected_child_id, child_version, start_day, end_day, selected_app_ids, selected_apps
+    )
 
 # -----------------------------
 # Healthy balance score
 # -----------------------------
-total_study = filtered_df[filtered_df["category"] == "Educational"]["usage_minutes"].sum()
-total_distract = filtered_df[filtered_df["category"] == "Non-Educational"]["usage_minutes"].sum()
-total_all = total_study + total_distract
-balance_ratio = (total_study / total_all) if total_all > 0 else 0
-healthy_balance_score = int(balance_ratio * 100)
+section("metrics")
+total_study = metrics.total_study
+total_distract = metrics.total_distract
+total_all = metrics.total_all
+healthy_balance_score = metrics.healthy_balance_score
 
 # -----------------------------
 # Metrics
@@ -149,162 +327,199 @@ metric_row(
     total_all,
     healthy_balance_score
 )
+# Percentiles among all children come from the population sketches, which
+# are refreshed with the precomputed results.
+standing = child_standing(selected_child_id)
+if standing.version != child_version:
+    request_precompute(selected_child_id)
+top_app = max(
+    (app for app in apps if app_metric(app) in standing.percentiles),
+    key=lambda app: standing.values[app_metric(app)], default=None,
+)
+if standing.get(BALANCE) is not None:
+    st.caption(" · ".join(population_reasons(standing, top_app)))
+if results is not None and results.version != child_version:
+    st.caption(f"Showing results computed {time.time() - results.computed_at:.0f}s ago; refreshing in the background.")
 st.divider()
 
 # -----------------------------
 # Visualizations
 # -----------------------------
+section("charts")
+# Rendered charts are cached per (child, filters, data version).
+chart_key = (selected_child_id, tuple(selected_apps), start_day, end_day, view_version)
 left, right = st.columns([1,1])
 with left:
     st.subheader("Study vs Distraction Trend")
-    if selected_day == "All days":
-        daily_usage = filtered_df.groupby(["Date", "category"])["usage_minutes"].sum().unstack().fillna(0)
-        fig1, ax1 = plt.subplots(figsize=(7,4))
-        daily_usage.plot(kind="bar", stacked=True, ax=ax1, color=["#66b3ff", "#ff9999"])
-        ax1.set_title("Daily study vs distraction")
-        ax1.set_ylabel("Minutes")
-        ax1.legend(["Educational", "Non-Educational"])
-        st.pyplot(fig1)
+    if daily_usage.empty:
+        st.info("No usage for the selected apps in this date range.")
+    elif not single_day:
+        show_daily_category_bars(daily_usage, chart_key, chart_mode)
     else:
-        category_usage = filtered_df.groupby("category")["usage_minutes"].sum().reindex(["Educational", "Non-Educational"]).fillna(0)
-        fig2, ax2 = plt.subplots(figsize=(5,5))
-        ax2.pie(category_usage, labels=category_usage.index, autopct="%1.1f%%", colors=["#66b3ff","#ff9999"], startangle=90)
-        ax2.set_title(f"Study vs distraction on {selected_day}")
-        st.pyplot(fig2)
+        category_usage = daily_usage.iloc[0].reindex(["Educational", "Non-Educational"]).fillna(0)
+        show_category_pie(category_usage, f"Study vs distraction on {from_day(start_day).isoformat()}", chart_key, chart_mode)
 
 with right:
     st.subheader("App usage totals")
-    weekly_usage = filtered_df.groupby("app")["usage_minutes"].sum().reindex(selected_apps).fillna(0)
-    fig3, ax3 = plt.subplots(figsize=(7,4))
-    colors = ["#ff9999" if categories[a]=="Non-Educational" else "#66b3ff" for a in weekly_usage.index]
-    ax3.bar(weekly_usage.index, weekly_usage.values, color=colors)
-    ax3.set_title("App usage")
-    ax3.set_ylabel("Minutes")
-    plt.xticks(rotation=30, ha="right")
-    st.pyplot(fig3)
+    show_app_totals(weekly_usage, categories, chart_key, chart_mode)
 
 st.divider()
 
 # -----------------------------
 # Alerts
 # -----------------------------
+section("alerts")
 st.subheader("Alerts")
-alerts_count = 0
-
-# Daily alerts
-if selected_day != "All days":
-    per_day = filtered_df.groupby(["Date","app"])["usage_minutes"].sum()
-    for (date, app), minutes in per_day.items():
-        if minutes > daily_limit:
-            st.error(f"{app} exceeded {daily_limit} mins on {date.strftime('%Y-%m-%d')} (used {minutes} mins)")
-            alerts_count +=1
-
-# Weekly alerts
-for app in weekly_usage.index:
-    minutes = int(weekly_usage[app])
-    if minutes > weekly_limit:
-        st.error(f"{app} exceeded weekly limit of {weekly_limit} mins (used {minutes} mins)")
-        alerts_count += 1
-
-if alerts_count == 0:
+alerts = weekly_alerts(weekly_usage, weekly_limit)
+if single_day:
+    over_limit = get_engine().over_limit(daily_limit, [selected_child_id], start_day, end_day, selected_app_ids)
+    alerts = daily_alerts(over_limit, daily_limit) + alerts
+
+for alert in alerts:
+    st.error(alert.message)
+
+if not alerts:
     st.success("No alerts. Usage within healthy limits.")
+
+with st.expander("Alert history"):
+    st.dataframe(load_alerts(selected_child_id))
 st.divider()
 
 # -----------------------------
 # Forecasts (linear regression)
 # -----------------------------
+section("forecast")
 st.subheader("🎯 Predictive forecasts")
 forecast_app = st.selectbox("Select app to forecast", options=selected_apps, index=0)
-app_data = df[(df["child"]==selected_child) & (df["app"]==forecast_app)].sort_values("Date")
-app_data["DayIndex"] = range(len(app_data))
-X = app_data[["DayIndex"]]
-y = app_data["usage_minutes"]
-
-model = LinearRegression()
-model.fit(X, y)
-
-future_idx = np.arange(len(app_data), len(app_data)+7).reshape(-1,1)
-predictions = model.predict(future_idx)
-future_dates = pd.date_range(start=app_data["Date"].max()+pd.Timedelta(days=1), periods=7)
-
-figf, axf = plt.subplots(figsize=(8,4))
-axf.plot(app_data["Date"], y, marker="o", label="Actual")
-axf.plot(future_dates, predictions, marker="x", linestyle="--", color="red", label="Forecast")
-axf.set_title(f"Usage forecast for {forecast_app}")
-axf.set_ylabel("Minutes")
-axf.legend()
-st.pyplot(figf)
-
-avg_forecast = float(np.mean(predictions))
-if avg_forecast > daily_limit:
-    st.error(f"Projected average for {forecast_app} next week: {avg_forecast:.0f} mins/day (> {daily_limit} limit)")
+forecast_model = st.selectbox(
+    "Forecast model",
+    options=list(FORECAST_MODELS),
+    format_func={"linear": "Linear trend", "weekly": "Trend + weekly pattern", "holt": "Exponential smoothing"}.get,
+)
+# All apps are fitted over the full history in one vectorized pass and reused
+# until the data changes (precomputed for every model when available).
+forecast_key = (selected_child_id, child_version if results is None else results.version)
+if results is not None:
+    forecasts = results.forecasts[forecast_model]
+else:
+    daily = get_daily_usage(selected_child_id)
+    forecasts = cached_forecasts(forecast_key, daily, forecast_model, scope=child_scope(selected_child_id))
+forecast = forecasts.get(forecast_app)
+if forecast is None:
+    st.info("No usage history to forecast yet.")
 else:
-    st.info(f"Projected average for {forecast_app} next week: {avg_forecast:.0f} mins/day (within limit)")
+    show_forecast(forecast, forecast_key, chart_mode)
+
+    avg_forecast = forecast.avg_forecast
+    if avg_forecast > daily_limit:
+        st.error(f"Projected average for {forecast_app} next week: {avg_forecast:.0f} mins/day (> {daily_limit} limit)")
+    else:
+        st.info(f"Projected average for {forecast_app} next week: {avg_forecast:.0f} mins/day (within limit)")
 st.divider()
-st.caption("Forecast based on short-term linear trend. Accuracy improves with more data.")
+st.caption("Forecast based on short-term trend (optionally with weekly pattern or smoothing). Accuracy improves with more data.")
 
 # ====– Explainable AI Panel
-show_explainable_ai_panel(
-    total_study=total_study,
-    total_distract=total_distract,
-    healthy_balance_score=healthy_balance_score,
-    forecast_app=forecast_app,
-    avg_forecast=avg_forecast,
-    daily_limit=daily_limit,
-    category_map=categories
-)
+section("explain")
+# Contributions for every app come from one vectorized pass, cached like the forecasts.
+if forecast is not None:
+    show_explainable_ai_panel(
+        explanation=(
+            results.explanations[forecast_model] if results is not None
+            else cached_explanations(forecast_key, daily, forecast_model, scope=child_scope(selected_child_id))
+        ),
+        forecast_app=forecast_app,
+        daily_limit=daily_limit,
+        metrics=metrics,
+        standing=standing,
+        category=categories.get(forecast_app)
+    )
 
 # -----------------------------
 # Adaptive recommendations
 # -----------------------------
+section("recommendations")
 st.subheader("🎯 Adaptive recommendations")
-def suggest_substitution(app_name:str)->str:
-    if app_name in ["Instagram","YouTube","WhatsApp"]:
-        return "VS-Code"
-    return "Google Classroom"
-
-if total_distract > total_study:
-    st.warning("Distraction outweighs study time. Recommend fixed study blocks: 2×45 mins daily.")
-    st.info("Consider app limits for social apps and a reward system after study blocks.")
-elif total_study >= total_distract and total_all >0:
-    st.success("Good balance. Maintain consistency with 90-min focused study sessions daily.")
-
-if categories[forecast_app]=="Non-Educational" and avg_forecast > daily_limit:
-    alt_app = suggest_substitution(forecast_app)
-    st.info(f"Replace 30 mins of {forecast_app} with {alt_app} next week to improve balance.")
-elif categories[forecast_app]=="Educational" and avg_forecast >= (daily_limit*0.8):
-    st.success(f"{forecast_app} study time looks solid. Encourage spaced repetition or quizzes.")
+for rec in balance_recommendations(metrics) + forecast_recommendations(forecast, categories, daily_limit, catalog.substitutes):
+    getattr(st, rec.level)(rec.message)
 
 st.subheader("🎯 Usage Suggestions")
-for app in selected_apps:
-    minutes = int(weekly_usage.get(app,0))
-    if categories[app]=="Non-Educational" and minutes > weekly_limit:
-        st.write(f"- {app}: Consider daily cap of {daily_limit} mins and shift 20-30 mins to {suggest_substitution(app)}.")
-    elif categories[app]=="Educational" and minutes < 300:
-        st.write(f"- {app}: Try adding a 20-min focused session after dinner for steady progress.")
+for rec in usage_suggestions(weekly_usage, categories, daily_limit, weekly_limit, catalog.substitutes):
+    getattr(st, rec.level)(rec.message)
 st.divider()
 
 # -----------------------------
 # Raw data view & editing
 # -----------------------------
+section("raw_view")
+# Filtering, sorting and paging run in SQL; only the visible page is loaded
+# and sent to the browser.
 st.subheader("Raw usage data (filtered)")
-st.dataframe(filtered_df.reset_index(drop=True))
+size_col, sort_col, order_col, page_col = st.columns(4)
+page_size = size_col.selectbox(
+    "Rows per page",
+    options=PAGE_SIZES,
+    index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE) if DEFAULT_PAGE_SIZE in PAGE_SIZES else 1,
+)
+sort_by = sort_col.selectbox("Sort by", options=list(PAGE_SORTS))
+descending = order_col.checkbox("Descending")
+page_args = dict(app_ids=selected_app_ids, start_day=start_day, end_day=end_day, sort=sort_by, descending=descending)
+total_rows = count_usage(selected_child_id, selected_app_ids, start_day, end_day)
+page_count = max(1, math.ceil(total_rows / page_size))
+if st.session_state.get("raw_page", 1) > page_count:
+    st.session_state["raw_page"] = page_count
+page_number = page_col.number_input("Page", min_value=1, max_value=page_count, step=1, key="raw_page")
+
+page_df, _ = get_usage_page(selected_child_id, page=page_number - 1, page_size=page_size, **page_args)
+render_started = time.perf_counter()
+st.dataframe(page_df, hide_index=True)
+render_ms = (time.perf_counter() - render_started) * 1000
+first_row = (page_number - 1) * page_size + 1 if len(page_df) else 0
+last_row = first_row + len(page_df) - 1 if len(page_df) else 0
+st.caption(
+    f"Rows {first_row:,}-{last_row:,} of {total_rows:,} · "
+    f"page payload {page_df.memory_usage(deep=True).sum() / 1024:.1f} KiB · rendered in {render_ms:.1f} ms"
+)
 
+section("editor")
 st.subheader("Edit usage data")
-editable_df = st.data_editor(filtered_df[["id","app","Date","category","usage_minutes"]], num_rows="dynamic")
+# The editor works on a date window rather than the whole history. Category
+# belongs to the app (apps table), so only minutes are editable per row.
+window_last = from_day(last_day if end_day is None else end_day)
+window_first = from_day(first_day if start_day is None else start_day)
+window_default = (max(window_first, window_last - dt.timedelta(days=EDITOR_WINDOW_DAYS - 1)), window_last)
+editor_window = st.date_input("Editor date range", value=window_default, key=f"editor_window_{selected_child_id}")
+# While only the first date of a range is picked, keep the default window.
+window_start, window_end = editor_window if len(editor_window) == 2 else window_default
+# Rows moved to the Parquet archive are read-only, so the editor lists hot rows only.
+editor_df, editor_total = get_usage_page(
+    selected_child_id,
+    app_ids=selected_app_ids,
+    start_day=to_day(window_start),
+    end_day=to_day(window_end),
+    page_size=EDITOR_MAX_ROWS,
+    archived=False,
+)
+archived_last = archived_through(selected_child_id)
+if archived_last is not None and to_day(window_start) <= archived_last:
+    st.caption(f"Rows up to {from_day(archived_last)} are archived and read-only; they still appear in the raw view above.")
+if editor_total > len(editor_df):
+    st.warning(f"Showing the first {len(editor_df):,} of {editor_total:,} rows; narrow the date range to edit the rest.")
+editable_df = st.data_editor(
+    editor_df[["id","app","Date","category","usage_minutes"]],
+    num_rows="dynamic",
+    disabled=["id", "app", "Date", "category"],
+)
 if st.button("💾 Save Changes"):
-    for _, row in editable_df.iterrows():
-        cursor.execute("""
-            UPDATE usage_data
-            SET usage_minutes=?, category=?
-            WHERE id=?
-        """, (int(row["usage_minutes"]), row["category"], int(row["id"])))
-    conn.commit()
+    update_minutes(diff_editor_changes(editor_df, editable_df))
+    invalidate_usage(selected_child_id)
+    invalidate_shared(child_scope(selected_child_id), family_scope(username))
+    request_precompute(selected_child_id)
     st.success("Changes saved! Refresh to see updated metrics.")
 
 # -----------------------------
 # Add new usage record
 # -----------------------------
+section("add_record")
 st.subheader("Add new usage record")
 with st.form("add_form"):
     new_date = st.date_input("Date")
@@ -312,12 +527,10 @@ with st.form("add_form"):
     new_usage = st.number_input("Usage minutes", min_value=0, max_value=300, step=10)
     submitted = st.form_submit_button("Add Record")
     if submitted:
-        cursor.execute("""
-            INSERT INTO usage_data (child, date, app, category, usage_minutes)
-            VALUES (?, ?, ?, ?, ?)
-        """, (selected_child, str(new_date), new_app, categories[new_app], int(new_usage)))
-        conn.commit()
+        insert_usage([(selected_child_id, to_day(new_date), app_ids[new_app], int(new_usage))])
+        invalidate_usage(selected_child_id)
+        invalidate_shared(child_scope(selected_child_id), family_scope(username))
+        request_precompute(selected_child_id)
         st.success("New record added successfully!")
 
-# Close DB connection at the end
-conn.close()
+show_rerun_trace()
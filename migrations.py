@@ -0,0 +1,485 @@
+"""Versioned schema migrations, tracked through ``PRAGMA user_version``.
+
+Each migration runs once, in order, inside the caller's transaction. Append new
+steps to ``MIGRATIONS``; never edit one that has already shipped.
+"""
+import logging
+
+from passwords import hash_password, is_hashed
+
+log = logging.getLogger(__name__)
+
+# -----------------------------
+# 1: original tables
+# -----------------------------
+def _initial_schema(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS parents (
+        parent_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE,
+        password TEXT
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS children (
+        child_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        parent_id INTEGER,
+        child_name TEXT,
+        FOREIGN KEY(parent_id) REFERENCES parents(parent_id)
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS usage_data (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        child TEXT,
+        date TEXT,
+        app TEXT,
+        category TEXT,
+        usage_minutes INTEGER
+    )
+    """)
+
+
+# -----------------------------
+# 2: normalized usage_data keyed by child_id / day / app_id
+# -----------------------------
+DEFAULT_APPS = (
+    ("YouTube", "Non-Educational"),
+    ("Google Classroom", "Educational"),
+    ("WhatsApp", "Non-Educational"),
+    ("VS-Code", "Educational"),
+    ("Instagram", "Non-Educational"),
+    ("MS Teams", "Educational"),
+)
+
+
+def _normalize_usage(conn):
+    conn.execute("""
+    CREATE TABLE apps (
+        app_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        category TEXT NOT NULL
+    )
+    """)
+    conn.executemany("INSERT INTO apps (name, category) VALUES (?, ?)", DEFAULT_APPS)
+    # Apps that only exist in legacy rows keep their most common category.
+    conn.execute("""
+    INSERT INTO apps (name, category)
+    SELECT app, category FROM (
+        SELECT app, category, MAX(n) FROM (
+            SELECT app, COALESCE(category, 'Non-Educational') AS category, COUNT(*) AS n
+            FROM usage_data
+            WHERE app IS NOT NULL AND app NOT IN (SELECT name FROM apps)
+            GROUP BY 1, 2
+        )
+        GROUP BY app
+    )
+    """)
+
+    conn.execute("CREATE INDEX idx_children_parent ON children(parent_id)")
+    conn.execute("CREATE INDEX idx_children_name ON children(child_name)")
+    # Legacy rows were keyed by child name; give names with no profile one.
+    conn.execute("""
+    INSERT INTO children (parent_id, child_name)
+    SELECT NULL, u.child
+    FROM (SELECT DISTINCT child FROM usage_data WHERE child IS NOT NULL) u
+    WHERE NOT EXISTS (SELECT 1 FROM children c WHERE c.child_name = u.child)
+    """)
+
+    # Rows the new schema cannot hold (no child, no app, or a date SQLite
+    # cannot parse) are kept as they were for manual repair, not dropped.
+    conn.execute("""
+    CREATE TABLE usage_data_unmigrated AS
+    SELECT * FROM usage_data
+    WHERE child IS NULL OR app IS NULL OR julianday(date) IS NULL
+    """)
+    unmigrated = conn.execute("SELECT COUNT(*) FROM usage_data_unmigrated").fetchone()[0]
+    if unmigrated:
+        log.warning("%d legacy usage rows lack a child, app or valid date; kept in usage_data_unmigrated",
+                    unmigrated)
+
+    conn.execute("""
+    CREATE TABLE usage_data_v2 (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        child_id INTEGER NOT NULL REFERENCES children(child_id),
+        day INTEGER NOT NULL,
+        app_id INTEGER NOT NULL REFERENCES apps(app_id),
+        usage_minutes INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    # day = days since 1970-01-01, so range filters are integer compares.
+    conn.execute("""
+    INSERT INTO usage_data_v2 (id, child_id, day, app_id, usage_minutes)
+    SELECT u.id,
+           (SELECT MIN(c.child_id) FROM children c WHERE c.child_name = u.child),
+           CAST(julianday(u.date) - 2440587.5 AS INTEGER),
+           a.app_id,
+           COALESCE(u.usage_minutes, 0)
+    FROM usage_data u
+    JOIN apps a ON a.name = u.app
+    WHERE u.child IS NOT NULL AND julianday(u.date) IS NOT NULL
+    """)
+    conn.execute("DROP TABLE usage_data")
+    conn.execute("ALTER TABLE usage_data_v2 RENAME TO usage_data")
+    # Covering index: per-child range scans never touch the table itself.
+    conn.execute("""
+    CREATE INDEX idx_usage_child_day_app
+    ON usage_data(child_id, day, app_id, usage_minutes)
+    """)
+
+    # Denormalized read view with the columns the dashboard displays.
+    conn.execute("""
+    CREATE VIEW usage_records AS
+    SELECT u.id,
+           u.child_id,
+           c.child_name AS child,
+           u.day,
+           date(u.day * 86400, 'unixepoch') AS date,
+           u.app_id,
+           a.name AS app,
+           a.category,
+           u.usage_minutes
+    FROM usage_data u
+    JOIN children c ON c.child_id = u.child_id
+    JOIN apps a ON a.app_id = u.app_id
+    """)
+
+
+# -----------------------------
+# 3: per-child data version (max id + edit counter) kept by triggers
+# -----------------------------
+def _child_versions(conn):
+    conn.execute("""
+    CREATE TABLE child_versions (
+        child_id INTEGER PRIMARY KEY REFERENCES children(child_id),
+        max_id INTEGER NOT NULL DEFAULT 0,
+        edits INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    conn.execute("""
+    INSERT INTO child_versions (child_id, max_id)
+    SELECT child_id, MAX(id) FROM usage_data GROUP BY child_id
+    """)
+    conn.execute("""
+    CREATE TRIGGER trg_usage_version_insert AFTER INSERT ON usage_data
+    BEGIN
+        INSERT INTO child_versions (child_id, max_id) VALUES (NEW.child_id, NEW.id)
+        ON CONFLICT(child_id) DO UPDATE SET max_id = MAX(max_id, excluded.max_id);
+    END
+    """)
+    for event in ("UPDATE", "DELETE"):
+        conn.execute(f"""
+        CREATE TRIGGER trg_usage_version_{event.lower()} AFTER {event} ON usage_data
+        BEGIN
+            INSERT INTO child_versions (child_id, edits) VALUES (OLD.child_id, 1)
+            ON CONFLICT(child_id) DO UPDATE SET edits = edits + 1;
+        END
+        """)
+
+
+# -----------------------------
+# 4: daily (child, day, app) rollup maintained in the writing transaction
+# -----------------------------
+def _daily_rollup(conn):
+    conn.execute("""
+    CREATE TABLE daily_usage_rollup (
+        child_id INTEGER NOT NULL REFERENCES children(child_id),
+        day INTEGER NOT NULL,
+        app_id INTEGER NOT NULL REFERENCES apps(app_id),
+        usage_minutes INTEGER NOT NULL DEFAULT 0,
+        records INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (child_id, day, app_id)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("""
+    INSERT INTO daily_usage_rollup (child_id, day, app_id, usage_minutes, records)
+    SELECT child_id, day, app_id, SUM(usage_minutes), COUNT(*)
+    FROM usage_data
+    GROUP BY child_id, day, app_id
+    """)
+
+    add_new = """
+        INSERT INTO daily_usage_rollup (child_id, day, app_id, usage_minutes, records)
+        VALUES (NEW.child_id, NEW.day, NEW.app_id, NEW.usage_minutes, 1)
+        ON CONFLICT(child_id, day, app_id) DO UPDATE SET
+            usage_minutes = usage_minutes + excluded.usage_minutes,
+            records = records + 1;
+    """
+    remove_old = """
+        UPDATE daily_usage_rollup
+        SET usage_minutes = usage_minutes - OLD.usage_minutes, records = records - 1
+        WHERE child_id = OLD.child_id AND day = OLD.day AND app_id = OLD.app_id;
+        DELETE FROM daily_usage_rollup
+        WHERE child_id = OLD.child_id AND day = OLD.day AND app_id = OLD.app_id
+          AND records <= 0;
+    """
+    conn.execute(f"CREATE TRIGGER trg_rollup_insert AFTER INSERT ON usage_data BEGIN {add_new} END")
+    conn.execute(f"""
+    CREATE TRIGGER trg_rollup_update
+    AFTER UPDATE OF child_id, day, app_id, usage_minutes ON usage_data
+    BEGIN {remove_old} {add_new} END
+    """)
+    conn.execute(f"CREATE TRIGGER trg_rollup_delete AFTER DELETE ON usage_data BEGIN {remove_old} END")
+
+    conn.execute("""
+    CREATE VIEW daily_category_usage AS
+    SELECT r.child_id, r.day, a.category, SUM(r.usage_minutes) AS usage_minutes
+    FROM daily_usage_rollup r
+    JOIN apps a ON a.app_id = r.app_id
+    GROUP BY r.child_id, r.day, a.category
+    """)
+
+
+# -----------------------------
+# 5: alert thresholds, persisted alerts and the rollup change queue
+# -----------------------------
+def _alerts(conn):
+    conn.execute("""
+    CREATE TABLE alert_thresholds (
+        child_id INTEGER PRIMARY KEY REFERENCES children(child_id),
+        daily_limit INTEGER NOT NULL,
+        weekly_limit INTEGER NOT NULL
+    )
+    """)
+    # period_day: the day (daily alerts) or the Monday of the week (weekly).
+    conn.execute("""
+    CREATE TABLE alerts (
+        alert_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        child_id INTEGER NOT NULL REFERENCES children(child_id),
+        app_id INTEGER NOT NULL REFERENCES apps(app_id),
+        kind TEXT NOT NULL CHECK (kind IN ('daily', 'weekly')),
+        period_day INTEGER NOT NULL,
+        usage_minutes INTEGER NOT NULL,
+        limit_minutes INTEGER NOT NULL,
+        created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (child_id, kind, period_day, app_id)
+    )
+    """)
+    # (child, day) pairs whose rollup changed since the last alert evaluation.
+    conn.execute("""
+    CREATE TABLE rollup_dirty (
+        child_id INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        PRIMARY KEY (child_id, day)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("INSERT INTO rollup_dirty SELECT DISTINCT child_id, day FROM daily_usage_rollup")
+    # Not INSERT OR IGNORE: the conflict policy of the rollup upsert that fires
+    # these triggers overrides it, and a second record for the same
+    # (child, day, app) would abort with a UNIQUE error.
+    for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+        conn.execute(f"""
+        CREATE TRIGGER trg_rollup_dirty_{event.lower()} AFTER {event} ON daily_usage_rollup
+        WHEN NOT EXISTS (
+            SELECT 1 FROM rollup_dirty WHERE child_id = {row}.child_id AND day = {row}.day
+        )
+        BEGIN
+            INSERT INTO rollup_dirty (child_id, day) VALUES ({row}.child_id, {row}.day);
+        END
+        """)
+
+
+# -----------------------------
+# 6: manifest of the Parquet archive tier (see archive.py)
+# -----------------------------
+def _archive_manifest(conn):
+    # path is relative to the archive directory; only listed files are read.
+    conn.execute("""
+    CREATE TABLE archive_files (
+        file_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        path TEXT NOT NULL UNIQUE,
+        month TEXT NOT NULL,
+        bucket INTEGER NOT NULL,
+        rows INTEGER NOT NULL,
+        bytes INTEGER NOT NULL,
+        created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    # Per-child day span of each file, so reads open only the files they need.
+    conn.execute("""
+    CREATE TABLE archive_children (
+        child_id INTEGER NOT NULL REFERENCES children(child_id),
+        file_id INTEGER NOT NULL REFERENCES archive_files(file_id),
+        min_day INTEGER NOT NULL,
+        max_day INTEGER NOT NULL,
+        rows INTEGER NOT NULL,
+        PRIMARY KEY (child_id, file_id)
+    ) WITHOUT ROWID
+    """)
+
+
+# -----------------------------
+# 7: app catalog (substitutes, demo baselines), per-family categories
+# -----------------------------
+DEFAULT_BASELINES = (
+    ("YouTube", 80, 30),
+    ("Google Classroom", 70, 25),
+    ("WhatsApp", 60, 20),
+    ("VS-Code", 65, 25),
+    ("Instagram", 75, 30),
+    ("MS Teams", 60, 20),
+)
+DEFAULT_SUBSTITUTES = (
+    ("YouTube", "VS-Code"),
+    ("WhatsApp", "VS-Code"),
+    ("Instagram", "VS-Code"),
+)
+
+
+def _app_catalog(conn):
+    conn.execute("ALTER TABLE apps ADD COLUMN substitute_id INTEGER REFERENCES apps(app_id)")
+    conn.execute("ALTER TABLE apps ADD COLUMN baseline_mean INTEGER")
+    conn.execute("ALTER TABLE apps ADD COLUMN baseline_spread INTEGER")
+    conn.executemany(
+        "UPDATE apps SET baseline_mean=?, baseline_spread=? WHERE name=?",
+        [(mean, spread, name) for name, mean, spread in DEFAULT_BASELINES],
+    )
+    conn.executemany(
+        "UPDATE apps SET substitute_id=(SELECT app_id FROM apps WHERE name=?) WHERE name=?",
+        [(substitute, name) for name, substitute in DEFAULT_SUBSTITUTES],
+    )
+    conn.execute("""
+    CREATE TABLE app_category_overrides (
+        parent_id INTEGER NOT NULL REFERENCES parents(parent_id),
+        app_id INTEGER NOT NULL REFERENCES apps(app_id),
+        category TEXT NOT NULL,
+        PRIMARY KEY (parent_id, app_id)
+    ) WITHOUT ROWID
+    """)
+
+    # One counter for the whole catalog; readers reload their snapshot when it moves.
+    conn.execute("""
+    CREATE TABLE catalog_version (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        version INTEGER NOT NULL
+    )
+    """)
+    conn.execute("INSERT INTO catalog_version (id, version) VALUES (0, 0)")
+    for table in ("apps", "app_category_overrides"):
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(f"""
+            CREATE TRIGGER trg_catalog_{table}_{event.lower()} AFTER {event} ON {table}
+            BEGIN
+                UPDATE catalog_version SET version = version + 1;
+            END
+            """)
+
+    conn.execute("DROP VIEW daily_category_usage")
+    conn.execute("""
+    CREATE VIEW daily_category_usage AS
+    SELECT r.child_id, r.day, COALESCE(o.category, a.category) AS category,
+           SUM(r.usage_minutes) AS usage_minutes
+    FROM daily_usage_rollup r
+    JOIN apps a ON a.app_id = r.app_id
+    JOIN children c ON c.child_id = r.child_id
+    LEFT JOIN app_category_overrides o ON o.parent_id = c.parent_id AND o.app_id = r.app_id
+    GROUP BY r.child_id, r.day, COALESCE(o.category, a.category)
+    """)
+
+
+# -----------------------------
+# 8: precomputed dashboard results (see precompute.py)
+# -----------------------------
+def _child_results(conn):
+    # One row per child, tagged with the versions it was computed from; a
+    # child is stale when child_versions or catalog_version has moved on.
+    conn.execute("""
+    CREATE TABLE child_results (
+        child_id INTEGER PRIMARY KEY REFERENCES children(child_id),
+        max_id INTEGER NOT NULL,
+        edits INTEGER NOT NULL,
+        catalog_version INTEGER NOT NULL,
+        payload BLOB NOT NULL,
+        computed_at REAL NOT NULL,
+        compute_ms REAL NOT NULL
+    )
+    """)
+
+
+# -----------------------------
+# 9: population statistics (see population.py)
+# -----------------------------
+def _population(conn):
+    # Per metric, how many children fall in each integer bin; the bins each
+    # child currently contributes are kept so a refresh can take them back out.
+    conn.execute("""
+    CREATE TABLE population_members (
+        child_id INTEGER PRIMARY KEY REFERENCES children(child_id),
+        max_id INTEGER NOT NULL,
+        edits INTEGER NOT NULL,
+        catalog_version INTEGER NOT NULL
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE population_values (
+        child_id INTEGER NOT NULL REFERENCES children(child_id),
+        metric TEXT NOT NULL,
+        bin INTEGER NOT NULL,
+        PRIMARY KEY (child_id, metric)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("""
+    CREATE TABLE population_sketches (
+        metric TEXT NOT NULL,
+        bin INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (metric, bin)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE TABLE population_version (version INTEGER NOT NULL)")
+    conn.execute("INSERT INTO population_version VALUES (0)")
+
+
+# -----------------------------
+# 10: hash parent passwords still stored as plaintext
+# -----------------------------
+def _hash_passwords(conn):
+    rows = conn.execute("SELECT parent_id, password FROM parents WHERE password IS NOT NULL").fetchall()
+    conn.executemany(
+        "UPDATE parents SET password=? WHERE parent_id=?",
+        [(hash_password(password), parent_id) for parent_id, password in rows if not is_hashed(password)],
+    )
+
+
+# -----------------------------
+# 11: sparse population values, categories fingerprint per member
+# -----------------------------
+def _population_categories(conn):
+    # Zero app and category bins are no longer stored, and members remember
+    # the categories they were computed with so catalog changes that do not
+    # touch them leave them alone. The old rows are dropped; the next
+    # refresh rebuilds them.
+    conn.execute("ALTER TABLE population_members ADD COLUMN apps_through INTEGER NOT NULL DEFAULT 0")
+    conn.execute("ALTER TABLE population_members ADD COLUMN categories_hash INTEGER")
+    for table in ("population_members", "population_values", "population_sketches"):
+        conn.execute(f"DELETE FROM {table}")
+    conn.execute("UPDATE population_version SET version = version + 1")
+
+
+MIGRATIONS = (
+    (1, _initial_schema),
+    (2, _normalize_usage),
+    (3, _child_versions),
+    (4, _daily_rollup),
+    (5, _alerts),
+    (6, _archive_manifest),
+    (7, _app_catalog),
+    (8, _child_results),
+    (9, _population),
+    (10, _hash_passwords),
+    (11, _population_categories),
+)
+
+
+def schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Apply pending migrations; ``conn`` must already be inside a transaction."""
+    current = schema_version(conn)
+    for version, step in MIGRATIONS:
+        if version > current:
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+    return schema_version(conn)
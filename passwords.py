@@ -0,0 +1,58 @@
+"""Parent password hashing (PBKDF2-SHA256), without Streamlit.
+
+Hashes are stored as ``pbkdf2_sha256$<iterations>$<salt>$<digest>``. Rows
+from before hashing held plaintext; migration 10 hashes them in place.
+"""
+import base64
+import functools
+import hashlib
+import hmac
+import os
+import secrets
+
+HASH_SCHEME = "pbkdf2_sha256"
+# Work factor for new hashes; raising it re-hashes old ones on next login.
+PASSWORD_HASH_ITERATIONS = int(os.environ.get("PASSWORD_HASH_ITERATIONS", "200000"))
+
+
+def is_hashed(stored: str) -> bool:
+    return stored is not None and stored.startswith(HASH_SCHEME + "$")
+
+
+def hash_password(password: str, iterations: int = None) -> str:
+    iterations = iterations or PASSWORD_HASH_ITERATIONS
+    salt = os.urandom(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return "$".join([
+        HASH_SCHEME,
+        str(iterations),
+        base64.b64encode(salt).decode(),
+        base64.b64encode(digest).decode(),
+    ])
+
+
+def verify_password(password: str, stored: str) -> tuple:
+    """``(matches, needs_rehash)``; a plaintext ``stored`` still verifies, and needs a rehash."""
+    if not stored:
+        return False, False
+    parts = stored.split("$")
+    if len(parts) != 4 or parts[0] != HASH_SCHEME:
+        return hmac.compare_digest(password.encode(), stored.encode()), True
+    iterations = int(parts[1])
+    salt, expected = base64.b64decode(parts[2]), base64.b64decode(parts[3])
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return hmac.compare_digest(digest, expected), iterations < PASSWORD_HASH_ITERATIONS
+
+
+@functools.lru_cache(maxsize=None)
+def _dummy_hash(iterations: int) -> str:
+    return hash_password(secrets.token_urlsafe(16), iterations)
+
+
+def verify_unknown(password: str) -> bool:
+    """Do the work of :func:`verify_password` for a user without a hash; never matches.
+
+    Unknown usernames then take as long to reject as a wrong password.
+    """
+    verify_password(password, _dummy_hash(PASSWORD_HASH_ITERATIONS))
+    return False
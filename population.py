@@ -0,0 +1,301 @@
+"""Population statistics: where a child stands among all children.
+
+Every child with usage contributes, over its whole history, its average
+minutes per day of each app (``app:<name>``) and of each category
+(``category:<name>``, with its family's overrides), and its healthy balance
+score (``balance_score``). Each metric has a histogram sketch in
+``population_sketches``: how many children fall in each integer bin
+(minutes per day, capped at ``MAX_BIN``, or score points). Sketches merge by
+adding bin counts, and because the bins a child contributes are kept in
+``population_values`` they can also be subtracted, so a refresh only
+recomputes children whose data or categories changed and never rescans the
+others. It runs after writes: the precompute passes and the dashboard's
+in-process queue (see ``precompute.py``), every flush interval of the
+ingest service, and file imports. ``ingest.bulk_insert`` alone leaves it to
+the caller or the scheduler.
+
+Only non-zero app and category bins are stored: most children never use
+most apps. The balance score is stored for every child with usage, so its
+sketch counts the population and a metric's zero bin is that total minus
+its other bins. A catalog change only recomputes the children whose family's
+categories it changed (a fingerprint over the apps they were computed with);
+new apps, baselines and other families' overrides leave them alone.
+
+A percentile is a lookup into a metric's cumulative counts, cached per
+process until ``population_version`` moves: the share of children below the
+child's bin plus half of those in it.
+
+    python population.py              # refresh every stale child
+    python population.py --child 3    # and print where child 3 stands
+"""
+import argparse
+import hashlib
+import threading
+from collections import Counter
+from dataclasses import dataclass
+
+import numpy as np
+
+from catalog import get_catalog
+from db import connection, init_db, transaction
+from query_engine import get_engine
+from telemetry import traced
+from usage_store import data_versions
+
+MAX_BIN = 1440  # minutes in a day
+BATCH_CHILDREN = 500
+BALANCE = "balance_score"
+
+
+def app_metric(app: str) -> str:
+    return f"app:{app}"
+
+
+def category_metric(category: str) -> str:
+    return f"category:{category}"
+
+
+# -----------------------------
+# Computation
+# -----------------------------
+def _bin(value: float) -> int:
+    return int(min(max(round(value), 0), MAX_BIN))
+
+
+@traced("population.values")
+def compute_values(child_ids) -> dict:
+    """``{child_id: {metric: bin}}`` over each child's whole history; ``{}`` without usage.
+
+    Zero app and category bins are left out; ``BALANCE`` is always there.
+    """
+    child_ids = [int(c) for c in child_ids]
+    engine = get_engine()
+    daily = engine.daily_categories(child_ids)
+    days = daily.groupby("child_id")["Date"].nunique()
+    values = {c: {} for c in child_ids}
+    by_category = daily.groupby(["child_id", "category"], observed=True)["usage_minutes"].sum()
+    for (child_id, category), minutes in by_category.items():
+        if _bin(minutes / days[child_id]):
+            values[child_id][category_metric(category)] = _bin(minutes / days[child_id])
+    by_app = engine.app_totals(child_ids)
+    for child_id, app, minutes in zip(by_app["child_id"], by_app["app"], by_app["usage_minutes"]):
+        if _bin(minutes / days[child_id]):
+            values[child_id][app_metric(app)] = _bin(minutes / days[child_id])
+    for child_id, score in engine.metrics(child_ids)["healthy_balance_score"].items():
+        values[child_id][BALANCE] = int(score)
+    return values
+
+
+def categories_hash(catalog, parent_id, apps_through: int) -> int:
+    """Fingerprint of a family's app names and categories up to app_id ``apps_through``."""
+    categories = catalog.category_map(parent_id)
+    apps = [(app_id, name, categories[name]) for app_id, name in zip(catalog.ids, catalog.names)
+            if app_id <= apps_through]
+    return int.from_bytes(hashlib.blake2b(repr(apps).encode(), digest_size=8).digest(), "big", signed=True)
+
+
+def store_values(values: dict, versions: dict, catalog, parents: dict):
+    """Swap the children's old bins for ``values`` in the sketches, in one transaction.
+
+    ``catalog`` is the snapshot read before the values were computed and
+    ``parents`` maps each child to its family, for the categories fingerprint.
+    """
+    child_ids = list(values)
+    marks = ",".join("?" * len(child_ids))
+    with transaction() as conn:
+        delta = Counter()
+        for metric, bin_ in conn.execute(
+            f"SELECT metric, bin FROM population_values WHERE child_id IN ({marks})", child_ids
+        ):
+            delta[metric, bin_] -= 1
+        for child_values in values.values():
+            for metric, bin_ in child_values.items():
+                delta[metric, bin_] += 1
+        changed = [(metric, bin_, count) for (metric, bin_), count in delta.items() if count]
+        conn.executemany("""
+            INSERT INTO population_sketches (metric, bin, count) VALUES (?, ?, ?)
+            ON CONFLICT(metric, bin) DO UPDATE SET count = count + excluded.count
+        """, changed)
+        conn.executemany("DELETE FROM population_sketches WHERE metric=? AND bin=? AND count=0",
+                         [(metric, bin_) for metric, bin_, _ in changed])
+        conn.execute(f"DELETE FROM population_values WHERE child_id IN ({marks})", child_ids)
+        conn.executemany(
+            "INSERT INTO population_values (child_id, metric, bin) VALUES (?, ?, ?)",
+            [(c, metric, bin_) for c, child_values in values.items() for metric, bin_ in child_values.items()],
+        )
+        apps_through = max(catalog.ids, default=0)
+        conn.executemany("""
+            INSERT OR REPLACE INTO population_members
+                (child_id, max_id, edits, catalog_version, apps_through, categories_hash)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [(c, *versions[c], catalog.version, apps_through,
+               categories_hash(catalog, parents.get(c), apps_through)) for c in child_ids])
+        if changed:
+            conn.execute("UPDATE population_version SET version = version + 1")
+
+
+def _classify(conn) -> tuple:
+    """``(stale, unaffected, catalog_version)``.
+
+    ``unaffected`` members are behind only on a catalog change that left
+    their family's categories alone; their values still hold.
+    """
+    catalog = get_catalog(conn)
+    rows = conn.execute("""
+        SELECT v.child_id, m.child_id IS NULL OR m.max_id <> v.max_id OR m.edits <> v.edits,
+               c.parent_id, m.apps_through, m.categories_hash
+        FROM child_versions v
+        JOIN children c ON c.child_id = v.child_id
+        LEFT JOIN population_members m ON m.child_id = v.child_id
+        WHERE m.child_id IS NULL OR m.max_id <> v.max_id OR m.edits <> v.edits OR m.catalog_version <> ?
+        ORDER BY v.child_id
+    """, (catalog.version,)).fetchall()
+    stale, unaffected, hashes = [], [], {}
+    for child_id, data_changed, parent_id, apps_through, stored in rows:
+        if not data_changed:
+            key = parent_id, apps_through
+            if key not in hashes:
+                hashes[key] = categories_hash(catalog, parent_id, apps_through)
+            if hashes[key] == stored:
+                unaffected.append(child_id)
+                continue
+        stale.append(child_id)
+    return stale, unaffected, catalog.version
+
+
+def stale_children(conn=None) -> list:
+    """Children whose contribution is missing or older than their data or their categories."""
+    if conn is None:
+        with connection() as conn:
+            return stale_children(conn)
+    return _classify(conn)[0]
+
+
+def refresh(child_ids=None, batch_children: int = BATCH_CHILDREN) -> int:
+    """Update the sketches for ``child_ids`` (default: every stale child); returns how many."""
+    if child_ids is None:
+        with connection() as conn:
+            child_ids, unaffected, catalog_version = _classify(conn)
+        if unaffected:
+            with transaction() as conn:
+                conn.executemany("UPDATE population_members SET catalog_version=? WHERE child_id=?",
+                                 [(catalog_version, c) for c in unaffected])
+    else:
+        child_ids = [int(c) for c in child_ids]
+    for i in range(0, len(child_ids), batch_children):
+        batch = child_ids[i:i + batch_children]
+        marks = ",".join("?" * len(batch))
+        # Versions are read before the data, as in precompute: a concurrent
+        # write can only leave a child looking stale.
+        with connection() as conn:
+            versions = {c: (max_id, edits) for c, max_id, edits in data_versions(batch, conn)}
+            catalog = get_catalog(conn)
+            parents = dict(conn.execute(f"SELECT child_id, parent_id FROM children WHERE child_id IN ({marks})", batch))
+        store_values(compute_values(batch), versions, catalog, parents)
+    return len(child_ids)
+
+
+# -----------------------------
+# Reads
+# -----------------------------
+@dataclass(frozen=True)
+class Sketch:
+    below: np.ndarray   # children below each bin
+    counts: np.ndarray  # children in each bin
+    total: int
+
+    def percentile(self, bin_: int) -> float:
+        """Share of children below ``bin_`` plus half of those in it, in percent."""
+        bin_ = _bin(bin_)
+        return float((self.below[bin_] + self.counts[bin_] / 2) / self.total * 100)
+
+
+@dataclass(frozen=True)
+class Standing:
+    version: tuple     # ((max_id, edits), catalog_version) the values come from; None if never computed
+    values: dict       # metric -> bin (minutes per day or score)
+    percentiles: dict  # metric -> percentile among children with usage
+
+    def get(self, metric: str):
+        """``(value, percentile)`` of a metric, or ``None``."""
+        if metric not in self.percentiles:
+            return None
+        return self.values[metric], self.percentiles[metric]
+
+
+_sketches = (None, {})
+_sketches_lock = threading.Lock()
+
+
+def _load_sketches(conn) -> dict:
+    rows = conn.execute("SELECT metric, bin, count FROM population_sketches ORDER BY metric").fetchall()
+    counts = {}
+    for metric, bin_, count in rows:
+        counts.setdefault(metric, np.zeros(MAX_BIN + 1, dtype=np.int64))[bin_] = count
+    # Every child with usage has a balance score; the rest of a metric's
+    # population sits in its (unstored) zero bin.
+    members = int(counts[BALANCE].sum()) if BALANCE in counts else 0
+    for metric, c in counts.items():
+        if metric != BALANCE:
+            c[0] += members - c.sum()
+    return {
+        metric: Sketch(np.concatenate([[0], np.cumsum(c)[:-1]]), c, int(c.sum()))
+        for metric, c in counts.items() if c.sum() > 0
+    }
+
+
+def get_sketches(conn=None) -> dict:
+    """``{metric: Sketch}``, reloaded only when ``population_version`` moved."""
+    global _sketches
+    if conn is None:
+        with connection() as conn:
+            return get_sketches(conn)
+    version = conn.execute("SELECT version FROM population_version").fetchone()[0]
+    if _sketches[0] == version:
+        return _sketches[1]
+    with _sketches_lock:
+        if _sketches[0] != version:
+            _sketches = (version, _load_sketches(conn))
+        return _sketches[1]
+
+
+def child_standing(child_id: int, sketches: dict = None) -> Standing:
+    """A child's stored values and their percentiles (one indexed read plus lookups).
+
+    A child with usage gets a zero, and its percentile, for every metric in
+    the sketches it has no stored bin for.
+
+    Batch jobs pass one ``sketches`` snapshot so every child is placed
+    against the same population.
+    """
+    with connection() as conn:
+        member = conn.execute(
+            "SELECT max_id, edits, catalog_version FROM population_members WHERE child_id=?", (child_id,)
+        ).fetchone()
+        values = dict(conn.execute("SELECT metric, bin FROM population_values WHERE child_id=?", (child_id,)))
+        if sketches is None:
+            sketches = get_sketches(conn)
+    version = None if member is None else ((member[0], member[1]), member[2])
+    if BALANCE in values:
+        values = {**dict.fromkeys(sketches, 0), **values}
+    percentiles = {metric: sketches[metric].percentile(b) for metric, b in values.items() if metric in sketches}
+    return Standing(version, values, percentiles)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--child", type=int, help="print this child's percentiles")
+    args = parser.parse_args(argv)
+
+    init_db()
+    print(f"refreshed {refresh()} children")
+    if args.child is not None:
+        standing = child_standing(args.child)
+        print(f"{'metric':<28} {'value':>6} {'percentile':>10}")
+        for metric in sorted(standing.percentiles):
+            value, pct = standing.get(metric)
+            print(f"{metric:<28} {value:>6} {pct:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""Background precomputation of each child's dashboard results.
+
+For the dashboard's default view (all days, all apps) every child's metrics,
+app totals, daily study/distraction chart data, and the forecasts and
+explanations of every model are computed ahead of time and stored in
+``child_results``, tagged with the data and catalog versions they came from.
+The dashboard only reads that row; when it is stale it is still shown
+(stale-while-revalidate) and the child is queued for recomputation.
+
+Work is coalesced per child: any number of writes between two passes is one
+recomputation, because staleness is a comparison against ``child_versions``
+rather than a queue of events, and the in-process queue holds each child at
+most once. Children are computed in batches with one multi-child query and
+one vectorized forecasting pass per model.
+
+    python precompute.py              # refresh every stale child once
+    python precompute.py --every 30   # keep refreshing (also drains alert checks)
+
+Each pass, and each in-process request, also brings the children's share of
+the population sketches up to date (see ``population.py``).
+
+Inside the dashboard process :func:`request` runs the same computation on a
+small thread pool (``PRECOMPUTE_WORKERS``, default 1; 0 leaves it to the
+scheduler process).
+"""
+import argparse
+import logging
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import population
+from alert_engine import evaluate_alerts
+from analytics import MODELS, app_totals, explain_forecasts, forecast_all, metrics_frame
+from analytics.cache import VersionedCache
+from analytics.results import Metrics
+from catalog import get_catalog
+from db import connection, init_db, transaction
+from telemetry import traced
+from usage_store import data_versions, load_daily_usage_many
+
+PRECOMPUTE_WORKERS = int(os.environ.get("PRECOMPUTE_WORKERS", "1"))
+BATCH_CHILDREN = 200
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class ChildResults:
+    version: tuple              # ((max_id, edits), catalog_version) it was computed from
+    metrics: Metrics
+    app_totals: pd.Series       # minutes per app, in catalog order
+    daily_categories: pd.DataFrame  # minutes per Date (rows) and category (columns)
+    forecasts: dict             # model -> {app: Forecast}
+    explanations: dict          # model -> explain_forecasts() frame
+    computed_at: float
+
+
+# -----------------------------
+# Computation
+# -----------------------------
+def _split(frame, ids, child_ids) -> dict:
+    """``{child_id: rows}`` of a frame sorted by ``ids`` (its rows' child ids); no rows if absent."""
+    bounds = np.flatnonzero(np.diff(np.asarray(ids), prepend=-1, append=-1))
+    parts = {int(ids[start]): frame.iloc[start:end] for start, end in zip(bounds[:-1], bounds[1:])}
+    return {c: parts.get(c, frame.iloc[:0]) for c in child_ids}
+
+
+@traced("precompute.children")
+def compute_results(child_ids) -> dict:
+    """``{child_id: ChildResults}`` for the default view of each child.
+
+    Children whose rows were all deleted get empty results, so they stop
+    looking stale.
+    """
+    child_ids = [int(c) for c in child_ids]
+    # Versions are read before the data, so a concurrent write can only make
+    # the stored row look stale, never fresh.
+    with connection() as conn:
+        versions = {c: (max_id, edits) for c, max_id, edits in data_versions(child_ids, conn)}
+        catalog = get_catalog(conn)
+        marks = ",".join("?" * len(child_ids))
+        parents = dict(conn.execute(f"SELECT child_id, parent_id FROM children WHERE child_id IN ({marks})", child_ids))
+    daily = load_daily_usage_many(child_ids)
+
+    # Every step runs once over all children; per-child results are then cut
+    # out by position (all of these frames are sorted by child_id).
+    metrics = metrics_frame(daily).reindex(child_ids, fill_value=0)
+    names = list(catalog.app_dtype.categories)
+    minutes = (
+        daily.groupby(["child_id", "app"], observed=True)["usage_minutes"].sum()
+        .unstack(fill_value=0).reindex(index=child_ids, columns=names, fill_value=0).to_numpy(dtype=np.int64)
+    )
+    columns = {name: i for i, name in enumerate(names)}
+    by_day = daily.groupby(["child_id", "Date", "category"], observed=True)["usage_minutes"].sum().unstack()
+    by_day = _split(by_day.droplevel("child_id"), by_day.index.get_level_values("child_id"), child_ids)
+    forecasts, explanations = {}, {}
+    for model in MODELS:
+        forecasts[model] = {c: {} for c in child_ids}
+        for (child_id, app), forecast in forecast_all(daily, model).items():
+            forecasts[model][child_id][app] = forecast
+        explained = explain_forecasts(daily, model)
+        explanations[model] = _split(explained.drop(columns="child_id"), explained["child_id"].to_numpy(), child_ids)
+
+    now = time.time()
+    results = {}
+    for row, child_id in enumerate(child_ids):
+        apps = list(catalog.category_map(parents.get(child_id)))
+        results[child_id] = ChildResults(
+            version=(versions[child_id], catalog.version),
+            metrics=Metrics(*(int(v) for v in metrics.loc[child_id])),
+            app_totals=pd.Series(
+                minutes[row, [columns[a] for a in apps]], index=pd.Index(apps, name="app"), name="usage_minutes"
+            ),
+            daily_categories=by_day[child_id].dropna(axis=1, how="all").fillna(0),
+            forecasts={model: forecasts[model][child_id] for model in MODELS},
+            explanations={model: explanations[model][child_id].reset_index(drop=True) for model in MODELS},
+            computed_at=now,
+        )
+    return results
+
+
+def store_results(results: dict, compute_ms: float = 0.0):
+    """Upsert computed results, keeping a row computed from newer data."""
+    with transaction() as conn:
+        conn.executemany("""
+            INSERT INTO child_results (child_id, max_id, edits, catalog_version, payload, computed_at, compute_ms)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(child_id) DO UPDATE SET
+                max_id = excluded.max_id, edits = excluded.edits,
+                catalog_version = excluded.catalog_version, payload = excluded.payload,
+                computed_at = excluded.computed_at, compute_ms = excluded.compute_ms
+            WHERE (excluded.max_id, excluded.edits, excluded.catalog_version)
+                  >= (child_results.max_id, child_results.edits, child_results.catalog_version)
+        """, [
+            (child_id, *r.version[0], r.version[1], pickle.dumps(r, protocol=pickle.HIGHEST_PROTOCOL),
+             r.computed_at, compute_ms / max(len(results), 1))
+            for child_id, r in results.items()
+        ])
+
+
+def stale_children(conn=None) -> list:
+    """Children with usage whose stored results are missing or out of date."""
+    if conn is None:
+        with connection() as conn:
+            return stale_children(conn)
+    return [row[0] for row in conn.execute("""
+        SELECT v.child_id
+        FROM child_versions v
+        LEFT JOIN child_results r ON r.child_id = v.child_id
+        WHERE r.child_id IS NULL OR r.max_id <> v.max_id OR r.edits <> v.edits
+           OR r.catalog_version <> (SELECT version FROM catalog_version)
+        ORDER BY v.child_id
+    """)]
+
+
+def refresh(child_ids=None, batch_children: int = BATCH_CHILDREN) -> dict:
+    """Recompute ``child_ids`` (default: every stale child) in batches."""
+    child_ids = stale_children() if child_ids is None else list(child_ids)
+    stats = {"children": 0, "seconds": 0.0}
+    for i in range(0, len(child_ids), batch_children):
+        start = time.perf_counter()
+        results = compute_results(child_ids[i:i + batch_children])
+        elapsed = time.perf_counter() - start
+        store_results(results, elapsed * 1000)
+        stats["children"] += len(results)
+        stats["seconds"] += elapsed
+    return stats
+
+
+# -----------------------------
+# Reads
+# -----------------------------
+_loaded = VersionedCache(256)
+
+
+def get_results(child_id: int, version=None):
+    """Stored :class:`ChildResults` of a child, or ``None`` if there are none yet.
+
+    Stale results are returned as they are; if ``version`` (``((max_id,
+    edits), catalog_version)``) differs from theirs, or nothing is stored,
+    the child is queued with :func:`request`.
+    """
+    with connection() as conn:
+        row = conn.execute(
+            "SELECT max_id, edits, catalog_version, computed_at FROM child_results WHERE child_id=?", (child_id,)
+        ).fetchone()
+        results = None
+        if row is not None:
+            # The version columns are part of the lookup, so a row replaced in
+            # between is a miss rather than a mislabelled payload.
+            results = _loaded.get_or_compute((child_id, tuple(row)), lambda: _load_payload(conn, child_id, row))
+    if results is None or (version is not None and results.version != version):
+        request(child_id)
+    return results
+
+
+def _load_payload(conn, child_id, row):
+    payload = conn.execute(
+        "SELECT payload FROM child_results WHERE child_id=? AND max_id=? AND edits=? AND catalog_version=? "
+        "AND computed_at=?", (child_id, *row)
+    ).fetchone()
+    return pickle.loads(payload[0]) if payload else None
+
+
+# -----------------------------
+# In-process queue
+# -----------------------------
+_executor = None
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def request(child_id: int):
+    """Queue a child for recomputation on the background pool (at most once)."""
+    global _executor
+    if PRECOMPUTE_WORKERS <= 0:
+        return
+    with _pending_lock:
+        if child_id in _pending:
+            return
+        _pending.add(child_id)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(PRECOMPUTE_WORKERS, thread_name_prefix="precompute")
+    _executor.submit(_run, child_id)
+
+
+def _run(child_id: int):
+    # Leave the pending set first: a write that lands while computing queues
+    # the child again instead of being lost.
+    with _pending_lock:
+        _pending.discard(child_id)
+    try:
+        refresh([child_id])
+        population.refresh([child_id])
+    except Exception:
+        log.exception("precomputing child %s failed", child_id)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--every", type=float, default=0, help="re-run every N seconds (0 = once)")
+    parser.add_argument("--batch", type=int, default=BATCH_CHILDREN, help="children per computation")
+    args = parser.parse_args(argv)
+
+    init_db()
+    while True:
+        # Alerts are precomputed by the alert engine; settle them on the same schedule.
+        while evaluate_alerts(500_000)["dirty_days"] == 500_000:
+            pass
+        stats = refresh(batch_children=args.batch)
+        if stats["children"]:
+            print(f"refreshed {stats['children']} children in {stats['seconds']:.2f}s "
+                  f"({stats['children'] / max(stats['seconds'], 1e-9):.0f} children/s)")
+        members = population.refresh(batch_children=args.batch)
+        if members:
+            print(f"updated population sketches for {members} children")
+        if not args.every:
+            break
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
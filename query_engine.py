@@ -0,0 +1,347 @@
+"""Pluggable engines for the dashboard's usage aggregations.
+
+The group-bys behind the balance score, the daily study/distraction trend,
+per-app totals and daily-limit alerts go through one engine, chosen with
+``QUERY_ENGINE``:
+
+* ``sqlite`` (default): the group-bys run inside SQLite on the
+  ``daily_usage_rollup`` key, so only aggregates reach pandas; the share of
+  rows already moved to the Parquet archive is grouped in pandas and added;
+* ``pandas``: loads the labelled rollup frame (``usage_store``) and groups
+  it in pandas;
+* ``duckdb``: an embedded DuckDB attaches the database file read-only
+  through its ``sqlite`` extension, scans the archive's Parquet files
+  directly and runs the same SQL vectorized. Needs ``pip install duckdb``
+  (an optional extra in ``requirements.txt``). The extension cannot use
+  SQLite's indexes, so every query scans the whole rollup: seconds per
+  child view, comparable to ``sqlite`` only for all-children aggregates.
+
+Every engine only reads; SQLite stays the transactional store. Results have
+the same shape whichever engine produced them, with apps and categories
+labelled from the shared catalog (family overrides applied).
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from analytics import with_balance_score
+from analytics.cache import VersionedCache
+from analytics.results import Metrics
+from archive import ARCHIVE_DIR, archived_paths, read_archive
+from catalog import get_catalog
+from db import DB_NAME, connection
+from shared_cache import child_scope
+from telemetry import span
+from usage_store import get_daily_usage, load_daily_usage_many
+
+QUERY_ENGINE = os.environ.get("QUERY_ENGINE", "sqlite")
+VIEW_CACHE_SIZE = 256
+
+# Aggregations over ``usage(child_id, day, app_id, usage_minutes)``; the
+# engine supplies ``usage`` (filters already applied) and the table prefix.
+_LABELLED = """
+    SELECT u.child_id, u.day, u.app_id, COALESCE(o.category, a.category) AS category, u.usage_minutes
+    FROM usage u
+    JOIN {db}children c ON c.child_id = u.child_id
+    JOIN {db}apps a ON a.app_id = u.app_id
+    LEFT JOIN {db}app_category_overrides o ON o.parent_id = c.parent_id AND o.app_id = u.app_id
+"""
+QUERIES = {
+    "daily_categories": """
+        SELECT child_id, day, category, CAST(SUM(usage_minutes) AS BIGINT) AS usage_minutes
+        FROM labelled GROUP BY child_id, day, category ORDER BY child_id, day, category
+    """,
+    "category_totals": """
+        SELECT child_id,
+               CAST(SUM(CASE WHEN category = 'Educational' THEN usage_minutes ELSE 0 END) AS BIGINT) AS total_study,
+               CAST(SUM(CASE WHEN category = 'Non-Educational' THEN usage_minutes ELSE 0 END) AS BIGINT)
+                   AS total_distract
+        FROM labelled GROUP BY child_id ORDER BY child_id
+    """,
+    "app_totals": """
+        SELECT child_id, app_id, CAST(SUM(usage_minutes) AS BIGINT) AS usage_minutes
+        FROM usage GROUP BY child_id, app_id ORDER BY child_id, app_id
+    """,
+    "over_limit": """
+        SELECT child_id, day, app_id, CAST(SUM(usage_minutes) AS BIGINT) AS usage_minutes
+        FROM usage GROUP BY child_id, day, app_id HAVING SUM(usage_minutes) > ? ORDER BY child_id, day, app_id
+    """,
+}
+
+
+def _where(child_ids, start_day=None, end_day=None, app_ids=None) -> tuple:
+    sql = f"child_id IN ({','.join('?' * len(child_ids))})"
+    params = [int(c) for c in child_ids]
+    if app_ids is not None:
+        sql += f" AND app_id IN ({','.join('?' * len(app_ids)) or 'NULL'})"
+        params += [int(a) for a in app_ids]
+    if start_day is not None:
+        sql += " AND day>=?"
+        params.append(int(start_day))
+    if end_day is not None:
+        sql += " AND day<=?"
+        params.append(int(end_day))
+    return sql, params
+
+
+# -----------------------------
+# Engines
+# -----------------------------
+class SQLEngine:
+    """Runs :data:`QUERIES`; subclasses provide the ``usage`` relation and execute."""
+
+    name = None
+    db = ""  # prefix of the database's tables
+
+    def _execute(self, kind: str, child_ids, start_day, end_day, app_ids, params=()) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def _sql(self, kind: str) -> str:
+        """The query after ``WITH usage AS (...), ``."""
+        return f"labelled AS ({_LABELLED.format(db=self.db)}) {QUERIES[kind]}"
+
+    def _query(self, kind, child_ids, start_day=None, end_day=None, app_ids=None, params=()) -> pd.DataFrame:
+        with span(f"query.{self.name}.{kind}"):
+            return self._execute(kind, [int(c) for c in child_ids], start_day, end_day, app_ids, list(params))
+
+    def daily_categories(self, child_ids, start_day=None, end_day=None, app_ids=None) -> pd.DataFrame:
+        """``child_id, Date, category, usage_minutes`` per child, day and category."""
+        frame = self._query("daily_categories", child_ids, start_day, end_day, app_ids)
+        frame["day"] = pd.to_datetime(frame["day"], unit="D")
+        frame["category"] = frame["category"].astype(get_catalog().category_dtype)
+        return frame.rename(columns={"day": "Date"})
+
+    def metrics(self, child_ids, start_day=None, end_day=None, app_ids=None) -> pd.DataFrame:
+        """:class:`Metrics` columns indexed by ``child_id`` (children with usage only)."""
+        frame = self._query("category_totals", child_ids, start_day, end_day, app_ids)
+        return with_balance_score(frame.set_index("child_id"))
+
+    def app_totals(self, child_ids, start_day=None, end_day=None, app_ids=None) -> pd.DataFrame:
+        """``child_id, app, usage_minutes`` per child and app."""
+        return _label_apps(self._query("app_totals", child_ids, start_day, end_day, app_ids))
+
+    def over_limit(self, limit: int, child_ids, start_day=None, end_day=None, app_ids=None) -> pd.DataFrame:
+        """``child_id, Date, app, usage_minutes`` of (day, app) totals above ``limit``."""
+        frame = _label_apps(self._query("over_limit", child_ids, start_day, end_day, app_ids, [int(limit)]))
+        frame["day"] = pd.to_datetime(frame["day"], unit="D")
+        return frame.rename(columns={"day": "Date"})
+
+
+# Group keys of each query, to add the archive's share to SQLite's result.
+_KEYS = {
+    "daily_categories": ["child_id", "day", "category"],
+    "category_totals": ["child_id"],
+    "app_totals": ["child_id", "app_id"],
+    "over_limit": ["child_id", "day", "app_id"],
+}
+
+
+class SQLiteEngine(SQLEngine):
+    name = "sqlite"
+
+    def __init__(self):
+        # A child's view is several queries over the same archived rows; the
+        # last single-child read is kept per thread (files never change once listed).
+        self._last = threading.local()
+
+    def _archived(self, conn, child_ids, start_day, end_day, app_ids) -> pd.DataFrame:
+        if len(child_ids) != 1:
+            return read_archive(child_ids, start_day, end_day, app_ids, conn=conn)
+        paths = tuple(archived_paths(child_ids, start_day, end_day, conn))
+        if not paths:
+            return pd.DataFrame()
+        key = (child_ids[0], start_day, end_day, None if app_ids is None else tuple(app_ids), paths)
+        if getattr(self._last, "key", None) != key:
+            self._last.key = key
+            self._last.frame = read_archive(child_ids, start_day, end_day, app_ids, conn=conn)
+        return self._last.frame
+
+    def _execute(self, kind, child_ids, start_day, end_day, app_ids, params=()):
+        with connection() as conn:
+            cold = self._archived(conn, child_ids, start_day, end_day, app_ids)
+            if cold.empty:
+                return self._hot(conn, kind, child_ids, start_day, end_day, app_ids, params)
+            # SQLite cannot read the Parquet files, so the archive's share is
+            # grouped in pandas and added by key; only late rows of archived
+            # days are in both.
+            if kind != "over_limit":
+                hot = self._hot(conn, kind, child_ids, start_day, end_day, app_ids, params)
+                return _add(kind, hot, _archive_totals(conn, kind, cold))
+            # The limit applies to the combined totals of archived days.
+            last = int(cold["day"].max())
+            late = self._hot(conn, kind, child_ids, start_day, last, app_ids, [-1])
+            totals = _add(kind, late, _archive_totals(conn, kind, cold))
+            totals = totals[totals["usage_minutes"] > params[0]]
+            if end_day is not None and end_day <= last:
+                return totals
+            rest = self._hot(conn, kind, child_ids, last + 1, end_day, app_ids, params)
+            return pd.concat([totals, rest], ignore_index=True)
+
+    def _hot(self, conn, kind, child_ids, start_day, end_day, app_ids, params) -> pd.DataFrame:
+        where, where_params = _where(child_ids, start_day, end_day, app_ids)
+        source = f"SELECT child_id, day, app_id, usage_minutes FROM daily_usage_rollup WHERE {where}"
+        return pd.read_sql_query(f"WITH usage AS ({source}), {self._sql(kind)}", conn,
+                                 params=where_params + list(params))
+
+
+def _archive_totals(conn, kind: str, cold: pd.DataFrame) -> pd.DataFrame:
+    """Archived raw rows as ``kind``'s columns, one row each (``_add`` groups them)."""
+    frame = cold[["child_id", "day", "app_id", "usage_minutes"]].astype("int64")
+    if kind in ("app_totals", "over_limit"):
+        return frame
+    catalog = get_catalog(conn)
+    parents = None
+    if catalog.overrides:
+        child_ids = [int(c) for c in frame["child_id"].unique()]
+        family = dict(conn.execute(
+            f"SELECT child_id, parent_id FROM children WHERE child_id IN ({','.join('?' * len(child_ids))})", child_ids
+        ))
+        parents = frame["child_id"].map(family).to_numpy()
+    category = catalog.label(frame["app_id"].to_numpy(), parents)[1]
+    if kind == "daily_categories":
+        return frame.assign(category=category.astype(str))
+    minutes = frame["usage_minutes"].to_numpy()
+    return pd.DataFrame({
+        "child_id": frame["child_id"],
+        "total_study": np.where(category == "Educational", minutes, 0),
+        "total_distract": np.where(category == "Non-Educational", minutes, 0),
+    })
+
+
+def _add(kind: str, hot: pd.DataFrame, cold: pd.DataFrame) -> pd.DataFrame:
+    frame = pd.concat([hot, cold[hot.columns]], ignore_index=True)
+    return frame.groupby(_KEYS[kind], as_index=False, sort=True).sum()
+
+
+class DuckDBEngine(SQLEngine):
+    name = "duckdb"
+    db = "usage_db."
+
+    def __init__(self, path: str = DB_NAME):
+        import duckdb  # optional dependency, only needed for this engine
+
+        self._db = duckdb.connect()
+        self._db.execute("INSTALL sqlite")
+        self._db.execute("LOAD sqlite")
+        self._db.execute(f"ATTACH {_literal(os.path.abspath(path))} AS usage_db (TYPE sqlite, READ_ONLY)")
+
+    def _execute(self, kind, child_ids, start_day, end_day, app_ids, params=()):
+        where, where_params = _where(child_ids, start_day, end_day, app_ids)
+        source = f"SELECT child_id, day, app_id, usage_minutes FROM usage_db.daily_usage_rollup WHERE {where}"
+        source_params = list(where_params)
+        paths = archived_paths(child_ids, start_day, end_day)
+        if paths:
+            files = ", ".join(_literal(os.path.join(ARCHIVE_DIR, p)) for p in paths)
+            source += f" UNION ALL SELECT child_id, day, app_id, usage_minutes FROM read_parquet([{files}]) WHERE {where}"
+            source_params += where_params
+        # A cursor is a separate connection to the same database, safe to use per thread.
+        cursor = self._db.cursor()
+        try:
+            return cursor.execute(f"WITH usage AS ({source}), {self._sql(kind)}", source_params + list(params)).df()
+        finally:
+            cursor.close()
+
+
+class PandasEngine:
+    """Loads the labelled rollup frame and groups it in pandas."""
+
+    name = "pandas"
+
+    def _frame(self, child_ids, start_day=None, end_day=None, app_ids=None) -> pd.DataFrame:
+        child_ids = [int(c) for c in child_ids]
+        if len(child_ids) == 1:
+            # The single-child frame is cached per data version in usage_store.
+            frame = get_daily_usage(child_ids[0], start_day, end_day, app_ids)
+            return frame.assign(child_id=child_ids[0])
+        frame = load_daily_usage_many(child_ids, start_day, end_day)
+        if app_ids is not None:
+            names = {app_id: name for name, app_id in get_catalog().app_ids.items()}
+            frame = frame[frame["app"].isin([names[a] for a in app_ids if a in names])]
+        return frame
+
+    def daily_categories(self, child_ids, start_day=None, end_day=None, app_ids=None) -> pd.DataFrame:
+        frame = self._frame(child_ids, start_day, end_day, app_ids)
+        return (frame.groupby(["child_id", "Date", "category"], observed=True)["usage_minutes"].sum()
+                .astype("int64").reset_index())
+
+    def metrics(self, child_ids, start_day=None, end_day=None, app_ids=None) -> pd.DataFrame:
+        frame = self._frame(child_ids, start_day, end_day, app_ids)
+        minutes = frame["usage_minutes"].astype("int64")
+        totals = pd.DataFrame({
+            "child_id": frame["child_id"],
+            "total_study": minutes.where(frame["category"].eq("Educational"), 0),
+            "total_distract": minutes.where(frame["category"].eq("Non-Educational"), 0),
+        }).groupby("child_id").sum()
+        return with_balance_score(totals)
+
+    def app_totals(self, child_ids, start_day=None, end_day=None, app_ids=None) -> pd.DataFrame:
+        frame = self._frame(child_ids, start_day, end_day, app_ids)
+        return (frame.groupby(["child_id", "app"], observed=True)["usage_minutes"].sum()
+                .astype("int64").reset_index())
+
+    def over_limit(self, limit: int, child_ids, start_day=None, end_day=None, app_ids=None) -> pd.DataFrame:
+        frame = self._frame(child_ids, start_day, end_day, app_ids)
+        over = frame[frame["usage_minutes"] > limit]
+        return over[["child_id", "Date", "app", "usage_minutes"]].astype({"usage_minutes": "int64"})
+
+
+ENGINES = {"sqlite": SQLiteEngine, "pandas": PandasEngine, "duckdb": DuckDBEngine}
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(name: str = None):
+    """The process-wide engine called ``name`` (default ``QUERY_ENGINE``)."""
+    name = name or QUERY_ENGINE
+    if name not in ENGINES:
+        raise ValueError(f"Unknown query engine {name!r}; expected one of {sorted(ENGINES)}")
+    with _engines_lock:
+        if name not in _engines:
+            _engines[name] = ENGINES[name]()
+        return _engines[name]
+
+
+def _label_apps(frame: pd.DataFrame) -> pd.DataFrame:
+    frame.insert(frame.columns.get_loc("app_id"), "app", get_catalog().label(frame.pop("app_id").to_numpy())[0])
+    return frame
+
+
+def _literal(text: str) -> str:
+    return "'" + text.replace("'", "''") + "'"
+
+
+# -----------------------------
+# Dashboard views
+# -----------------------------
+_views = VersionedCache(VIEW_CACHE_SIZE, shared="views")
+
+
+def child_view(child_id: int, version, start_day=None, end_day=None, app_ids=None, apps=None, engine=None) -> tuple:
+    """``(Metrics, minutes per app in apps order, Date x category minutes)`` for a filtered view.
+
+    Memoized on ``version`` (``(data_version, catalog_version)``), like the
+    frames it replaces, in this process and in ``shared_cache``.
+    """
+    engine = get_engine(engine)
+    app_ids = None if app_ids is None else tuple(app_ids)
+    apps = None if apps is None else tuple(apps)
+    key = (engine.name, child_id, version, start_day, end_day, app_ids, apps)
+    return _views.get_or_compute(
+        key, lambda: _child_view(engine, child_id, start_day, end_day, app_ids, apps), child_scope(child_id)
+    )
+
+
+def _child_view(engine, child_id, start_day, end_day, app_ids, apps) -> tuple:
+    metrics = engine.metrics([child_id], start_day, end_day, app_ids)
+    metrics = Metrics(*(int(v) for v in metrics.iloc[0])) if len(metrics) else Metrics(0, 0, 0, 0)
+    totals = engine.app_totals([child_id], start_day, end_day, app_ids).set_index("app")["usage_minutes"]
+    totals.index = totals.index.astype(str)
+    if apps is not None:
+        totals = totals.reindex(list(apps), fill_value=0)
+    totals = totals.rename_axis("app").astype("int64")
+    daily = engine.daily_categories([child_id], start_day, end_day, app_ids)
+    daily = daily.pivot(index="Date", columns="category", values="usage_minutes")
+    daily.columns = daily.columns.astype(str)
+    return metrics, totals, daily.rename_axis(columns="category").dropna(axis=1, how="all").fillna(0)
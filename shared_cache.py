@@ -0,0 +1,267 @@
+"""Cross-process result cache on local disk, beneath the in-process caches.
+
+Several dashboard server processes behind a load balancer each keep their
+own LRUs (``analytics.cache.VersionedCache``, the chart PNG cache). This
+tier is one SQLite file shared by all of them, so a view, forecast or chart
+computed by one worker is reused by the others and by a restarted worker.
+
+Entries are keyed by ``(namespace, signature)``, where the signature is the
+query or filter key. Each entry also records:
+
+* the data version it was computed from (a lookup with another version is a
+  miss, and the next put replaces the entry);
+* the scope it belongs to (``child:<id>`` or ``family:<username>``).
+
+The file is ``SHARED_CACHE_PATH`` (default: next to the usage database), in
+WAL mode. Each put is one atomic upsert, so readers never see half an entry
+and never wait for writers. Payloads are kept under ``SHARED_CACHE_MB`` by
+evicting the least recently used entries; access times are refreshed at
+most once per ``TOUCH_SECONDS`` per entry. Save Changes and Add Record in
+the dashboard and ``dynamic_users.add_child`` drop their scopes' entries.
+
+Any SQLite error is logged and treated as a miss: the cache never fails a
+rerun. ``SHARED_CACHE=0`` turns it off. :func:`stats` reports this process's
+hit rate and lookup latency per namespace. They are also exported on the
+telemetry Prometheus endpoint, and lookups show in traces as
+``shared_cache.get.<namespace>`` spans.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from db import DB_NAME, connection, transaction
+from telemetry import register_metrics, span
+
+ENABLED = os.environ.get("SHARED_CACHE", "1") == "1"
+PATH = os.environ.get("SHARED_CACHE_PATH", os.path.splitext(DB_NAME)[0] + ".cache.db")
+MAX_BYTES = int(float(os.environ.get("SHARED_CACHE_MB", "256")) * 2**20)
+MAX_ENTRY_BYTES = MAX_BYTES // 16  # larger payloads are not worth a slot
+LOW_WATER = 0.9  # eviction frees space down to this share of MAX_BYTES
+TOUCH_SECONDS = 1.0
+LATENCY_SAMPLES = 1024
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key BLOB PRIMARY KEY,
+    scope TEXT,
+    version BLOB NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_scope ON entries(scope);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed);
+CREATE TABLE IF NOT EXISTS totals (bytes INTEGER NOT NULL);
+INSERT INTO totals SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM totals);
+CREATE TRIGGER IF NOT EXISTS entries_added AFTER INSERT ON entries
+BEGIN UPDATE totals SET bytes = bytes + NEW.size; END;
+CREATE TRIGGER IF NOT EXISTS entries_replaced AFTER UPDATE OF size ON entries
+BEGIN UPDATE totals SET bytes = bytes + NEW.size - OLD.size; END;
+CREATE TRIGGER IF NOT EXISTS entries_removed AFTER DELETE ON entries
+BEGIN UPDATE totals SET bytes = bytes - OLD.size; END;
+"""
+
+MISSING = object()
+
+
+def child_scope(child_id: int) -> str:
+    return f"child:{int(child_id)}"
+
+
+def family_scope(username: str) -> str:
+    return f"family:{username}"
+
+
+# -----------------------------
+# Metrics
+# -----------------------------
+class _Counters:
+    def __init__(self):
+        self.hits = self.misses = self.puts = self.evictions = self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)  # seconds per lookup
+
+
+_counters = {}
+_counters_lock = threading.Lock()
+
+
+def _count(namespace: str, **increments):
+    with _counters_lock:
+        counters = _counters.setdefault(namespace, _Counters())
+        latency = increments.pop("latency", None)
+        if latency is not None:
+            counters.latencies.append(latency)
+        for name, value in increments.items():
+            setattr(counters, name, getattr(counters, name) + value)
+
+
+def _quantile(values, q: float) -> float:
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def stats() -> dict:
+    """``{namespace: {hits, misses, hit_rate, p50_ms, p95_ms, puts, evictions, errors}}`` of this process."""
+    with _counters_lock:
+        result = {}
+        for namespace, c in sorted(_counters.items()):
+            lookups = sorted(c.latencies)
+            result[namespace] = {
+                "hits": c.hits,
+                "misses": c.misses,
+                "hit_rate": c.hits / max(c.hits + c.misses, 1),
+                "p50_ms": _quantile(lookups, 0.5) * 1000,
+                "p95_ms": _quantile(lookups, 0.95) * 1000,
+                "puts": c.puts,
+                "evictions": c.evictions,
+                "errors": c.errors,
+            }
+    return result
+
+
+def reset_stats():
+    with _counters_lock:
+        _counters.clear()
+
+
+def _prometheus_lines() -> list:
+    lines = ["# HELP shared_cache_lookups_total Shared cache lookups by namespace and result.",
+             "# TYPE shared_cache_lookups_total counter"]
+    current = stats()
+    for namespace, s in current.items():
+        lines.append(f'shared_cache_lookups_total{{namespace="{namespace}",result="hit"}} {s["hits"]}')
+        lines.append(f'shared_cache_lookups_total{{namespace="{namespace}",result="miss"}} {s["misses"]}')
+    lines += ["# HELP shared_cache_lookup_seconds Recent shared cache lookup latency.",
+              "# TYPE shared_cache_lookup_seconds gauge"]
+    for namespace, s in current.items():
+        lines.append(f'shared_cache_lookup_seconds{{namespace="{namespace}",quantile="0.5"}} {s["p50_ms"] / 1000:.6f}')
+        lines.append(f'shared_cache_lookup_seconds{{namespace="{namespace}",quantile="0.95"}} {s["p95_ms"] / 1000:.6f}')
+    lines += ["# HELP shared_cache_evictions_total Entries evicted by this process's puts.",
+              "# TYPE shared_cache_evictions_total counter"]
+    lines += [f'shared_cache_evictions_total{{namespace="{n}"}} {s["evictions"]}' for n, s in current.items()]
+    return lines
+
+
+register_metrics(_prometheus_lines)
+
+
+# -----------------------------
+# Storage
+# -----------------------------
+_ready = set()
+_ready_lock = threading.Lock()
+
+
+def _ensure_schema(path: str):
+    if path in _ready:
+        return
+    with _ready_lock:
+        if path not in _ready:
+            with connection(path) as conn:
+                conn.executescript(SCHEMA)
+            _ready.add(path)
+
+
+def _key(namespace: str, signature) -> bytes:
+    return hashlib.blake2b(pickle.dumps((namespace, signature), protocol=4), digest_size=16).digest()
+
+
+def get(namespace: str, signature, version=None, path: str = PATH):
+    """The cached value, or :data:`MISSING` if absent or computed from another version."""
+    key, wanted = _key(namespace, signature), pickle.dumps(version, protocol=4)
+    started = time.perf_counter()
+    try:
+        with span(f"shared_cache.get.{namespace}"):
+            _ensure_schema(path)
+            with connection(path) as conn:
+                row = conn.execute("SELECT version, value, accessed FROM entries WHERE key=?", (key,)).fetchone()
+                hit = row is not None and row[0] == wanted
+                now = time.time()
+                if hit and now - row[2] > TOUCH_SECONDS:
+                    conn.execute("UPDATE entries SET accessed=? WHERE key=?", (now, key))
+            value = pickle.loads(row[1]) if hit else MISSING
+    except sqlite3.Error:
+        log.warning("shared cache lookup failed (%s)", namespace, exc_info=True)
+        _count(namespace, misses=1, errors=1)
+        return MISSING
+    _count(namespace, hits=int(hit), misses=int(not hit), latency=time.perf_counter() - started)
+    return value
+
+
+def put(namespace: str, signature, value, version=None, scope: str = None, path: str = PATH):
+    """Store ``value``, replacing any older version, then evict LRU entries above ``MAX_BYTES``."""
+    payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    if len(payload) > MAX_ENTRY_BYTES:
+        return
+    row = (_key(namespace, signature), scope, pickle.dumps(version, protocol=4), payload, len(payload), time.time())
+    try:
+        _ensure_schema(path)
+        with transaction(path) as conn:
+            conn.execute("""
+                INSERT INTO entries (key, scope, version, value, size, accessed) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    scope = excluded.scope, version = excluded.version, value = excluded.value,
+                    size = excluded.size, accessed = excluded.accessed
+            """, row)
+            evicted = _evict(conn)
+    except sqlite3.Error:
+        log.warning("shared cache write failed (%s)", namespace, exc_info=True)
+        _count(namespace, errors=1)
+        return
+    _count(namespace, puts=1, evictions=evicted)
+
+
+def _evict(conn) -> int:
+    """Once over ``MAX_BYTES``, delete the least recently used entries down to the low-water mark."""
+    evicted, limit = 0, MAX_BYTES
+    while conn.execute("SELECT bytes FROM totals").fetchone()[0] > limit:
+        deleted = conn.execute(
+            "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed LIMIT 32)"
+        ).rowcount
+        if not deleted:
+            break
+        evicted, limit = evicted + deleted, MAX_BYTES * LOW_WATER
+    return evicted
+
+
+def get_or_compute(namespace: str, signature, compute, version=None, scope: str = None):
+    """``compute()`` once across every process sharing the cache (per signature and version)."""
+    if not ENABLED:
+        return compute()
+    value = get(namespace, signature, version)
+    if value is MISSING:
+        value = compute()
+        put(namespace, signature, value, version, scope)
+    return value
+
+
+def invalidate(*scopes: str, path: str = PATH):
+    """Drop every entry of ``scopes`` (e.g. :func:`child_scope` after a write)."""
+    if not ENABLED or not scopes:
+        return
+    try:
+        _ensure_schema(path)
+        with transaction(path) as conn:
+            conn.executemany("DELETE FROM entries WHERE scope=?", [(s,) for s in scopes])
+    except sqlite3.Error:
+        log.warning("shared cache invalidation failed", exc_info=True)
+
+
+def clear(path: str = PATH):
+    _ensure_schema(path)
+    with transaction(path) as conn:
+        conn.execute("DELETE FROM entries")
+
+
+def usage(path: str = PATH) -> tuple:
+    """``(entries, payload bytes)`` currently stored."""
+    _ensure_schema(path)
+    with connection(path) as conn:
+        return (conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0],
+                conn.execute("SELECT bytes FROM totals").fetchone()[0])
@@ -0,0 +1,318 @@
+"""Lightweight per-rerun tracing: named spans plus SQL query and row counters.
+
+Off unless ``DASHBOARD_TRACE=1``. When off, :func:`span` returns a shared
+no-op context manager, :func:`traced` returns the function unchanged and
+pooled connections are plain ``sqlite3`` connections, so the cost is one
+attribute check per span.
+
+When on, every rerun is a :class:`Trace` of nested spans (offset, duration,
+SQL statements, rows fetched and time spent inside SQLite calls, inclusive
+of child spans). Finished traces
+are appended to ``DASHBOARD_TRACE_FILE`` as JSON lines when set, and
+aggregated per span name for a Prometheus text endpoint on
+``DASHBOARD_TRACE_PORT`` (``GET /metrics``).
+"""
+import contextlib
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENABLED = os.environ.get("DASHBOARD_TRACE", "") not in ("", "0")
+TRACE_FILE = os.environ.get("DASHBOARD_TRACE_FILE")
+PROMETHEUS_PORT = int(os.environ.get("DASHBOARD_TRACE_PORT", "0"))
+
+log = logging.getLogger(__name__)
+
+_local = threading.local()
+_NOOP = contextlib.nullcontext()
+
+
+# -----------------------------
+# Traces and spans
+# -----------------------------
+class Trace:
+    def __init__(self, name: str):
+        self.name = name
+        self.wall_time = time.time()
+        self.started = time.perf_counter()
+        self.duration = None
+        self.spans = []
+        self.stack = []
+        self.section = None
+
+    def to_dict(self) -> dict:
+        root = {"sql_queries": 0, "rows": 0, "sql_ms": 0.0}
+        for record in self.spans:
+            if record["depth"] == 0:
+                root["sql_queries"] += record["sql_queries"]
+                root["rows"] += record["rows"]
+                root["sql_ms"] += record["sql_seconds"] * 1000
+        root["sql_ms"] = round(root["sql_ms"], 3)
+        return {
+            "name": self.name,
+            "ts": self.wall_time,
+            "duration_ms": round(self.duration * 1000, 3),
+            **root,
+            "spans": [
+                {
+                    "name": record["name"],
+                    "depth": record["depth"],
+                    "start": round(record["start"] * 1000, 3),
+                    "duration": round(record["duration"] * 1000, 3),
+                    "sql_queries": record["sql_queries"],
+                    "rows": record["rows"],
+                    "sql_ms": round(record["sql_seconds"] * 1000, 3),
+                }
+                for record in sorted(self.spans, key=lambda r: r["start"])
+            ],
+        }
+
+
+def current_trace():
+    return getattr(_local, "trace", None)
+
+
+@contextlib.contextmanager
+def _span(trace, name):
+    record = {"name": name, "start": time.perf_counter() - trace.started, "depth": len(trace.stack),
+              "sql_queries": 0, "rows": 0, "sql_seconds": 0.0}
+    trace.stack.append(record)
+    try:
+        yield record
+    finally:
+        record["duration"] = time.perf_counter() - trace.started - record["start"]
+        trace.stack.pop()
+        trace.spans.append(record)
+
+
+def span(name: str):
+    """Context manager timing ``name`` inside the current trace (no-op when off)."""
+    trace = getattr(_local, "trace", None) if ENABLED else None
+    if trace is None:
+        return _NOOP
+    return _span(trace, name)
+
+
+def traced(name: str):
+    """Decorator form of :func:`span`; returns ``fn`` itself when tracing is off."""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def start_trace(name: str = "rerun"):
+    """Begin a trace for this thread (one Streamlit rerun); ``None`` when off."""
+    if not ENABLED:
+        return None
+    if PROMETHEUS_PORT:
+        serve_prometheus(PROMETHEUS_PORT)
+    _local.trace = Trace(name)
+    return _local.trace
+
+
+def section(name: str):
+    """End the open top-level section of the current trace and start ``name``.
+
+    Lets a flat script mark consecutive sections without re-indenting them.
+    """
+    trace = getattr(_local, "trace", None) if ENABLED else None
+    if trace is None:
+        return
+    if trace.section is not None:
+        trace.section.__exit__(None, None, None)
+    trace.section = _span(trace, name)
+    trace.section.__enter__()
+
+
+def finish_trace():
+    """Close the current trace, export it, and return it as a dict (``None`` when off)."""
+    trace = getattr(_local, "trace", None) if ENABLED else None
+    if trace is None:
+        return None
+    if trace.section is not None:
+        trace.section.__exit__(None, None, None)
+        trace.section = None
+    trace.duration = time.perf_counter() - trace.started
+    _local.trace = None
+    result = trace.to_dict()
+    _aggregate(result)
+    if TRACE_FILE:
+        with open(TRACE_FILE, "a") as fh:
+            fh.write(json.dumps(result) + "\n")
+    return result
+
+
+# -----------------------------
+# SQL counters
+# -----------------------------
+def _count(started: float, queries: int = 0, rows: int = 0):
+    elapsed = time.perf_counter() - started
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        return
+    for record in trace.stack:
+        record["sql_queries"] += queries
+        record["rows"] += rows
+        record["sql_seconds"] += elapsed
+
+
+class TracedCursor(sqlite3.Cursor):
+    def execute(self, *args):
+        started = time.perf_counter()
+        try:
+            return super().execute(*args)
+        finally:
+            _count(started, queries=1)
+
+    def executemany(self, *args):
+        started = time.perf_counter()
+        try:
+            return super().executemany(*args)
+        finally:
+            _count(started, queries=1)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        _count(started, rows=row is not None)
+        return row
+
+    def fetchmany(self, *args):
+        started = time.perf_counter()
+        rows = super().fetchmany(*args)
+        _count(started, rows=len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        _count(started, rows=len(rows))
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        row = super().__next__()
+        _count(started, rows=1)
+        return row
+
+
+class TracedConnection(sqlite3.Connection):
+    """``sqlite3`` connection whose cursors feed the current trace's counters."""
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    # The C implementations of these bypass cursor(), so route them through it.
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+
+CONNECTION_FACTORY = TracedConnection if ENABLED else sqlite3.Connection
+
+
+# -----------------------------
+# Prometheus export
+# -----------------------------
+_totals = {}  # span name -> [count, seconds, sql_queries, rows, sql_seconds]
+_totals_lock = threading.Lock()
+_reruns = [0, 0.0]
+_server = None
+_server_failed = False  # the port was taken: do not retry on every rerun
+_providers = []  # callables returning extra exposition lines (see shared_cache.py)
+
+
+def register_metrics(provider):
+    """Append ``provider()``'s lines to every ``/metrics`` response."""
+    _providers.append(provider)
+
+
+def _aggregate(result: dict):
+    with _totals_lock:
+        _reruns[0] += 1
+        _reruns[1] += result["duration_ms"] / 1000
+        for record in result["spans"]:
+            totals = _totals.setdefault(record["name"], [0, 0.0, 0, 0, 0.0])
+            totals[0] += 1
+            totals[1] += record["duration"] / 1000
+            totals[2] += record["sql_queries"]
+            totals[3] += record["rows"]
+            totals[4] += record["sql_ms"] / 1000
+
+
+def prometheus_text() -> str:
+    with _totals_lock:
+        lines = [
+            "# HELP dashboard_rerun_seconds Wall time of traced dashboard reruns.",
+            "# TYPE dashboard_rerun_seconds summary",
+            f"dashboard_rerun_seconds_count {_reruns[0]}",
+            f"dashboard_rerun_seconds_sum {_reruns[1]:.6f}",
+            "# HELP dashboard_span_seconds Time spent in named sections (inclusive of nested spans).",
+            "# TYPE dashboard_span_seconds summary",
+        ]
+        for name, (count, seconds, *_) in sorted(_totals.items()):
+            lines.append(f'dashboard_span_seconds_count{{span="{name}"}} {count}')
+            lines.append(f'dashboard_span_seconds_sum{{span="{name}"}} {seconds:.6f}')
+        lines += ["# HELP dashboard_sql_queries_total SQL statements executed per span.",
+                  "# TYPE dashboard_sql_queries_total counter"]
+        lines += [f'dashboard_sql_queries_total{{span="{name}"}} {t[2]}' for name, t in sorted(_totals.items())]
+        lines += ["# HELP dashboard_sql_rows_total Rows fetched per span.",
+                  "# TYPE dashboard_sql_rows_total counter"]
+        lines += [f'dashboard_sql_rows_total{{span="{name}"}} {t[3]}' for name, t in sorted(_totals.items())]
+        lines += ["# HELP dashboard_sql_seconds_total Time spent inside SQLite calls per span.",
+                  "# TYPE dashboard_sql_seconds_total counter"]
+        lines += [f'dashboard_sql_seconds_total{{span="{name}"}} {t[4]:.6f}' for name, t in sorted(_totals.items())]
+    for provider in _providers:
+        lines += provider()
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_prometheus(port: int = PROMETHEUS_PORT, host: str = "127.0.0.1"):
+    """Start the ``/metrics`` endpoint in a daemon thread (once per process).
+
+    Returns ``None`` if the port cannot be bound, e.g. when several server
+    processes share ``DASHBOARD_TRACE_PORT``; that is logged once, and tracing
+    carries on without the endpoint.
+    """
+    global _server, _server_failed
+    with _totals_lock:
+        if _server is not None or _server_failed:
+            return _server
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as exc:
+            _server_failed = True
+            log.warning("Prometheus endpoint not started on %s:%d: %s", host, port, exc)
+            return None
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
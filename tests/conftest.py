@@ -0,0 +1,34 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Module-level settings are read at import time: point them somewhere harmless.
+_scratch = tempfile.mkdtemp(prefix="child_usage_tests_")
+os.environ["CHILD_USAGE_DB"] = os.path.join(_scratch, "default.db")
+os.environ["CHILD_USAGE_ARCHIVE"] = os.path.join(_scratch, "archive")
+os.environ["SHARED_CACHE"] = "0"
+os.environ["PRECOMPUTE_WORKERS"] = "0"
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    """Path of an empty, migrated database that ``connection()`` uses by default."""
+    import archive
+    import catalog
+    import db
+    import population
+
+    path = str(tmp_path / "child_usage.db")
+    monkeypatch.setattr(db, "DB_NAME", path)
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    # Snapshots are cached by version number, which every new database reuses.
+    monkeypatch.setattr(catalog, "_catalog", None)
+    monkeypatch.setattr(population, "_sketches", (None, {}))
+    db.init_db(path)
+    yield path
+    db.get_pool(path).close()
@@ -0,0 +1,59 @@
+import datetime as dt
+
+import pytest
+
+from alert_engine import evaluate_alerts
+from archive import archive_usage
+from db import connection, transaction
+from ingest import bulk_insert
+from usage_store import get_app_ids, to_day
+
+ARCHIVED_AS_OF = dt.date(2024, 2, 10)  # with no horizon, archives everything before 2024-02-01
+
+
+@pytest.fixture
+def child_id(fresh_db):
+    with transaction() as conn:
+        return conn.execute("INSERT INTO children (parent_id, child_name) VALUES (NULL, 'Asha')").lastrowid
+
+
+def _alerts(child_id):
+    with connection() as conn:
+        return conn.execute(
+            "SELECT kind, date(period_day * 86400, 'unixepoch'), usage_minutes FROM alerts "
+            "WHERE child_id=? ORDER BY kind, period_day", (child_id,)
+        ).fetchall()
+
+
+def _usage(child_id, first_day, minutes):
+    youtube = get_app_ids()["YouTube"]
+    start = to_day(first_day)
+    bulk_insert([(child_id, start + i, youtube, m) for i, m in enumerate(minutes)])
+
+
+def test_late_row_on_an_archived_day_keeps_its_alerts(child_id):
+    _usage(child_id, "2024-01-01", [200] * 7)  # Monday to Sunday
+    evaluate_alerts()
+    archive_usage(as_of=ARCHIVED_AS_OF, horizon_days=0)
+    assert len(_alerts(child_id)) == 8
+
+    _usage(child_id, "2024-01-03", [5])
+    stats = evaluate_alerts()
+
+    assert stats["resolved"] == 0
+    alerts = _alerts(child_id)
+    assert ("daily", "2024-01-03", 205) in alerts
+    assert ("weekly", "2024-01-01", 1405) in alerts
+    assert len(alerts) == 8
+
+
+def test_week_straddling_the_archive_cutoff_counts_archived_days(child_id):
+    _usage(child_id, "2024-01-29", [100] * 7)  # Mon 29 Jan to Sun 4 Feb: 700 > 600
+    evaluate_alerts()
+    archive_usage(as_of=ARCHIVED_AS_OF, horizon_days=0)  # moves 29-31 Jan
+    assert _alerts(child_id) == [("weekly", "2024-01-29", 700)]
+
+    _usage(child_id, "2024-02-02", [5])
+    evaluate_alerts()
+
+    assert _alerts(child_id) == [("weekly", "2024-01-29", 705)]
@@ -0,0 +1,47 @@
+import hashlib
+
+import dynamic_users
+import passwords
+
+
+def test_issuing_a_token_drops_expired_sessions(monkeypatch):
+    monkeypatch.setattr(dynamic_users, "_sessions", {})
+    clock = [1000.0]
+    monkeypatch.setattr(dynamic_users.time, "time", lambda: clock[0])
+    abandoned = dynamic_users._issue_token("parent")
+
+    clock[0] += dynamic_users.SESSION_TTL_SECONDS + 1
+    fresh = dynamic_users._issue_token("parent")
+
+    assert abandoned not in dynamic_users._sessions
+    assert dynamic_users.current_parent({"auth_token": fresh}) == "parent"
+
+
+def test_login_issues_a_token_once(fresh_db, monkeypatch):
+    monkeypatch.setattr(dynamic_users, "_sessions", {})
+    dynamic_users.add_parent("parent", "secret")
+    session = {}
+    assert dynamic_users.ensure_login("parent", "wrong", session=session) is None
+    assert dynamic_users.ensure_login("parent", "secret", session=session) == "parent"
+    assert len(dynamic_users._sessions) == 1
+    assert dynamic_users.ensure_login("parent", "secret", session=session) == "parent"
+    assert len(dynamic_users._sessions) == 1
+
+
+def test_a_successful_login_forgets_the_attempt(fresh_db, monkeypatch):
+    monkeypatch.setattr(dynamic_users, "_sessions", {})
+    dynamic_users.add_parent("parent", "secret")
+    session = {}
+    dynamic_users.ensure_login("parent", "wrong", session=session)
+    unkeyed = hashlib.sha256(b"parent\0wrong").hexdigest()
+    assert session["login_attempt"] != unkeyed
+    dynamic_users.ensure_login("parent", "secret", session=session)
+    assert "login_attempt" not in session
+
+
+def test_unknown_users_cost_a_password_check(fresh_db, monkeypatch):
+    checks = []
+    verify_password = passwords.verify_password
+    monkeypatch.setattr(passwords, "verify_password", lambda *a: checks.append(a) or verify_password(*a))
+    assert dynamic_users.authenticate_parent("nobody", "secret") is False
+    assert len(checks) == 1 and passwords.is_hashed(checks[0][1])
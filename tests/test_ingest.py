@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+
+import population
+from db import connection, transaction
+from ingest import diff_editor_changes, import_usage_file
+
+
+def _frame(ids, minutes):
+    return pd.DataFrame({"id": ids, "app": "YouTube", "usage_minutes": minutes})
+
+
+def test_only_changed_minutes_are_returned():
+    original = _frame([1, 2, 3], [10, 20, 30])
+    edited = _frame([1, 2, 3], [10, 25, 0])
+    assert diff_editor_changes(original, edited) == [(25, 2), (0, 3)]
+
+
+def test_untouched_editor_has_no_changes():
+    original = _frame([1, 2], [10, 20])
+    assert diff_editor_changes(original, original.copy()) == []
+
+
+def test_added_and_blanked_rows_are_skipped():
+    original = _frame([1, 2], [10, 20])
+    # The editor returns floats once a row has no id or a cell was cleared.
+    edited = pd.DataFrame({
+        "id": [1.0, 2.0, None, 99.0],
+        "app": "YouTube",
+        "usage_minutes": [11.0, None, 40.0, 5.0],
+    })
+    assert diff_editor_changes(original, edited) == [(11, 1)]
+
+
+def test_editor_order_does_not_matter():
+    original = _frame([1, 2, 3], [10, 20, 30])
+    edited = _frame([3, 1, 2], [31, 10, 20])
+    assert diff_editor_changes(original, edited) == [(31, 3)]
+
+
+@pytest.fixture
+def twin_kids(fresh_db):
+    """Two families, each with a child called Kid1."""
+    with transaction() as conn:
+        for username in ("alice", "bob"):
+            parent_id = conn.execute("INSERT INTO parents (username) VALUES (?)", (username,)).lastrowid
+            conn.execute("INSERT INTO children (parent_id, child_name) VALUES (?, 'Kid1')", (parent_id,))
+
+
+def _import(tmp_path, text):
+    path = tmp_path / "usage.csv"
+    path.write_text(text)
+    return import_usage_file(str(path))
+
+
+def _usage():
+    with connection() as conn:
+        return conn.execute("SELECT child_id, usage_minutes FROM usage_records").fetchall()
+
+
+def test_import_rejects_a_child_name_shared_by_families(twin_kids, tmp_path):
+    with pytest.raises(ValueError, match="several families"):
+        _import(tmp_path, "child,date,app,usage_minutes\nKid1,2026-03-01,YouTube,30\n")
+    assert _usage() == []
+
+
+def test_import_resolves_children_through_the_parent_column(twin_kids, tmp_path):
+    assert _import(tmp_path, "parent,child,date,app,usage_minutes\nbob,Kid1,2026-03-01,YouTube,30\n") == 1
+    assert _usage() == [(2, 30)]
+    assert population.stale_children() == []
+
+
+def test_import_rejects_unknown_apps_without_touching_the_catalog(twin_kids, tmp_path):
+    with connection() as conn:
+        version = conn.execute("SELECT version FROM catalog_version").fetchone()[0]
+    with pytest.raises(ValueError, match="Unknown apps"):
+        _import(tmp_path, "child_id,date,app,usage_minutes\n1,2026-03-01,Duolingo,30\n")
+    with connection() as conn:
+        assert conn.execute("SELECT version FROM catalog_version").fetchone()[0] == version
+        assert conn.execute("SELECT COUNT(*) FROM apps WHERE name='Duolingo'").fetchone()[0] == 0
@@ -0,0 +1,122 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+import population
+from db import connection, transaction
+from ingest_service import IngestService
+
+
+@pytest.fixture
+def child_id(fresh_db):
+    with transaction() as conn:
+        return conn.execute("INSERT INTO children (parent_id, child_name) VALUES (NULL, 'Asha')").lastrowid
+
+
+def _stored(child_id):
+    with connection() as conn:
+        return conn.execute(
+            "SELECT usage_minutes FROM usage_data WHERE child_id=? ORDER BY id", (child_id,)
+        ).fetchall()
+
+
+async def _submit(service, *events):
+    for event in events:
+        await service.submit(event)
+    while service.queue.qsize():
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+
+def _run(child_id, scenario):
+    async def main():
+        service = IngestService()
+        aggregator = asyncio.create_task(service.aggregate())
+        try:
+            return await scenario(service)
+        finally:
+            aggregator.cancel()
+    return asyncio.run(main())
+
+
+def test_fractional_minutes_are_carried_until_whole(child_id):
+    event = {"child_id": child_id, "app": "YouTube", "ts": "2026-02-03T18:04:00", "minutes": 0.4}
+
+    async def scenario(service):
+        for _ in range(10):
+            await _submit(service, event)
+            assert await service.flush()
+        return service
+
+    service = _run(child_id, scenario)
+    assert sum(m for (m,) in _stored(child_id)) == 4
+    assert (0,) not in _stored(child_id)
+    assert service.buckets == {}
+
+
+def test_final_flush_rounds_the_remainder(child_id):
+    event = {"child_id": child_id, "app": "YouTube", "ts": "2026-02-03", "minutes": 1.6}
+
+    async def scenario(service):
+        await _submit(service, event)
+        await service.flush()
+        await service.flush(final=True)
+
+    _run(child_id, scenario)
+    assert _stored(child_id) == [(1,), (1,)]
+
+
+def test_failed_write_is_retried(child_id, monkeypatch):
+    write = IngestService._write
+    failures = [sqlite3.OperationalError("database is locked")]
+
+    def flaky_write(rows):
+        if failures:
+            raise failures.pop()
+        write(rows)
+
+    monkeypatch.setattr(IngestService, "_write", staticmethod(flaky_write))
+    event = {"child_id": child_id, "app": "YouTube", "ts": "2026-02-03", "minutes": 3}
+
+    async def scenario(service):
+        await _submit(service, event)
+        assert not await service.flush()
+        await _submit(service, event)
+        assert await service.flush()
+        return service
+
+    service = _run(child_id, scenario)
+    assert _stored(child_id) == [(6,)]
+    assert service.stats["failed_flushes"] == 1
+
+
+def test_unknown_apps_are_rejected(child_id):
+    event = {"child_id": child_id, "app": "Zzz", "category": "Whatever", "ts": "2026-02-03", "minutes": 5}
+
+    async def scenario(service):
+        await _submit(service, event)
+        await service.flush()
+        return service
+
+    service = _run(child_id, scenario)
+    assert service.stats["rejected"] == 1
+    assert _stored(child_id) == []
+    with connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM apps WHERE name='Zzz'").fetchone()[0] == 0
+
+
+def test_flushed_children_reach_the_population_sketches(child_id):
+    event = {"child_id": child_id, "app": "YouTube", "ts": "2026-02-03", "minutes": 30}
+
+    async def scenario(service):
+        await _submit(service, event)
+        await service.flush()
+        assert service.touched == {child_id}
+        await service.refresh_population()
+        return service
+
+    service = _run(child_id, scenario)
+    assert service.stats["population_refreshes"] == 1
+    assert population.stale_children() == []
+    assert population.child_standing(child_id).get(population.app_metric("YouTube")) == (30, 50.0)
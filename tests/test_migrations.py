@@ -0,0 +1,88 @@
+import sqlite3
+
+import db
+from migrations import MIGRATIONS
+from passwords import is_hashed, verify_password
+
+
+def _legacy_db(path):
+    """A database as the original dashboard created it, before any migration."""
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+    CREATE TABLE parents (parent_id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE, password TEXT);
+    CREATE TABLE children (child_id INTEGER PRIMARY KEY AUTOINCREMENT, parent_id INTEGER, child_name TEXT,
+                           FOREIGN KEY(parent_id) REFERENCES parents(parent_id));
+    CREATE TABLE usage_data (id INTEGER PRIMARY KEY AUTOINCREMENT, child TEXT, date TEXT, app TEXT,
+                             category TEXT, usage_minutes INTEGER);
+    INSERT INTO parents (username, password) VALUES ('parent', 'secret');
+    INSERT INTO children (parent_id, child_name) VALUES (1, 'Asha');
+    """)
+    conn.executemany(
+        "INSERT INTO usage_data (child, date, app, category, usage_minutes) VALUES (?, ?, ?, ?, ?)",
+        [
+            ("Asha", "2025-01-01", "YouTube", "Non-Educational", 30),
+            ("Asha", "2025-01-01", "YouTube", "Non-Educational", 15),
+            ("Asha", "2025-01-02", "Duolingo", "Educational", 20),
+            ("Ravi", "2025-01-02", "VS-Code", "Educational", None),
+            (None, "2025-01-03", "YouTube", "Non-Educational", 5),
+            ("Asha", "not a date", "YouTube", "Non-Educational", 7),
+            ("Asha", "2025-01-04", None, None, 9),
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_legacy_database_upgrades_in_place(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    _legacy_db(path)
+
+    db.init_db(path)
+
+    with db.connection(path) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == MIGRATIONS[-1][0]
+        rows = conn.execute(
+            "SELECT child, date, app, category, usage_minutes FROM usage_records ORDER BY id"
+        ).fetchall()
+        assert rows == [
+            ("Asha", "2025-01-01", "YouTube", "Non-Educational", 30),
+            ("Asha", "2025-01-01", "YouTube", "Non-Educational", 15),
+            ("Asha", "2025-01-02", "Duolingo", "Educational", 20),
+            ("Ravi", "2025-01-02", "VS-Code", "Educational", 0),
+        ]
+        # The rollup and the per-child versions are filled from the migrated rows.
+        assert conn.execute(
+            "SELECT SUM(usage_minutes) FROM daily_usage_rollup r JOIN children c USING (child_id) "
+            "WHERE c.child_name='Asha'"
+        ).fetchone()[0] == 65
+        assert conn.execute("SELECT COUNT(*) FROM child_versions").fetchone()[0] == 2
+        stored = conn.execute("SELECT password FROM parents WHERE username='parent'").fetchone()[0]
+    # Plaintext passwords are hashed at rest without waiting for a login.
+    assert is_hashed(stored)
+    assert verify_password("secret", stored) == (True, False)
+    db.get_pool(path).close()
+
+
+def test_unmigratable_legacy_rows_are_kept(tmp_path, caplog):
+    path = str(tmp_path / "legacy.db")
+    _legacy_db(path)
+
+    with caplog.at_level("WARNING", logger="migrations"):
+        db.init_db(path)
+
+    with db.connection(path) as conn:
+        kept = conn.execute(
+            "SELECT child, date, app, usage_minutes FROM usage_data_unmigrated ORDER BY id"
+        ).fetchall()
+    assert kept == [
+        (None, "2025-01-03", "YouTube", 5),
+        ("Asha", "not a date", "YouTube", 7),
+        ("Asha", "2025-01-04", None, 9),
+    ]
+    assert "3 legacy usage rows" in caplog.text
+    db.get_pool(path).close()
+
+
+def test_migrations_are_numbered_in_order():
+    versions = [version for version, _ in MIGRATIONS]
+    assert versions == list(range(1, len(versions) + 1))
@@ -0,0 +1,56 @@
+import pytest
+
+import population
+from catalog import recategorize, upsert_apps
+from db import connection, transaction
+from ingest import bulk_insert
+from population import BALANCE, app_metric, category_metric
+from usage_store import get_app_ids, to_day
+
+
+@pytest.fixture
+def families(fresh_db):
+    """Two families with two children each, one of them using only YouTube."""
+    with transaction() as conn:
+        parents = [conn.execute("INSERT INTO parents (username) VALUES (?)", (name,)).lastrowid
+                   for name in ("amy", "ben")]
+        children = [conn.execute("INSERT INTO children (parent_id, child_name) VALUES (?, ?)",
+                                 (parent, f"kid{i}")).lastrowid
+                    for i, parent in enumerate([parents[0], parents[0], parents[1], parents[1]])]
+    apps = get_app_ids()
+    start = to_day("2024-01-01")
+    rows = [(children[0], start + d, apps["YouTube"], 120) for d in range(4)]
+    for i, child_id in enumerate(children[1:], 1):
+        rows += [(child_id, start + d, apps[app], 30 * i)
+                 for d in range(4) for app in ("YouTube", "WhatsApp", "VS-Code")]
+    bulk_insert(rows)
+    population.refresh()
+    return parents, children
+
+
+def _stored(child_id):
+    with connection() as conn:
+        return dict(conn.execute("SELECT metric, bin FROM population_values WHERE child_id=?", (child_id,)))
+
+
+def test_zero_bins_are_not_stored_but_count(families):
+    _, children = families
+    assert set(_stored(children[0])) == {BALANCE, app_metric("YouTube"), category_metric("Non-Educational")}
+
+    standing = population.child_standing(children[0])
+    # Three of four children used WhatsApp more: kid0 is in the zero bin alone.
+    assert standing.get(app_metric("WhatsApp")) == (0, 12.5)
+    assert standing.get(app_metric("YouTube")) == (120, 87.5)
+    assert population.child_standing(children[3]).get(app_metric("WhatsApp")) == (90, 87.5)
+
+
+def test_catalog_changes_only_recompute_affected_families(families):
+    parents, children = families
+    upsert_apps([{"name": "Duolingo", "category": "Educational"}])
+    assert population.stale_children() == []
+
+    recategorize({"YouTube": "Educational"}, parent_id=parents[1])
+    assert population.stale_children() == children[2:]
+    assert population.refresh() == 2
+    assert population.stale_children() == []
+    assert population.child_standing(children[2]).get(category_metric("Educational"))[0] == 120  # YouTube + VS-Code
@@ -0,0 +1,16 @@
+import socket
+
+import telemetry
+
+
+def test_taken_prometheus_port_is_reported_once(monkeypatch, caplog):
+    monkeypatch.setattr(telemetry, "_server", None)
+    monkeypatch.setattr(telemetry, "_server_failed", False)
+    with socket.socket() as taken:
+        taken.bind(("127.0.0.1", 0))
+        taken.listen()
+        port = taken.getsockname()[1]
+        with caplog.at_level("WARNING", logger="telemetry"):
+            assert telemetry.serve_prometheus(port) is None
+            assert telemetry.serve_prometheus(port) is None
+    assert caplog.text.count("Prometheus endpoint not started") == 1
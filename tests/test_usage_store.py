@@ -0,0 +1,63 @@
+import datetime as dt
+
+import pandas as pd
+import pytest
+
+import usage_store
+from archive import archive_usage
+from catalog import recategorize
+from db import transaction
+from ingest import bulk_insert
+from usage_store import get_app_ids, get_daily_usage, load_daily_usage, to_day, update_minutes
+
+
+@pytest.fixture
+def child_id(fresh_db):
+    with transaction() as conn:
+        child_id = conn.execute("INSERT INTO children (parent_id, child_name) VALUES (NULL, 'Asha')").lastrowid
+    _usage(child_id, "2024-01-01", [10] * 20)
+    archive_usage(as_of=dt.date(2024, 1, 20), horizon_days=0)  # January 1-9 go to the archive
+    _usage(child_id, "2024-01-21", [20] * 5)
+    return child_id
+
+
+def _usage(child_id, first_day, minutes, app="YouTube"):
+    app_id = get_app_ids()[app]
+    start = to_day(first_day)
+    bulk_insert([(child_id, start + i, app_id, m) for i, m in enumerate(minutes)])
+
+
+@pytest.fixture
+def archive_reads(monkeypatch):
+    reads = []
+    read_archive = usage_store.read_archive
+    monkeypatch.setattr(usage_store, "read_archive", lambda *a, **kw: reads.append(a) or read_archive(*a, **kw))
+    return reads
+
+
+def _assert_fresh(child_id):
+    pd.testing.assert_frame_equal(get_daily_usage(child_id), load_daily_usage(child_id))
+
+
+def test_added_rows_are_spliced_in_without_rereading_the_archive(child_id, archive_reads):
+    get_daily_usage(child_id)
+    assert len(archive_reads) == 1
+
+    _usage(child_id, "2024-01-26", [30])
+    _usage(child_id, "2024-01-15", [5], app="WhatsApp")  # back-dated, before the cached last day
+    _usage(child_id, "2024-01-05", [5])  # late row on an archived day
+    frame = get_daily_usage(child_id)
+    assert len(archive_reads) == 1
+    _assert_fresh(child_id)
+    assert frame["usage_minutes"].sum() == 20 * 10 + 5 * 20 + 30 + 5 + 5
+
+
+def test_edits_and_catalog_changes_stay_correct(child_id):
+    get_daily_usage(child_id)
+    recategorize({"YouTube": "Educational"})
+    assert set(get_daily_usage(child_id)["category"]) == {"Educational"}
+    _assert_fresh(child_id)
+
+    update_minutes([(99, 15)])
+    _assert_fresh(child_id)
+    assert get_daily_usage(child_id)["usage_minutes"].sum() == 20 * 10 + 5 * 20 + 99 - 10  # row 15 is January 15
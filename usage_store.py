@@ -0,0 +1,476 @@
+import datetime as dt
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from archive import count_archive, read_archive
+from catalog import get_catalog
+from db import connection, transaction
+from telemetry import traced
+
+EPOCH = dt.date(1970, 1, 1)
+
+
+# -----------------------------
+# Day keys
+# -----------------------------
+def to_day(value) -> int:
+    """Integer day key (days since 1970-01-01) for a date/datetime/ISO string."""
+    if isinstance(value, str):
+        value = dt.date.fromisoformat(value[:10])
+    elif isinstance(value, dt.datetime):
+        value = value.date()
+    return (value - EPOCH).days
+
+
+def from_day(day: int) -> dt.date:
+    return EPOCH + dt.timedelta(days=int(day))
+
+
+# -----------------------------
+# Apps dimension
+# -----------------------------
+def get_app_ids(conn=None) -> dict:
+    """Map app name -> app_id."""
+    if conn is None:
+        with connection() as conn:
+            return get_app_ids(conn)
+    return dict(conn.execute("SELECT name, app_id FROM apps").fetchall())
+
+
+def _label(conn, frame: pd.DataFrame, child_id: int = None) -> pd.DataFrame:
+    """Insert ``app`` and ``category`` after ``app_id`` from the shared catalog.
+
+    Categories follow the family's overrides: ``child_id``'s parent, or each
+    row's ``child_id`` column when no child is given.
+    """
+    catalog = get_catalog(conn)
+    parents = None
+    if catalog.overrides:
+        if child_id is not None:
+            parents = conn.execute("SELECT parent_id FROM children WHERE child_id=?", (child_id,)).fetchone()[0]
+        else:
+            family = dict(conn.execute("SELECT child_id, parent_id FROM children"))
+            parents = frame["child_id"].map(family).to_numpy()
+    app, category = catalog.label(frame["app_id"].to_numpy(), parents)
+    at = frame.columns.get_loc("app_id") + 1
+    frame.insert(at, "app", app)
+    frame.insert(at + 1, "category", category)
+    return frame
+
+
+# -----------------------------
+# Reads
+# -----------------------------
+def has_usage(child_id: int) -> bool:
+    """Whether a child has any usage, hot or archived."""
+    with connection() as conn:
+        row = conn.execute(
+            "SELECT EXISTS (SELECT 1 FROM usage_data WHERE child_id=?) "
+            "OR EXISTS (SELECT 1 FROM archive_children WHERE child_id=?)",
+            (child_id, child_id),
+        ).fetchone()
+    return bool(row[0])
+
+
+def data_version(child_id: int, conn=None) -> tuple:
+    """``(max_id, edits)`` for a child; bumped by triggers on every write."""
+    if conn is None:
+        with connection() as conn:
+            return data_version(child_id, conn)
+    row = conn.execute(
+        "SELECT max_id, edits FROM child_versions WHERE child_id=?", (child_id,)
+    ).fetchone()
+    return tuple(row) if row else (0, 0)
+
+
+def data_versions(child_ids, conn=None) -> tuple:
+    """``((child_id, max_id, edits), ...)`` for several children, in ``child_ids`` order."""
+    if conn is None:
+        with connection() as conn:
+            return data_versions(child_ids, conn)
+    child_ids = [int(c) for c in child_ids]
+    rows = conn.execute(
+        "SELECT child_id, max_id, edits FROM child_versions "
+        f"WHERE child_id IN ({','.join('?' * len(child_ids))})",
+        child_ids,
+    ).fetchall()
+    found = {row[0]: tuple(row) for row in rows}
+    return tuple(found.get(c, (c, 0, 0)) for c in child_ids)
+
+
+@traced("sql.usage_rows")
+def _fetch_usage(conn, child_id: int) -> pd.DataFrame:
+    frame = pd.read_sql_query(
+        "SELECT id, day, app_id, usage_minutes FROM usage_data WHERE child_id=? ORDER BY day, app_id",
+        conn,
+        params=(child_id,),
+    )
+    frame = _with_archive(frame, read_archive([child_id], conn=conn), ["day", "app_id"])
+    return _compact(_label(conn, frame, child_id).drop(columns="app_id"))
+
+
+def _compact(frame: pd.DataFrame, minutes_dtype: str = "int16") -> pd.DataFrame:
+    frame["Date"] = pd.to_datetime(frame.pop("day"), unit="D")
+    frame["app"] = frame["app"].astype("category")
+    frame["category"] = frame["category"].astype("category")
+    frame["usage_minutes"] = frame["usage_minutes"].astype(minutes_dtype)
+    return frame
+
+
+# -----------------------------
+# Archived (cold) rows
+# -----------------------------
+def _with_archive(hot: pd.DataFrame, cold: pd.DataFrame, order, ascending: bool = True) -> pd.DataFrame:
+    """Append archived raw rows to a hot frame, restoring the SQL ``order``."""
+    if cold.empty:
+        return hot
+    cold = cold[hot.columns]
+    return pd.concat([hot, cold], ignore_index=True).sort_values(
+        order, ascending=ascending, kind="stable", ignore_index=True
+    )
+
+
+def _with_archived_totals(hot: pd.DataFrame, cold: pd.DataFrame, keys) -> pd.DataFrame:
+    """Add archived rows to per-``keys`` rollup totals (``keys`` end with ``app_id``)."""
+    if cold.empty:
+        return hot
+    return (
+        pd.concat([hot[keys + ["usage_minutes"]], cold[keys + ["usage_minutes"]]], ignore_index=True)
+        .groupby(keys, as_index=False)["usage_minutes"].sum()
+    )
+
+
+def load_usage(child_id: int) -> pd.DataFrame:
+    """All usage rows of one child, uncached (served from the covering index)."""
+    with connection() as conn:
+        return _fetch_usage(conn, child_id)
+
+
+def day_bounds(child_id: int, conn=None) -> tuple:
+    """``(first_day, last_day)`` with usage for a child, or ``(None, None)``."""
+    if conn is None:
+        with connection() as conn:
+            return day_bounds(child_id, conn)
+    return day_bounds_many([child_id], conn)
+
+
+def list_days(child_id: int, conn=None) -> list:
+    """Distinct days with usage, off the rollup's primary key plus the archive."""
+    if conn is None:
+        with connection() as conn:
+            return list_days(child_id, conn)
+    days = [row[0] for row in conn.execute(
+        "SELECT DISTINCT day FROM daily_usage_rollup WHERE child_id=? ORDER BY day", (child_id,)
+    )]
+    cold = read_archive([child_id], columns=["day"], conn=conn)
+    if cold.empty:
+        return days
+    return sorted(set(days).union(cold["day"].tolist()))
+
+
+@traced("sql.daily_rollup")
+def _fetch_daily(conn, child_id: int, start_day: int = None, end_day: int = None, app_ids=None) -> pd.DataFrame:
+    sql = (
+        "SELECT r.day, r.app_id, r.usage_minutes "
+        "FROM daily_usage_rollup r WHERE r.child_id=?"
+    )
+    params = [child_id]
+    if app_ids is not None:
+        sql += f" AND r.app_id IN ({','.join('?' * len(app_ids))})"
+        params += [int(a) for a in app_ids]
+    if start_day is not None:
+        sql += " AND r.day>=?"
+        params.append(start_day)
+    if end_day is not None:
+        sql += " AND r.day<=?"
+        params.append(end_day)
+    return pd.read_sql_query(sql + " ORDER BY r.day, r.app_id", conn, params=params)
+
+
+def _daily_frame(conn, child_id: int, hot: pd.DataFrame, cold: pd.DataFrame) -> pd.DataFrame:
+    """Labelled, compact per-(day, app) totals from the hot rollup rows and archived rows."""
+    frame = _label(conn, _with_archived_totals(hot, cold, ["day", "app_id"]).copy(), child_id)
+    return _compact(frame.drop(columns="app_id"), minutes_dtype="int32")
+
+
+def load_daily_usage(child_id: int, start_day: int = None, end_day: int = None, app_ids=None) -> pd.DataFrame:
+    """Per-(day, app) totals from ``daily_usage_rollup`` and the archive, O(days x apps) in the range."""
+    with connection() as conn:
+        hot = _fetch_daily(conn, child_id, start_day, end_day, app_ids)
+        cold = read_archive([child_id], start_day, end_day, app_ids, conn=conn)
+        return _daily_frame(conn, child_id, hot, cold)
+
+
+def _first_new_day(conn, child_id: int, after_id: int):
+    """Earliest day among a child's rows inserted after ``after_id``, or ``None``."""
+    # Walks the rowid range of rows inserted since (+child_id keeps the
+    # planner off the per-child index, which would scan the whole history).
+    return conn.execute(
+        "SELECT MIN(day) FROM usage_data WHERE id>? AND +child_id=?", (after_id, child_id)
+    ).fetchone()[0]
+
+
+def day_bounds_many(child_ids, conn=None) -> tuple:
+    """:func:`day_bounds` across several children."""
+    if conn is None:
+        with connection() as conn:
+            return day_bounds_many(child_ids, conn)
+    child_ids = [int(c) for c in child_ids]
+    marks = ",".join("?" * len(child_ids))
+    return tuple(conn.execute(
+        "SELECT MIN(first), MAX(last) FROM ("
+        f"SELECT MIN(day) AS first, MAX(day) AS last FROM daily_usage_rollup WHERE child_id IN ({marks}) "
+        f"UNION ALL SELECT MIN(min_day), MAX(max_day) FROM archive_children WHERE child_id IN ({marks}))",
+        child_ids + child_ids,
+    ).fetchone())
+
+
+@traced("sql.daily_rollup_many")
+def load_daily_usage_many(child_ids, start_day: int = None, end_day: int = None) -> pd.DataFrame:
+    """:func:`load_daily_usage` for several children at once, with a ``child_id`` column."""
+    child_ids = [int(c) for c in child_ids]
+    sql = (
+        "SELECT r.child_id, r.day, r.app_id, r.usage_minutes "
+        f"FROM daily_usage_rollup r WHERE r.child_id IN ({','.join('?' * len(child_ids))})"
+    )
+    params = list(child_ids)
+    if start_day is not None:
+        sql += " AND r.day>=?"
+        params.append(start_day)
+    if end_day is not None:
+        sql += " AND r.day<=?"
+        params.append(end_day)
+    with connection() as conn:
+        frame = pd.read_sql_query(sql + " ORDER BY r.child_id, r.day, r.app_id", conn, params=params)
+        cold = read_archive(child_ids, start_day, end_day, conn=conn)
+        frame = _label(conn, _with_archived_totals(frame, cold, ["child_id", "day", "app_id"]))
+    return _compact(frame.drop(columns="app_id"), minutes_dtype="int32")
+
+
+# -----------------------------
+# Paged raw rows
+# -----------------------------
+# Sortable columns of the raw view. Ties fall back to the covering index order
+# (day, app_id, usage_minutes, id), so pages never overlap.
+PAGE_SORTS = {
+    "Date": "u.day",
+    "app": "a.name",
+    "usage_minutes": "u.usage_minutes",
+    "id": "u.id",
+}
+
+
+def _usage_where(child_id: int, app_ids=None, start_day: int = None, end_day: int = None):
+    sql = " WHERE u.child_id=?"
+    params = [child_id]
+    if app_ids is not None:
+        sql += f" AND u.app_id IN ({','.join('?' * len(app_ids))})"
+        params += [int(a) for a in app_ids]
+    if start_day is not None:
+        sql += " AND u.day>=?"
+        params.append(start_day)
+    if end_day is not None:
+        sql += " AND u.day<=?"
+        params.append(end_day)
+    return sql, params
+
+
+def count_usage(child_id: int, app_ids=None, start_day: int = None, end_day: int = None, conn=None,
+                archived: bool = True) -> int:
+    """Number of raw rows matching the filters (counted on the covering index and the archive)."""
+    if conn is None:
+        with connection() as conn:
+            return count_usage(child_id, app_ids, start_day, end_day, conn, archived)
+    where, params = _usage_where(child_id, app_ids, start_day, end_day)
+    total = conn.execute("SELECT COUNT(*) FROM usage_data u" + where, params).fetchone()[0]
+    if archived:
+        total += count_archive([child_id], start_day, end_day, app_ids, conn=conn)
+    return total
+
+
+def load_usage_page(child_id: int, app_ids=None, start_day: int = None, end_day: int = None,
+                    sort: str = "Date", descending: bool = False, page: int = 0,
+                    page_size: int = 50, conn=None, archived: bool = True) -> pd.DataFrame:
+    """One page of raw rows, filtered, sorted and sliced in SQL.
+
+    ``page`` is zero-based. The default ``Date`` order is exactly the covering
+    index order, so OFFSET only skips index entries and needs no sort. When
+    archived rows match, the first ``(page + 1) * page_size`` rows of each tier
+    are merged in pandas instead.
+    """
+    if sort not in PAGE_SORTS:
+        raise ValueError(f"Unknown sort column {sort!r}; expected one of {tuple(PAGE_SORTS)}")
+    if conn is None:
+        with connection() as conn:
+            return load_usage_page(child_id, app_ids, start_day, end_day, sort, descending, page, page_size,
+                                   conn, archived)
+    cold = read_archive([child_id], start_day, end_day, app_ids, conn=conn) if archived else None
+    where, params = _usage_where(child_id, app_ids, start_day, end_day)
+    column = PAGE_SORTS[sort]
+    keys = [column] + [k for k in ("u.day", "u.app_id", "u.usage_minutes", "u.id") if k != column]
+    order = ", ".join(k + (" DESC" if descending else "") for k in keys)
+    offset = int(page) * int(page_size)
+    merge = cold is not None and not cold.empty
+    limit, skip = (offset + int(page_size), 0) if merge else (int(page_size), offset)
+    # Only sorting by name needs the apps table; labels come from the catalog.
+    join = " JOIN apps a ON a.app_id = u.app_id" if sort == "app" else ""
+    frame = pd.read_sql_query(
+        "SELECT u.id, u.day, u.app_id, u.usage_minutes "
+        f"FROM usage_data u{join}{where} ORDER BY {order} LIMIT ? OFFSET ?",
+        conn,
+        params=params + [limit, skip],
+    )
+    frame = _label(conn, frame, child_id)
+    if merge:
+        columns = [k.split(".")[1].replace("name", "app") for k in keys]
+        if sort != "app":  # integer keys only: trim before labelling
+            cold = cold.sort_values(columns, ascending=not descending).head(limit)
+        cold = _label(conn, cold[["id", "day", "app_id", "usage_minutes"]].reset_index(drop=True), child_id)
+        frame = _with_archive(frame, cold, columns, ascending=not descending)
+        frame = frame.iloc[offset:offset + int(page_size)].reset_index(drop=True)
+    return _compact(frame.drop(columns="app_id"))
+
+
+# -----------------------------
+# Per-child frame cache
+# -----------------------------
+FRAME_CACHE_SIZE = int(os.environ.get("USAGE_FRAME_CACHE_SIZE", "256"))
+_frames = OrderedDict()
+_frames_lock = threading.Lock()
+
+
+def _cache_get(key):
+    with _frames_lock:
+        cached = _frames.get(key)
+        if cached is not None:
+            _frames.move_to_end(key)
+        return cached
+
+
+def _cache_put(key, version, frame):
+    with _frames_lock:
+        _frames[key] = (version, frame)
+        _frames.move_to_end(key)
+        while len(_frames) > FRAME_CACHE_SIZE:
+            _frames.popitem(last=False)
+
+
+def _version(child_id: int, conn) -> tuple:
+    """Cache version of a child's labelled frames: its data and the catalog."""
+    return data_version(child_id, conn), get_catalog(conn).version
+
+
+@traced("data.daily_usage")
+def get_daily_usage(child_id: int, start_day: int = None, end_day: int = None, app_ids=None) -> pd.DataFrame:
+    """Cached :func:`load_daily_usage`; the whole history unless a window or apps are given.
+
+    When rows were only added since the cached frame (``max_id`` moved,
+    ``edits`` did not), only the rollup from the earliest new day on is read
+    again and the cached archived rows are reused; a catalog change only
+    relabels. Edits, deletes and archiving reload everything.
+    """
+    app_ids = None if app_ids is None else tuple(sorted(int(a) for a in app_ids))
+    key = ("daily", child_id, start_day, end_day, app_ids)
+    with connection() as conn:
+        version = _version(child_id, conn)
+        cached = _cache_get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1][0]
+        (max_id, edits), _ = version
+        if cached is not None and cached[0][0][1] == edits and cached[0][0][0] <= max_id:
+            _, hot, cold = cached[1]
+            since = _first_new_day(conn, child_id, cached[0][0][0])
+            if since is not None:
+                fresh = _fetch_daily(conn, child_id, since if start_day is None else max(since, start_day), end_day, app_ids)
+                hot = pd.concat([hot[hot["day"] < since], fresh], ignore_index=True)
+        else:
+            hot = _fetch_daily(conn, child_id, start_day, end_day, app_ids)
+            cold = read_archive([child_id], start_day, end_day, app_ids, conn=conn)
+        frame = _daily_frame(conn, child_id, hot, cold)
+    _cache_put(key, version, (frame, hot, cold))
+    return frame
+
+
+@traced("data.daily_usage_many")
+def get_daily_usage_many(child_ids, start_day: int = None, end_day: int = None) -> tuple:
+    """Cached ``(versions, frame)`` of :func:`load_daily_usage_many`.
+
+    ``versions`` (:func:`data_versions` and the catalog version) changes
+    whenever any of the children's data or app categories do, so callers can
+    key derived results on it.
+    """
+    child_ids = tuple(int(c) for c in child_ids)
+    key = ("many", child_ids, start_day, end_day)
+    with connection() as conn:
+        versions = data_versions(child_ids, conn), get_catalog(conn).version
+    cached = _cache_get(key)
+    if cached is not None and cached[0] == versions:
+        return versions, cached[1]
+    frame = load_daily_usage_many(child_ids, start_day, end_day)
+    _cache_put(key, versions, frame)
+    return versions, frame
+
+
+def get_days(child_id: int) -> list:
+    """Cached :func:`list_days`."""
+    key = ("days", child_id)
+    version = data_version(child_id)
+    cached = _cache_get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    days = list_days(child_id)
+    _cache_put(key, version, days)
+    return days
+
+
+@traced("data.usage_page")
+def get_usage_page(child_id: int, app_ids=None, start_day: int = None, end_day: int = None,
+                   sort: str = "Date", descending: bool = False, page: int = 0,
+                   page_size: int = 50, archived: bool = True) -> tuple:
+    """Cached ``(page_frame, total_rows)``; only the requested page is ever loaded.
+
+    ``archived=False`` leaves out rows moved to the Parquet archive (they are read-only).
+    """
+    app_ids = None if app_ids is None else tuple(sorted(int(a) for a in app_ids))
+    key = ("page", child_id, app_ids, start_day, end_day, sort, descending, page, page_size, archived)
+    with connection() as conn:
+        version = _version(child_id, conn)
+        cached = _cache_get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        total = count_usage(child_id, app_ids, start_day, end_day, conn, archived)
+        frame = load_usage_page(child_id, app_ids, start_day, end_day, sort, descending, page, page_size,
+                                conn, archived)
+    _cache_put(key, version, (frame, total))
+    return frame, total
+
+
+def invalidate_usage(child_id: int = None):
+    """Drop the cached frames of one child (or every child)."""
+    with _frames_lock:
+        if child_id is None:
+            _frames.clear()
+        else:
+            for key in [k for k in _frames if k[1] == child_id or (k[0] == "many" and child_id in k[1])]:
+                del _frames[key]
+
+
+# -----------------------------
+# Writes
+# -----------------------------
+def insert_usage(rows):
+    """Insert ``(child_id, day, app_id, usage_minutes)`` rows in one transaction."""
+    with transaction() as conn:
+        conn.executemany(
+            "INSERT INTO usage_data (child_id, day, app_id, usage_minutes) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+
+
+def update_minutes(updates):
+    """Apply ``(usage_minutes, id)`` pairs in one transaction."""
+    with transaction() as conn:
+        conn.executemany("UPDATE usage_data SET usage_minutes=? WHERE id=?", updates)
@@ -0,0 +1,83 @@
+"""Background import of the dashboard's heavy modules.
+
+The login page needs only streamlit and the user tables; numpy, pandas,
+pyarrow, matplotlib and the analytics stack are imported past the login
+gate. :func:`prewarm` loads them on a daemon thread, once per process, after
+the first login page has been sent (and renders one throwaway chart), so the
+first login finds them in ``sys.modules`` instead of paying for them on its
+rerun.
+
+``DASHBOARD_PREWARM=0`` turns it off (imports then happen on first login).
+"""
+import importlib
+import logging
+import os
+import threading
+import time
+
+PREWARM = os.environ.get("DASHBOARD_PREWARM", "1") == "1"
+# Dependencies first, so each entry's time is what it adds on top.
+DASHBOARD_MODULES = (
+    "numpy",
+    "pandas",
+    "pyarrow.parquet",
+    "pyarrow.compute",
+    "matplotlib.figure",
+    "matplotlib.backends.backend_agg",
+    "analytics",
+    "alert_engine",
+    "catalog",
+    "archive",
+    "usage_store",
+    "ingest",
+    "precompute",
+    "query_engine",
+    "population",
+    "explainable_ai",
+    "charts",
+)
+
+log = logging.getLogger(__name__)
+
+timings = {}  # module -> seconds its import took on the prewarm thread
+_thread = None
+_lock = threading.Lock()
+
+
+def prewarm(modules=DASHBOARD_MODULES) -> bool:
+    """Start importing ``modules`` in the background; False if disabled or already started."""
+    global _thread
+    if not PREWARM:
+        return False
+    with _lock:
+        if _thread is not None:
+            return False
+        _thread = threading.Thread(target=_import_all, args=(tuple(modules),), name="prewarm", daemon=True)
+    _thread.start()
+    return True
+
+
+def wait(timeout: float = None) -> bool:
+    """Block until the prewarm thread is done; True if it has finished (or never ran)."""
+    if _thread is not None:
+        _thread.join(timeout)
+    return _thread is None or not _thread.is_alive()
+
+
+def _import_all(modules):
+    for name in modules:
+        _timed(name, importlib.import_module, name)
+    if "charts" in modules:
+        # The first rendered image also pays for matplotlib's font setup.
+        _timed("charts.warm_up", lambda: importlib.import_module("charts").warm_up())
+
+
+def _timed(name, fn, *args):
+    start = time.perf_counter()
+    try:
+        fn(*args)
+    except Exception:
+        # The dashboard imports it again past the login gate and reports the error there.
+        log.exception("prewarming %s failed", name)
+        return
+    timings[name] = time.perf_counter() - start
@@ -0,0 +1,333 @@
+"""Weekly HTML reports for every child, rendered headlessly on a process pool.
+
+A report covers one week (``--week-ending``, by default the latest day with
+usage, and the six days before it). It contains:
+
+* the week's metrics, app totals and limit alerts;
+* the stored forecast and key factors of the week's top app;
+* recommendations;
+* where the child stands among all children;
+* static charts.
+
+It is built with the same functions as the dashboard: ``analytics``,
+``explainable_ai.explanation_reasons``, ``charts.draw_*`` and
+``population.child_standing``.
+
+Children are read from ``children``/``parents`` in pages of ``--batch`` and
+handed to spawned workers, with at most two pages per worker in flight, so
+memory stays flat however many children there are. The app catalog and the
+population sketches are read once and shipped to every worker. Each report
+is written to a temporary file and renamed into place, so an interrupted run
+leaves only complete reports and a re-run skips them (``--force`` rewrites).
+
+    python weekly_reports.py --out reports --workers 4
+    python weekly_reports.py --week-ending 2026-02-09 --model weekly --no-charts
+"""
+import argparse
+import base64
+import html
+import multiprocessing
+import os
+import resource
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+
+import pandas as pd
+
+import population
+from alert_engine import get_thresholds_many
+from analytics import (
+    MODELS,
+    ChildReport,
+    Metrics,
+    balance_recommendations,
+    daily_alerts,
+    forecast_recommendations,
+    usage_suggestions,
+    weekly_alerts
+)
+from catalog import get_catalog
+from charts import FIGSIZES, draw_app_totals, draw_daily_category_bars, draw_forecast, render_png
+from db import connection, init_db
+from explainable_ai import explanation_reasons, population_reasons
+from precompute import get_results, refresh as refresh_results
+from query_engine import get_engine
+from usage_store import data_versions, from_day, to_day
+
+BATCH_CHILDREN = 200
+WEEK_DAYS = 7
+IN_FLIGHT_PER_WORKER = 2
+PROGRESS_EVERY = 10.0  # seconds between progress lines
+
+
+@dataclass(frozen=True)
+class Job:
+    out_dir: str
+    start_day: int
+    end_day: int
+    model: str
+    charts: bool
+
+
+def report_path(job: Job, parent_id, child_id: int) -> str:
+    return os.path.join(job.out_dir, from_day(job.end_day).isoformat(), f"parent_{parent_id}", f"child_{child_id}.html")
+
+
+# -----------------------------
+# Rendering
+# -----------------------------
+STYLE = """
+body { font-family: sans-serif; max-width: 820px; margin: 2em auto; color: #222; }
+table { border-collapse: collapse; }
+td, th { padding: 4px 12px; border-bottom: 1px solid #ddd; text-align: left; }
+.alert, .warning { color: #a33; } .success { color: #272; } .info { color: #246; }
+img { max-width: 100%; }
+"""
+
+
+def _png(draw, figsize) -> str:
+    return f'<img src="data:image/png;base64,{base64.b64encode(render_png(draw, figsize)).decode()}">'
+
+
+def _items(lines, css: str = "") -> str:
+    return "<ul>" + "".join(f'<li class="{css}">{html.escape(line)}</li>' for line in lines) + "</ul>"
+
+
+def render_report(child_name: str, username: str, job: Job, report: ChildReport, week_daily: pd.DataFrame,
+                  categories: dict, daily_limit: int, reasons: list, standing: list) -> str:
+    """One self-contained HTML page (charts inlined as PNG data URIs)."""
+    m = report.metrics
+    week = f"{from_day(job.start_day).isoformat()} to {from_day(job.end_day).isoformat()}"
+    totals = pd.Series(report.app_totals, dtype="int64")
+    parts = [
+        f"<!doctype html><html><head><meta charset='utf-8'><title>{html.escape(child_name)}: {week}</title>",
+        f"<style>{STYLE}</style></head><body>",
+        f"<h1>Weekly report for {html.escape(child_name)}</h1>",
+        f"<p>{week} · family {html.escape(username or '-')}</p>",
+        "<table><tr><th>Study mins</th><th>Distraction mins</th><th>Total mins</th><th>Balance score</th></tr>",
+        f"<tr><td>{m.total_study}</td><td>{m.total_distract}</td><td>{m.total_all}</td><td>{m.healthy_balance_score}</td></tr></table>",
+    ]
+    if standing:
+        parts.append(_items(standing))
+    if job.charts and not week_daily.empty:
+        parts.append(_png(draw_daily_category_bars(week_daily), FIGSIZES["daily_bars"]))
+    if job.charts and totals.sum() > 0:
+        parts.append(_png(draw_app_totals(totals, categories), FIGSIZES["app_totals"]))
+
+    parts.append("<h2>Alerts</h2>")
+    parts.append(_items([a.message for a in report.alerts], "alert") if report.alerts
+                 else "<p class='success'>No alerts. Usage within healthy limits.</p>")
+
+    parts.append("<h2>Forecast</h2>")
+    if not report.forecasts:
+        parts.append("<p>No usage history to forecast yet.</p>")
+    for forecast in report.forecasts:
+        over = "above" if forecast.avg_forecast > daily_limit else "within"
+        parts.append(f"<p>Projected average for {html.escape(forecast.app)} next week: "
+                     f"{forecast.avg_forecast:.0f} mins/day ({over} the {daily_limit} min limit)</p>")
+        if job.charts:
+            parts.append(_png(draw_forecast(forecast), FIGSIZES["forecast"]))
+        parts.append("<h3>Key factors considered</h3>" + _items(reasons))
+
+    parts.append("<h2>Recommendations</h2><ul>")
+    parts.extend(f'<li class="{r.level}">{html.escape(r.message.removeprefix("- "))}</li>' for r in report.recommendations)
+    parts.append("</ul></body></html>")
+    return "\n".join(parts)
+
+
+def _write(path: str, text: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+# -----------------------------
+# Worker
+# -----------------------------
+_worker = {}
+
+
+def _init_worker(job: Job, catalog, sketches: dict):
+    _worker.update(job=job, catalog=catalog, sketches=sketches)
+
+
+def _results(child_ids) -> dict:
+    """Stored precomputed results, refreshing stale ones first (the dashboard reuses them)."""
+    with connection() as conn:
+        catalog_version = get_catalog(conn).version
+        versions = {c: ((max_id, edits), catalog_version) for c, max_id, edits in data_versions(child_ids, conn)}
+    results = {c: get_results(c) for c in child_ids}
+    stale = [c for c in child_ids if results[c] is None or results[c].version != versions[c]]
+    if stale:
+        refresh_results(stale)
+        results.update({c: get_results(c) for c in stale})
+    return results
+
+
+def _anon_rss() -> int:
+    """Resident anonymous memory in KiB (Linux; 0 elsewhere), i.e. without the database's mmap pages."""
+    try:
+        with open("/proc/self/status") as f:
+            return next(int(line.split()[1]) for line in f if line.startswith("RssAnon:"))
+    except (OSError, StopIteration):
+        return 0
+
+
+def report_batch(children) -> tuple:
+    """Write the reports of ``(child_id, child_name, parent_id, username)`` rows.
+
+    Returns ``(written, peak RSS KiB, anonymous RSS KiB)``.
+    """
+    job, catalog, sketches = _worker["job"], _worker["catalog"], _worker["sketches"]
+    child_ids = [row[0] for row in children]
+    results = _results(child_ids)
+    thresholds = get_thresholds_many(child_ids)
+
+    # The week's aggregates for the whole batch, one query each.
+    engine = get_engine()
+    window = (child_ids, job.start_day, job.end_day)
+    metrics = engine.metrics(*window)
+    by_app = dict(tuple(engine.app_totals(*window).groupby("child_id")))
+    by_day = dict(tuple(engine.daily_categories(*window).groupby("child_id")))
+    over = engine.over_limit(min(limit for limit, _ in thresholds.values()), *window)
+    over = dict(tuple(over.groupby("child_id")))
+
+    for child_id, child_name, parent_id, username in children:
+        categories = catalog.category_map(parent_id)
+        daily_limit, weekly_limit = thresholds[child_id]
+        week_metrics = (Metrics(*(int(v) for v in metrics.loc[child_id])) if child_id in metrics.index
+                        else Metrics(0, 0, 0, 0))
+        totals = pd.Series(0, index=list(categories), dtype="int64")
+        if child_id in by_app:
+            minutes = by_app[child_id].set_index("app")["usage_minutes"]
+            minutes.index = minutes.index.astype(str)
+            totals = minutes.reindex(list(categories), fill_value=0).astype("int64")
+        week_daily = pd.DataFrame()
+        if child_id in by_day:
+            week_daily = by_day[child_id].pivot(index="Date", columns="category", values="usage_minutes")
+            week_daily.columns = week_daily.columns.astype(str)
+            week_daily = week_daily.dropna(axis=1, how="all").fillna(0)
+        over_days = over.get(child_id, pd.DataFrame(columns=["Date", "app", "usage_minutes"]))
+        alerts = (daily_alerts(over_days[over_days["usage_minutes"] > daily_limit], daily_limit)
+                  + weekly_alerts(totals, weekly_limit))
+
+        # The week's most used app is the one forecast and explained.
+        forecasts = results[child_id].forecasts[job.model] if results[child_id] else {}
+        top_app = totals.idxmax() if totals.sum() > 0 else None
+        forecast = forecasts.get(top_app) or next(iter(forecasts.values()), None)
+        standing = population.child_standing(child_id, sketches)
+        reasons = []
+        if forecast is not None:
+            reasons = explanation_reasons(results[child_id].explanations[job.model], forecast.app, daily_limit,
+                                          week_metrics, standing, categories.get(forecast.app))
+
+        report = ChildReport(
+            child_id=child_id,
+            metrics=week_metrics,
+            app_totals={app: int(minutes) for app, minutes in totals.items()},
+            alerts=alerts,
+            forecasts=[forecast] if forecast is not None else [],
+            recommendations=(
+                balance_recommendations(week_metrics)
+                + forecast_recommendations(forecast, categories, daily_limit, catalog.substitutes)
+                + usage_suggestions(totals, categories, daily_limit, weekly_limit, catalog.substitutes)
+            ),
+        )
+        page = render_report(child_name, username, job, report, week_daily, categories, daily_limit,
+                             reasons, population_reasons(standing, top_app))
+        _write(report_path(job, parent_id, child_id), page)
+    return len(children), resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, _anon_rss()
+
+
+# -----------------------------
+# Driver
+# -----------------------------
+def pending_children(job: Job, batch_children: int = BATCH_CHILDREN, force: bool = False):
+    """Pages of ``(child_id, child_name, parent_id, username)`` still without a report, plus the skipped count."""
+    last = 0
+    while True:
+        with connection() as conn:
+            rows = conn.execute("""
+                SELECT c.child_id, c.child_name, c.parent_id, p.username
+                FROM children c LEFT JOIN parents p ON p.parent_id = c.parent_id
+                WHERE c.child_id > ? ORDER BY c.child_id LIMIT ?
+            """, (last, batch_children)).fetchall()
+        if not rows:
+            return
+        last = rows[-1][0]
+        todo = [row for row in rows if force or not os.path.exists(report_path(job, row[2], row[0]))]
+        yield todo, len(rows) - len(todo)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", default="reports", help="output directory")
+    parser.add_argument("--week-ending", help="last day of the week (default: latest day with usage)")
+    parser.add_argument("--model", choices=list(MODELS), default="linear", help="forecast model")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batch", type=int, default=BATCH_CHILDREN, help="children per worker task")
+    parser.add_argument("--no-charts", action="store_true", help="skip the static charts")
+    parser.add_argument("--force", action="store_true", help="rewrite reports that already exist")
+    args = parser.parse_args(argv)
+
+    init_db()
+    with connection() as conn:
+        end_day = (to_day(args.week_ending) if args.week_ending
+                   else conn.execute("SELECT MAX(day) FROM daily_usage_rollup").fetchone()[0])
+    if end_day is None:
+        print("no usage to report")
+        return
+    job = Job(os.path.abspath(args.out), end_day - WEEK_DAYS + 1, end_day, args.model, not args.no_charts)
+
+    # Shared by every report: bring the population up to date and snapshot it once.
+    population.refresh()
+    shared = (job, get_catalog(), population.get_sketches())
+    # Workers read stored results directly; they never queue background refreshes.
+    os.environ["PRECOMPUTE_WORKERS"] = "0"
+
+    start = last_progress = time.perf_counter()
+    written = skipped = worker_rss = worker_anon = 0
+    # spawn: pooled SQLite connections must never be inherited across fork()
+    ctx = multiprocessing.get_context("spawn")
+    pool = ProcessPoolExecutor(args.workers, mp_context=ctx, initializer=_init_worker, initargs=shared)
+    in_flight = set()
+
+    def collect(done):
+        nonlocal written, worker_rss, worker_anon
+        for future in done:
+            count, rss, anon = future.result()
+            written += count
+            worker_rss, worker_anon = max(worker_rss, rss), max(worker_anon, anon)
+
+    try:
+        for todo, already in pending_children(job, args.batch, args.force):
+            skipped += already
+            if not todo:
+                continue
+            if len(in_flight) >= IN_FLIGHT_PER_WORKER * args.workers:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            in_flight.add(pool.submit(report_batch, todo))
+            if time.perf_counter() - last_progress >= PROGRESS_EVERY:
+                last_progress = time.perf_counter()
+                print(f"  {written:,} reports written ({written / (last_progress - start):.1f}/s)", flush=True)
+        collect(wait(in_flight).done)
+    finally:
+        # On an interrupt, drop queued batches; running ones finish their
+        # current report and the next run resumes after them.
+        pool.shutdown(cancel_futures=True)
+
+    elapsed = time.perf_counter() - start
+    main_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"wrote {written:,} reports to {job.out_dir} in {elapsed:.1f}s "
+          f"({written / max(elapsed, 1e-9):.1f} reports/s; {skipped:,} already written)")
+    # Peak RSS includes SQLite's mmap of the database file (capped by db.PRAGMAS).
+    print(f"peak RSS: main process {main_rss / 1024:.0f} MiB, largest worker {worker_rss / 1024:.0f} MiB "
+          f"({worker_anon / 1024:.0f} MiB anonymous after its last batch)")
+
+
+if __name__ == "__main__":
+    main()